@@ -1,13 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Notification , Group
+from .models import EmergencyType, NotificationArchive, User, Notification , Group
 
 # --- User Admin ---
 class UserAdmin(BaseUserAdmin):
     # Affichage dans la liste
     list_display = ('username', 'email', 'get_email_perso', 'get_phone', 'is_staff', 'is_active')
-    list_filter = ('is_staff', 'is_superuser', 'is_active', 'groups', )
-    search_fields = ('username', 'email', 'email_perso_db', 'phone_db')
+    list_filter = ('is_staff', 'is_superuser', 'is_active', 'role', 'groups', )
+    search_fields = ('username', 'email', 'email_perso_db', 'phone_db', 'building', 'zone')
     ordering = ('username',)
 
     # Formulaire d’édition
@@ -16,6 +16,7 @@ class UserAdmin(BaseUserAdmin):
         ('Informations personnelles', {
             'fields': ('first_name', 'last_name', 'email', 'email_perso_db', 'phone_db', 'bio', )
         }),
+        ('Ciblage', {'fields': ('building', 'zone', 'role')}),
         ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions')}),
         ('Dates importantes', {'fields': ('last_login', 'date_joined')}),
     )
@@ -44,8 +45,41 @@ class NotificationAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
     search_fields = ('destinataire__username', 'message')
     ordering = ('-created_at',)
+    # Destinataire chargé par JOIN (pas une requête par ligne)
+    list_select_related = ('destinataire',)
+    # Pas de COUNT(*) supplémentaire sur toute la table
+    show_full_result_count = False
+    raw_id_fields = ('destinataire',)
+
+# --- Archive (lecture seule, alimentée par la rétention) ---
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    list_display = ('id', 'destinataire', 'priority', 'message', 'created_at', 'month')
+    list_filter = ('month', 'priority')
+    search_fields = ('message',)
+    ordering = ('-created_at',)
+    list_select_related = ('destinataire',)
+    show_full_result_count = False
+    raw_id_fields = ('destinataire',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+# --- Types d'urgence (rechargés à chaud, voir notifications/emergencies.py) ---
+class EmergencyTypeAdmin(admin.ModelAdmin):
+    list_display = ('slug', 'label', 'name', 'priority', 'enabled', 'updated_at')
+    list_filter = ('enabled', 'priority')
+    search_fields = ('slug', 'label', 'name')
+    prepopulated_fields = {'slug': ('label',)}
 
 # --- Enregistrement ---
 admin.site.register(User, UserAdmin)
 admin.site.register(Notification, NotificationAdmin)
+admin.site.register(EmergencyType, EmergencyTypeAdmin)
+admin.site.register(NotificationArchive, NotificationArchiveAdmin)
 admin.site.unregister(Group)
\ No newline at end of file
@@ -1,53 +1,159 @@
-from rest_framework import viewsets
+from django.urls import reverse
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import Notification
-from .serializers import NotificationSerializer
-from .core import Epidemie, Incendie, Innondation, Securite
+from .models import DispatchJob, Notification
+from .pagination import KeysetPagination
+from .serializers import AudienceSerializer, DispatchJobSerializer, NotificationSerializer
+from .circuit_breaker import OPEN, get_breaker
+from .counters import acknowledge, mark_all_read, user_counters
+from .emergencies import catalog
+from .ingest import BulkIngestor, UnsupportedFormat, iter_rows
+from .idempotency import MAX_KEY_LENGTH, IdempotencyConflict, find_job, get_or_create_job
+from .tasks import start_job
+from .throttling import ApiThrottle, EvacuationThrottle
+
+
+def job_response(request, job, message, replayed=False):
+    """
+    Réponse 202 pointant vers l'endpoint de suivi du job (503 si déjà en échec).
+    replayed : le job existait déjà (Idempotency-Key ou déclenchement dédupliqué).
+    """
+    data = DispatchJobSerializer(job).data
+    data['job_id'] = data.pop('id')
+    data['message'] = message
+    data['status_url'] = request.build_absolute_uri(
+        reverse('dispatchjob-detail', args=[job.pk])
+    )
+    headers = {'Idempotent-Replayed': 'true'} if replayed else None
+    if job.status == DispatchJob.FAILURE:
+        data['message'] = f"Échec : {job.error}"
+        return Response(data, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers=headers)
+    return Response(data, status=status.HTTP_202_ACCEPTED, headers=headers)
+
+
+def conflict_response(exc):
+    return Response({"status": "Conflit", "message": str(exc)},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+
+def trigger_evacuation(request, obj_class, message):
+    """
+    Met l'évacuation en file, sauf si le disjoncteur de la classe est ouvert.
+    Le corps peut cibler l'alerte : {"buildings": ["B"], "roles": ["PERSONNEL"]}.
+    Un retry avec le même en-tête Idempotency-Key, ou un déclenchement
+    identique dans la fenêtre de déduplication, renvoie le job d'origine.
+    """
+    criteria = AudienceSerializer(data=request.data)
+    if not criteria.is_valid():
+        return Response(criteria.errors, status=status.HTTP_400_BAD_REQUEST)
+    idempotency_key = request.headers.get('Idempotency-Key') or None
+    if idempotency_key and len(idempotency_key) > MAX_KEY_LENGTH:
+        return Response(
+            {"status": "Requête invalide",
+             "message": f"Idempotency-Key trop long ({MAX_KEY_LENGTH} caractères maximum)"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        job = find_job(idempotency_key, obj_class.__name__) if idempotency_key else None
+    except IdempotencyConflict as exc:
+        return conflict_response(exc)
+    if job is not None:
+        return job_response(request, job, message, replayed=True)
+
+    breaker = get_breaker(obj_class.__name__)
+    if breaker.state == OPEN:
+        retry_after = breaker.retry_after()
+        return Response(
+            {"status": "Circuit ouvert", "message": f"Évacuation {obj_class.__name__} indisponible",
+             "retry_after": round(retry_after)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': str(max(1, round(retry_after)))},
+        )
+    try:
+        job, created = get_or_create_job(obj_class, criteria.to_audience(), idempotency_key)
+    except IdempotencyConflict as exc:
+        return conflict_response(exc)
+    if created:
+        job = start_job(job, getattr(obj_class, 'priority', 'LOW'))
+    return job_response(request, job, message, replayed=not created)
 
 
 # ViewSet pour les notifications
 class NotificationViewSet(viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
+    pagination_class = KeysetPagination
+    throttle_classes = [ApiThrottle]
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Import en masse d'un corps NDJSON (une notification par ligne) ou CSV
+        (colonnes message,destinataire,priority), lu en flux et inséré par blocs.
+        """
+        try:
+            rows = iter_rows(request.stream, request.content_type)
+        except UnsupportedFormat as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        report = BulkIngestor().ingest(rows)
+        if not report['error_count']:
+            code = status.HTTP_201_CREATED
+        elif report['created']:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+        return Response(report, status=code)
 
-# APIViews pour les urgences
-class EpidemieAPIView(APIView):
-    def get(self, request):
-        return Response({"message": "Évacuation Épidémie prête à être déclenchée"})
-
-    def post(self, request):
-        e = Epidemie()
-        e.evacuer()
-        return Response({"status": "Évacuation Épidémie déclenchée"})
+    # --- État de lecture de l'utilisateur connecté ---
+    @action(detail=False, methods=['get'], url_path='unread', permission_classes=[IsAuthenticated])
+    def unread(self, request):
+        """Nombre de non lues, lu dans le compteur maintenu (indépendant du volume)."""
+        return Response({'unread': user_counters(request.user).unread})
 
+    @action(detail=False, methods=['post'], url_path='read-all', permission_classes=[IsAuthenticated])
+    def read_all(self, request):
+        """Tout marquer comme lu (un seul UPDATE, voir counters.mark_all_read)."""
+        mark_all_read(request.user)
+        return Response({'unread': 0})
 
-class IncendieAPIView(APIView):
-    def get(self, request):
-        return Response({"message": "Évacuation Incendie prête à être déclenchée"})
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def ack(self, request, pk=None):
+        """Marque une notification reçue comme lue (404 si elle n'est pas au demandeur)."""
+        notification = get_object_or_404(Notification, pk=pk, destinataire=request.user)
+        acknowledged = acknowledge(request.user, notification)
+        return Response({'read': True, 'acknowledged': acknowledged,
+                         'unread': user_counters(request.user).unread})
 
-    def post(self, request):
-        i = Incendie()
-        i.evacuer()
-        return Response({"status": "Évacuation Incendie déclenchée"})
 
+# Suivi des jobs de dispatch asynchrones
+class DispatchJobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = DispatchJob.objects.all().order_by('-created_at')
+    serializer_class = DispatchJobSerializer
+    throttle_classes = [ApiThrottle]
 
-class InnondationAPIView(APIView):
-    def get(self, request):
-        return Response({"message": "Évacuation Innondation prête à être déclenchée"})
 
-    def post(self, request):
-        n = Innondation()
-        n.evacuer()
-        return Response({"status": "Évacuation Innondation déclenchée"})
+# Déclenchement des urgences : une seule vue pour tous les types (code, YAML, base)
+class EvacuationAPIView(APIView):
+    throttle_classes = [EvacuationThrottle]
 
+    def _emergency(self, slug):
+        emergency = catalog.get(slug)
+        if emergency is None:
+            raise NotFound(f"Type d'urgence inconnu : {slug}")
+        return emergency
 
-class SecuriteAPIView(APIView):
-    def get(self, request):
-        return Response({"message": "Évacuation Sécurité prête à être déclenchée"})
+    def get(self, request, slug):
+        emergency = self._emergency(slug)
+        return Response({
+            "message": f"Évacuation {emergency.label} prête à être déclenchée",
+            "priority": emergency.priority,
+        })
 
-    def post(self, request):
-        s = Securite()
-        s.evacuer()
-        return Response({"status": "Évacuation Sécurité déclenchée"})
+    def post(self, request, slug):
+        emergency = self._emergency(slug)
+        return trigger_evacuation(request, emergency.cls, f"Évacuation {emergency.label} déclenchée")
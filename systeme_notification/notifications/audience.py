@@ -0,0 +1,137 @@
+# notifications/audience.py
+
+import threading
+from array import array
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import registry as metrics
+from .models import User
+
+
+VERSION_KEY = 'notifications:audience:version'
+DEFAULT_TTL = 3600
+
+DIMENSIONS = ('groups', 'buildings', 'zones', 'roles')
+
+# Critère → filtre sur User (un ensemble d'ids précalculé par valeur)
+_LOOKUPS = {
+    'groups': 'groups__name',
+    'buildings': 'building',
+    'zones': 'zone',
+    'roles': 'role',
+}
+
+
+@dataclass(frozen=True)
+class Audience:
+    """
+    Critères de ciblage d'une alerte. Union des valeurs d'un même critère,
+    intersection entre critères : buildings=['B'], roles=['PERSONNEL'] cible
+    le personnel du bâtiment B. Sans critère : tous les utilisateurs actifs.
+    """
+    groups: tuple = ()
+    buildings: tuple = ()
+    zones: tuple = ()
+    roles: tuple = ()
+
+    def __post_init__(self):
+        for name in DIMENSIONS:
+            values = getattr(self, name)
+            if isinstance(values, str):
+                values = (values,)
+            object.__setattr__(self, name, tuple(sorted(set(values))))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data.get(name) or () for name in DIMENSIONS})
+
+    def as_dict(self):
+        return {name: list(getattr(self, name)) for name in DIMENSIONS if getattr(self, name)}
+
+    def __bool__(self):
+        return any(getattr(self, name) for name in DIMENSIONS)
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_version():
+    """Invalide tous les ensembles (adhésion à un groupe, bâtiment, rôle modifiés)."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 2, timeout=None)
+
+
+class AudienceCache:
+    """
+    Ensembles d'ids triés (array('q'), 8 octets par id) par valeur de critère,
+    stockés dans le cache Django sous une clé versionnée et gardés en mémoire
+    du process pour la version courante. Résoudre « tout le bâtiment B » ne
+    refait donc pas la jointure users × groupes à chaque alerte.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._local = {}
+
+    def ttl(self):
+        return getattr(settings, 'NOTIFICATION_AUDIENCE_CACHE_TTL', DEFAULT_TTL)
+
+    def ids_for(self, dimension, value):
+        """Ids triés des utilisateurs actifs pour un critère (ex. 'buildings', 'B')."""
+        key = (dimension, value)
+        version = current_version()
+        with self._lock:
+            if self._version != version:
+                self._version, self._local = version, {}
+            ids = self._local.get(key)
+        if ids is not None:
+            return ids
+
+        cache_key = f"notifications:audience:{version}:{dimension}:{value}"
+        ids = cache.get(cache_key)
+        if ids is None:
+            metrics.inc('notifications_audience_misses_total', {'dimension': dimension})
+            ids = array('q', (
+                User.objects.filter(is_active=True, **{_LOOKUPS[dimension]: value})
+                .order_by('pk').values_list('pk', flat=True).distinct()
+            ))
+            cache.set(cache_key, ids, timeout=self.ttl())
+        with self._lock:
+            if self._version == version:
+                self._local[key] = ids
+        return ids
+
+    def resolve(self, audience):
+        """Ids triés de l'audience (array('q')), None pour « tous les actifs »."""
+        if not audience:
+            return None
+        selected = None
+        for dimension in DIMENSIONS:
+            values = getattr(audience, dimension)
+            if not values:
+                continue
+            matched = set()
+            for value in values:
+                matched.update(self.ids_for(dimension, value))
+            selected = matched if selected is None else selected & matched
+            if not selected:
+                break
+        return array('q', sorted(selected))
+
+    def clear(self):
+        with self._lock:
+            self._version, self._local = None, {}
+
+
+audiences = AudienceCache()
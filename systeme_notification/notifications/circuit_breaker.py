@@ -0,0 +1,176 @@
+# notifications/circuit_breaker.py
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import registry as metrics
+from .tracing import logger
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+DEFAULTS = {
+    'FAILURE_RATE': 0.5,     # taux d'échec qui ouvre le circuit
+    'MIN_CALLS': 5,          # nombre d'appels minimum dans la fenêtre
+    'WINDOW': 60,            # fenêtre glissante (secondes)
+    'OPEN_SECONDS': 30,      # durée d'ouverture avant les appels de test
+    'HALF_OPEN_CALLS': 1,    # appels de test autorisés en semi-ouvert
+    'MAX_SAMPLES': 100,      # résultats conservés au plus dans la fenêtre
+}
+
+
+class CircuitOpenError(Exception):
+    """Levée quand un appel est refusé parce que le circuit est ouvert."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit {name} ouvert (réessayer dans {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur fermé / ouvert / semi-ouvert.
+
+    L'état (résultats récents, date d'ouverture, appels de test) est stocké
+    dans le cache Django : partagé entre workers dès que le cache l'est
+    (Redis, Memcached). Les mises à jour ne sont pas atomiques, ce qui suffit
+    pour un disjoncteur (au pire un appel de test supplémentaire).
+    """
+
+    def __init__(self, name, **options):
+        config = {**DEFAULTS, **getattr(settings, 'NOTIFICATION_CIRCUIT_BREAKER', {}), **options}
+        self.name = name
+        self.failure_rate = config['FAILURE_RATE']
+        self.min_calls = config['MIN_CALLS']
+        self.window = config['WINDOW']
+        self.open_seconds = config['OPEN_SECONDS']
+        self.half_open_calls = config['HALF_OPEN_CALLS']
+        self.max_samples = config['MAX_SAMPLES']
+        self.cache_key = f"notifications:circuit:{name}"
+
+    # --- État partagé ---
+    def _load(self):
+        return cache.get(self.cache_key) or {'state': CLOSED, 'outcomes': [], 'opened_at': None, 'probes': 0}
+
+    def _save(self, data):
+        cache.set(self.cache_key, data, timeout=None)
+
+    def _current(self, data, now):
+        if data['state'] == OPEN and now - data['opened_at'] >= self.open_seconds:
+            data.update(state=HALF_OPEN, probes=0)
+        return data
+
+    @property
+    def state(self):
+        return self._current(self._load(), time.time())['state']
+
+    def status(self):
+        now = time.time()
+        data = self._current(self._load(), now)
+        # Mêmes résultats que ceux pris en compte pour ouvrir le circuit
+        outcomes = self._recent(data['outcomes'], now)
+        failures = sum(1 for _, ok in outcomes if not ok)
+        return {
+            'state': data['state'],
+            'calls': len(outcomes),
+            'failures': failures,
+            'retry_after': self.retry_after(data),
+        }
+
+    def retry_after(self, data=None):
+        data = data or self._load()
+        if data['state'] != OPEN:
+            return 0
+        return max(0.0, data['opened_at'] + self.open_seconds - time.time())
+
+    def reset(self):
+        cache.delete(self.cache_key)
+
+    # --- Transitions ---
+    def allow(self):
+        """Autorise l'appel ? En semi-ouvert, consomme un appel de test."""
+        now = time.time()
+        data = self._current(self._load(), now)
+        if data['state'] == CLOSED:
+            return True
+        if data['state'] == HALF_OPEN and data['probes'] < self.half_open_calls:
+            data['probes'] += 1
+            self._save(data)
+            return True
+        return False
+
+    def record_success(self):
+        now = time.time()
+        data = self._current(self._load(), now)
+        if data['state'] == HALF_OPEN:
+            self._transition(data, CLOSED)
+            data.update(outcomes=[], probes=0, opened_at=None)
+        else:
+            self._append(data, now, True)
+        self._save(data)
+
+    def record_failure(self):
+        now = time.time()
+        data = self._current(self._load(), now)
+        if data['state'] == HALF_OPEN:
+            self._open(data, now)
+        else:
+            self._append(data, now, False)
+            failures = sum(1 for _, ok in data['outcomes'] if not ok)
+            calls = len(data['outcomes'])
+            if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                self._open(data, now)
+        self._save(data)
+
+    def _recent(self, outcomes, now):
+        """Résultats encore dans la fenêtre glissante."""
+        return [(ts, success) for ts, success in outcomes if now - ts < self.window]
+
+    def _append(self, data, now, ok):
+        outcomes = self._recent(data['outcomes'], now)
+        outcomes.append((now, ok))
+        data['outcomes'] = outcomes[-self.max_samples:]
+
+    def _open(self, data, now):
+        self._transition(data, OPEN)
+        data.update(opened_at=now, probes=0, outcomes=[])
+
+    def _transition(self, data, state):
+        if data['state'] != state:
+            logger.warning("[CircuitBreaker] %s : %s → %s", self.name, data['state'], state)
+            metrics.inc('notifications_circuit_transitions_total', {'circuit': self.name, 'state': state})
+        data['state'] = state
+
+    def call(self, func, *args, **kwargs):
+        """Exécute func à travers le disjoncteur (CircuitOpenError si ouvert)."""
+        if not self.allow():
+            metrics.inc('notifications_circuit_rejected_total', {'circuit': self.name})
+            raise CircuitOpenError(self.name, self.retry_after())
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+_breakers = {}
+
+
+def get_breaker(name, **options):
+    """Disjoncteur nommé (un par classe d'urgence, un par canal)."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name, **options)
+    return breaker
+
+
+def breakers_status():
+    """État de tous les disjoncteurs connus de ce process."""
+    return {name: breaker.status() for name, breaker in sorted(_breakers.items())}
@@ -0,0 +1,31 @@
+# notifications/consumers.py
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .realtime import user_group
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """
+    WebSocket d'un utilisateur connecté : reçoit les notifications qui lui
+    sont destinées (groupe utilisateur). Une alerte ciblant un groupe Django
+    crée une notification par membre : elle arrive aussi par ce groupe.
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
+
+        self.groups_joined = [user_group(user.pk)]
+        for group in self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        for group in getattr(self, 'groups_joined', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def notification_new(self, event):
+        await self.send_json(event['notification'])
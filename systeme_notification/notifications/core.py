@@ -1,11 +1,10 @@
-from .decorators import (
-    AddPerformanceTracking,
-    AutoConfigurationValidation,
-    RegisterInGlobalRegistry,
-    AddCircuitBreaker,
-    message
-)
+import logging
+
+from .decorators import EvacuationPipeline, message
+from .audience import Audience
 from .descriptors import TimeWindowDescriptor
+from .dispatch import NotificationDispatcher
+from .tracing import trace
 
 # Mixins pour fonctionnalités transverses
 class AlarmMixin:
@@ -19,85 +18,118 @@ class SpeakerMixin:
         return "Haut-parleur activé"
 
 class NotificationMixin:
+    dispatcher_class = NotificationDispatcher
+
     @message
     def send_notifications(self, message, destinataire=None):
-        notif = f"Notification envoyée : {message}"
-        print(notif)
-        return notif
+        """Crée une Notification par destinataire (audience ciblée, sinon tous les actifs)."""
+        if destinataire is None:
+            destinataire = getattr(self, 'audience', None)
+        result = self.dispatcher_class().dispatch(
+            message,
+            destinataires=destinataire,
+            priority=getattr(self, 'priority', 'LOW'),
+        )
+        trace("Notification envoyée : %s", message, level=logging.INFO)
+        return result
 
 # Classe de base pour les urgences
 class Urgence:
     time_window = TimeWindowDescriptor()  # Validation de la plage horaire
+    priority = 'URGENT'  # Priorité des notifications envoyées
+    slug = None  # Segment d'URL : /api/evacuation/<slug>/
+    label = None
+    audience = None  # Audience ciblée (tous les utilisateurs actifs si None)
+
+    def cibler(self, groups=(), buildings=(), zones=(), roles=()):
+        """Restreint l'alerte à des groupes, bâtiments, zones et/ou rôles."""
+        self.audience = Audience(groups=groups, buildings=buildings, zones=zones, roles=roles)
+        return self
 
     def evacuer(self):
-        print("Évacuation générique...")
+        trace("Évacuation générique...", level=logging.INFO)
 
-# Exemple de sous-classe Epidemie avec tous les décorateurs appliqués
-@AddPerformanceTracking()
-@AutoConfigurationValidation()
-@RegisterInGlobalRegistry()
-@AddCircuitBreaker()
+# Exemple de sous-classe Epidemie avec toutes les étapes (suivi, validation,
+# registre, disjoncteur) fusionnées par EvacuationPipeline
+@EvacuationPipeline()
 class Epidemie(Urgence, AlarmMixin, SpeakerMixin, NotificationMixin):
     required_fields = ['nom']
+    slug = 'epidemie'
+    label = 'Épidémie'
+    priority = 'HIGH'
 
     def __init__(self, nom="Epidemie"):
         self.nom = nom
 
     @message
     def evacuer(self):
-        print(f"Évacuation à cause de {self.nom}")
+        trace("Évacuation à cause de %s", self.nom, level=logging.INFO)
         self.set_alarm()
         self.speaker()
-        self.send_notifications("Portez un masque")
+        return self.send_notifications("Portez un masque")
 
 # Autres urgences possibles
-@AddPerformanceTracking()
-@AutoConfigurationValidation()
-@RegisterInGlobalRegistry()
-@AddCircuitBreaker()
+@EvacuationPipeline()
 class Incendie(Urgence, AlarmMixin, SpeakerMixin, NotificationMixin):
     required_fields = ['nom']
+    slug = 'incendie'
+    label = 'Incendie'
 
     def __init__(self, nom="Incendie"):
         self.nom = nom
 
     @message
     def evacuer(self):
-        print(f"Évacuation à cause de {self.nom}")
+        trace("Évacuation à cause de %s", self.nom, level=logging.INFO)
         self.set_alarm()
         self.speaker()
-        self.send_notifications("Evacuez immédiatement")
+        return self.send_notifications("Evacuez immédiatement")
 
-@AddPerformanceTracking()
-@AutoConfigurationValidation()
-@RegisterInGlobalRegistry()
-@AddCircuitBreaker()
+@EvacuationPipeline()
 class Innondation(Urgence, AlarmMixin, SpeakerMixin, NotificationMixin):
     required_fields = ['nom']
+    slug = 'innondation'
+    label = 'Innondation'
 
     def __init__(self, nom="Innondation"):
         self.nom = nom
 
     @message
     def evacuer(self):
-        print(f"Évacuation à cause de {self.nom}")
+        trace("Évacuation à cause de %s", self.nom, level=logging.INFO)
         self.set_alarm()
         self.speaker()
-        self.send_notifications("Montez à l'étage")
+        return self.send_notifications("Montez à l'étage")
 
-@AddPerformanceTracking()
-@AutoConfigurationValidation()
-@RegisterInGlobalRegistry()
-@AddCircuitBreaker()
+@EvacuationPipeline()
 class Securite(Urgence, AlarmMixin, SpeakerMixin, NotificationMixin):
     required_fields = ['nom']
+    slug = 'securite'
+    label = 'Sécurité'
 
     def __init__(self, nom="Securite"):
         self.nom = nom
 
     @message
     def evacuer(self):
-        print(f"Évacuation à cause de {self.nom}")
+        trace("Évacuation à cause de %s", self.nom, level=logging.INFO)
+        self.set_alarm()
+        self.speaker()
+        return self.send_notifications("Suivez les consignes de sécurité")
+
+
+# Base des urgences définies en base ou en YAML (notifications/emergencies.py) :
+# la sous-classe générée ne fournit que nom, consigne, priority, slug et label
+class UrgenceConfigurable(Urgence, AlarmMixin, SpeakerMixin, NotificationMixin):
+    required_fields = ['nom']
+    consigne = None
+
+    def __init__(self, nom=None):
+        self.nom = nom or self.label
+
+    @message
+    def evacuer(self):
+        trace("Évacuation à cause de %s", self.nom, level=logging.INFO)
         self.set_alarm()
         self.speaker()
-        self.send_notifications("Suivez les consignes de sécurité")
+        return self.send_notifications(self.consigne)
@@ -0,0 +1,281 @@
+# notifications/counters.py
+
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import (
+    Notification, NotificationAck, NotificationArchive, NotificationRollup, UserNotificationCounter,
+)
+
+
+def truncate_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def record_notifications(notifications):
+    """
+    Incrémente les compteurs pour des notifications tout juste créées.
+
+    Une mise à jour F() par couple (heure, priorité), et une par incrément
+    distinct côté utilisateurs (une seule pour un fan-out classique).
+    """
+    if not notifications:
+        return
+
+    buckets = Counter(
+        (truncate_hour(n.created_at or timezone.now()), n.priority) for n in notifications
+    )
+    per_user = defaultdict(lambda: [0, 0])
+    for n in notifications:
+        if n.destinataire_id is not None:
+            per_user[n.destinataire_id][0] += 1
+            per_user[n.destinataire_id][1] += n.priority == 'HIGH'
+
+    with transaction.atomic():
+        NotificationRollup.objects.bulk_create(
+            [NotificationRollup(hour=hour, priority=priority) for hour, priority in buckets],
+            ignore_conflicts=True,
+        )
+        for (hour, priority), count in buckets.items():
+            NotificationRollup.objects.filter(hour=hour, priority=priority).update(
+                count=F('count') + count
+            )
+
+        if not per_user:
+            return
+        UserNotificationCounter.objects.bulk_create(
+            [UserNotificationCounter(user_id=user_id) for user_id in per_user],
+            ignore_conflicts=True,
+        )
+        # unread ne compte que les notifications au-delà du curseur relu par
+        # l'UPDATE : une ligne d'id inférieur validée après un mark_all_read
+        # est déjà couverte par le curseur, elle n'est pas comptée non lue
+        # (cas courant : curseur sous le lot, sous-requête évaluée seulement sinon)
+        pks = [n.pk for n in notifications if n.destinataire_id is not None]
+        increments = defaultdict(list)
+        for user_id, (total, high) in per_user.items():
+            increments[(total, high)].append(user_id)
+        for (total, high), user_ids in increments.items():
+            UserNotificationCounter.objects.filter(user_id__in=user_ids).update(
+                total=F('total') + total,
+                unread=F('unread') + Case(
+                    When(last_read_id__lt=min(pks), then=Value(total)),
+                    default=_count(Notification.objects.filter(
+                        pk__in=pks, destinataire=OuterRef('user_id'), pk__gt=OuterRef('last_read_id'),
+                    )),
+                ),
+                high_priority=F('high_priority') + high,
+            )
+
+
+def _count(queryset):
+    """Sous-requête COUNT(*) corrélée (0 si aucune ligne)."""
+    return Coalesce(Subquery(
+        queryset.order_by().values('destinataire').annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def unread_per_user(rows):
+    """
+    {utilisateur: non lues} parmi des couples (id, destinataire_id) : au-delà
+    du curseur de lecture et sans acquittement. À appeler avant la suppression
+    (les acquittements partent en cascade).
+    """
+    rows = [(pk, user_id) for pk, user_id in rows if user_id is not None]
+    if not rows:
+        return {}
+    cursors = dict(
+        UserNotificationCounter.objects.filter(user_id__in={user_id for _, user_id in rows})
+        .values_list('user_id', 'last_read_id')
+    )
+    acked = set(
+        NotificationAck.objects.filter(notification_id__in=[pk for pk, _ in rows])
+        .values_list('notification_id', flat=True)
+    )
+    unread = Counter(
+        user_id for pk, user_id in rows
+        if user_id in cursors and pk > cursors[user_id] and pk not in acked
+    )
+    return dict(unread)
+
+
+def _decrement_users(per_user):
+    """Applique {utilisateur: (total, unread, high)} : un UPDATE par décrément distinct."""
+    decrements = defaultdict(list)
+    for user_id, amounts in per_user.items():
+        if any(amounts):
+            decrements[amounts].append(user_id)
+    for (total, unread, high), user_ids in decrements.items():
+        UserNotificationCounter.objects.filter(user_id__in=user_ids).update(
+            total=Greatest(F('total') - total, 0),
+            unread=Greatest(F('unread') - unread, 0),
+            high_priority=Greatest(F('high_priority') - high, 0),
+        )
+
+
+def forget_notifications(notifications):
+    """
+    Inverse de record_notifications pour des notifications sur le point
+    d'être supprimées : agrégats horaires et compteurs des destinataires.
+    """
+    if not notifications:
+        return
+    buckets = Counter((truncate_hour(n.created_at), n.priority) for n in notifications if n.created_at)
+    unread = unread_per_user((n.pk, n.destinataire_id) for n in notifications)
+    per_user = defaultdict(lambda: [0, 0])
+    for n in notifications:
+        if n.destinataire_id is not None:
+            per_user[n.destinataire_id][0] += 1
+            per_user[n.destinataire_id][1] += n.priority == 'HIGH'
+
+    with transaction.atomic():
+        for (hour, priority), count in buckets.items():
+            NotificationRollup.objects.filter(hour=hour, priority=priority).update(
+                count=Greatest(F('count') - count, 0)
+            )
+        _decrement_users({
+            user_id: (total, unread.get(user_id, 0), high)
+            for user_id, (total, high) in per_user.items()
+        })
+
+
+def forget_unread(unread):
+    """Retire {utilisateur: n} des non lues (notifications archivées, voir unread_per_user)."""
+    _decrement_users({user_id: (0, count, 0) for user_id, count in unread.items()})
+
+
+def user_counters(user):
+    """Compteurs d'un utilisateur (zéros s'il n'a encore rien reçu)."""
+    counter = UserNotificationCounter.objects.filter(user=user).first()
+    return counter or UserNotificationCounter(user=user)
+
+
+def with_acks(queryset, user):
+    """Ajoute acked (Exists) aux notifications : l'état de lecture vient avec la page."""
+    return queryset.annotate(acked=Exists(
+        NotificationAck.objects.filter(user=user, notification=OuterRef('pk'))
+    ))
+
+
+def annotate_read(notifications, counter):
+    """Pose is_read : couverte par le curseur ou acquittée (voir with_acks)."""
+    for n in notifications:
+        n.is_read = n.pk <= counter.last_read_id or getattr(n, 'acked', False)
+    return notifications
+
+
+def mark_all_read(user):
+    """
+    Tout marquer comme lu en un seul UPDATE : le curseur avance au dernier
+    id de la table (sous-requête sur la clé primaire) et unread est recalculé
+    sur les notifications au-delà de ce curseur (sans acquittement), au lieu
+    d'être remis à 0 : un écart laissé par une insertion concurrente disparaît.
+    Retourne le nombre de compteurs mis à jour (0 si rien n'a jamais été reçu).
+    """
+    newest = Notification.objects.order_by('-pk').values('pk')[:1]
+    return UserNotificationCounter.objects.filter(user=user).update(
+        unread=_count(
+            Notification.objects
+            .filter(destinataire=OuterRef('user_id'), pk__gt=Coalesce(Subquery(newest), OuterRef('last_read_id')))
+            .filter(~Exists(NotificationAck.objects.filter(notification=OuterRef('pk'))))
+        ),
+        last_read_id=Coalesce(Subquery(newest), F('last_read_id')),
+        last_read_at=timezone.now(),
+    )
+
+
+def acknowledge(user, notification):
+    """
+    Marque une notification du destinataire comme lue. Retourne False si
+    elle l'était déjà (curseur ou acquittement existant) ; sinon décrémente unread.
+    """
+    with transaction.atomic():
+        # Verrou : sérialise avec mark_all_read et les autres acquittements
+        counter = UserNotificationCounter.objects.select_for_update().filter(user=user).first()
+        if counter is None or notification.pk <= counter.last_read_id:
+            return False
+        _, created = NotificationAck.objects.get_or_create(user=user, notification=notification)
+        if created:
+            UserNotificationCounter.objects.filter(user=user, unread__gt=0).update(unread=F('unread') - 1)
+        return created
+
+
+@transaction.atomic
+def rebuild_counters():
+    """
+    Recalcule tous les compteurs depuis la table Notification et son archive
+    (notifications/retention.py) ; les notifications archivées comptent comme lues.
+    """
+    # L'état de lecture (curseurs, acquittements) est conservé
+    cursors = {
+        user_id: (last_read_id, last_read_at)
+        for user_id, last_read_id, last_read_at in UserNotificationCounter.objects.values_list(
+            'user_id', 'last_read_id', 'last_read_at'
+        )
+    }
+    users = list(
+        Notification.objects
+        .filter(destinataire__isnull=False)
+        .values('destinataire')
+        .annotate(
+            total=Count('id', distinct=True),
+            high=Count('id', filter=Q(priority='HIGH'), distinct=True),
+            unread=Count('id', distinct=True, filter=Q(
+                id__gt=Coalesce(F('destinataire__notification_counter__last_read_id'), 0),
+                acks__isnull=True,
+            )),
+        )
+        .order_by()
+    )
+    archived = {
+        row['destinataire']: row
+        for row in NotificationArchive.objects
+        .filter(destinataire__isnull=False)
+        .values('destinataire')
+        .annotate(total=Count('id'), high=Count('id', filter=Q(priority='HIGH')))
+        .order_by()
+    }
+    for row in users:
+        extra = archived.pop(row['destinataire'], None)
+        if extra:
+            row['total'] += extra['total']
+            row['high'] += extra['high']
+    users.extend({**row, 'unread': 0} for row in archived.values())
+
+    NotificationRollup.objects.all().delete()
+    UserNotificationCounter.objects.all().delete()
+
+    rollups = Counter()
+    for model in (Notification, NotificationArchive):
+        for row in (
+            model.objects
+            .annotate(hour=TruncHour('created_at'))
+            .values('hour', 'priority')
+            .annotate(count=Count('id'))
+            .order_by()
+        ):
+            rollups[(row['hour'], row['priority'])] += row['count']
+    NotificationRollup.objects.bulk_create(
+        [NotificationRollup(hour=hour, priority=priority, count=count)
+         for (hour, priority), count in rollups.items()],
+        batch_size=1000,
+    )
+
+    UserNotificationCounter.objects.bulk_create(
+        [
+            UserNotificationCounter(
+                user_id=row['destinataire'], total=row['total'],
+                unread=row['unread'], high_priority=row['high'],
+                last_read_id=cursors.get(row['destinataire'], (0, None))[0],
+                last_read_at=cursors.get(row['destinataire'], (0, None))[1],
+            )
+            for row in users
+        ],
+        batch_size=1000,
+    )
+    return NotificationRollup.objects.count(), UserNotificationCounter.objects.count()
@@ -1,37 +1,67 @@
+import functools
+import logging
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+from .circuit_breaker import CircuitOpenError, get_breaker
 from .descriptors import TimeWindowDescriptor
-from .registry import GlobalRegistry  
+from .metrics import LATENCY_BUCKETS, metric_key, registry as metrics
+from .registry import GlobalRegistry
+from .tracing import enabled, logger, trace
 
 # Décorateur de méthode
 def message(func):
     """Trace les appels de méthode avant et après exécution."""
+    name = func.__name__
+
+    @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
-        print(f"[Message] → Appel de {func.__name__}()")
+        # Trace coupée : aucun formatage, un seul test de niveau
+        if not enabled():
+            return func(self, *args, **kwargs)
+        logger.debug("[Message] → Appel de %s()", name)
         result = func(self, *args, **kwargs)
-        print(f"[Message] ← Fin de {func.__name__}() → {result}")
+        logger.debug("[Message] ← Fin de %s() → %s", name, result)
         return result
+    # Repéré par EvacuationPipeline, qui fait cette trace dans son propre wrapper
+    wrapper.__message_traced__ = True
     return wrapper
 
 
 
 # Décorateurs de classes
 class AddPerformanceTracking:
-    """Mesure les performances de la méthode evacuer()."""
+    """
+    Mesure les performances de la méthode evacuer() : latence (perf_counter_ns)
+    et nombre d'appels / d'erreurs, enregistrés dans notifications.metrics.
+    """
     def __call__(self, cls):
         if hasattr(cls, "evacuer"):
             original = cls.evacuer
+            labels = {'emergency': cls.__name__}
 
+            @functools.wraps(original)
             def tracked(self, *args, **kwargs):
-                start = time.time()
                 start_time = datetime.now()
-                print(f"[Performance] Début {cls.__name__}.evacuer à {start_time.strftime('%H:%M:%S')}")
-                result = original(self, *args, **kwargs)
-                end = time.time()
-                end_time = datetime.now()
-                self.time_window = (start_time, end_time)
-                print(f"[Performance] Fin {cls.__name__}.evacuer ({end - start:.3f}s)")
-                return result
+                start = time.perf_counter_ns()
+                trace("[Performance] Début %s.evacuer à %s", cls.__name__, start_time)
+                result = None
+                try:
+                    result = original(self, *args, **kwargs)
+                    return result
+                finally:
+                    elapsed_ns = time.perf_counter_ns() - start
+                    metrics.observe('notifications_evacuation_duration_seconds', elapsed_ns / 1e9, labels)
+                    metrics.inc('notifications_evacuation_calls_total', labels)
+                    if result is None:
+                        # Exception levée ou interceptée par AddCircuitBreaker
+                        metrics.inc('notifications_evacuation_errors_total', labels)
+                    # Fenêtre d'exécution dérivée de l'horloge monotone (fin > début)
+                    self.time_window = (
+                        start_time,
+                        start_time + timedelta(microseconds=max(1, elapsed_ns // 1000)),
+                    )
+                    trace("[Performance] Fin %s.evacuer (%.3fs)", cls.__name__, elapsed_ns / 1e9,
+                          level=logging.INFO)
 
             cls.evacuer = tracked
         return cls
@@ -42,6 +72,7 @@ class AutoConfigurationValidation:
     def __call__(self, cls):
         original_init = cls.__init__
 
+        @functools.wraps(original_init)
         def new_init(self, *args, **kwargs):
             original_init(self, *args, **kwargs)
             if hasattr(cls, 'required_fields'):
@@ -55,22 +86,133 @@ class AutoConfigurationValidation:
 class RegisterInGlobalRegistry:
     """Enregistre la classe décorée dans le registre global."""
     def __call__(self, cls):
-        GlobalRegistry.register(cls.__name__, cls) 
-        print(f"[Registry] Classe enregistrée : {cls.__name__}")
+        GlobalRegistry.register(cls.__name__, cls)
+        trace("[Registry] Classe enregistrée : %s", cls.__name__)
         return cls
 
 
 class AddCircuitBreaker:
-    """Empêche les pannes critiques lors d'erreurs dans evacuer()."""
+    """
+    Protège evacuer() par un disjoncteur propre à la classe : les erreurs sont
+    interceptées (None est renvoyé) et, au-delà du taux d'échec configuré,
+    le circuit s'ouvre et les appels suivants échouent immédiatement.
+    """
     def __call__(self, cls):
         if hasattr(cls, "evacuer"):
             original = cls.evacuer
+            breaker = get_breaker(cls.__name__)
 
+            @functools.wraps(original)
             def safe(self, *args, **kwargs):
                 try:
-                    return original(self, *args, **kwargs)
+                    return breaker.call(original, self, *args, **kwargs)
+                except CircuitOpenError as e:
+                    logger.warning("[CircuitBreaker] Appel refusé pour %s : %s", cls.__name__, e)
+                    return None
                 except Exception as e:
-                    print(f"[CircuitBreaker] Erreur interceptée dans {cls.__name__} : {e}")
+                    logger.warning("[CircuitBreaker] Erreur interceptée dans %s : %s", cls.__name__, e)
                     return None
             cls.evacuer = safe
         return cls
+
+
+class EvacuationPipeline:
+    """
+    Équivalent fusionné de AddPerformanceTracking, AutoConfigurationValidation,
+    RegisterInGlobalRegistry et AddCircuitBreaker (et du @message d'evacuer) :
+    un seul wrapper par classe, construit à la définition, au lieu d'une pile
+    de frames par appel. Chaque étape peut être désactivée.
+    """
+    def __init__(self, tracking=True, validation=True, registry=True, breaker=True):
+        self.tracking = tracking
+        self.validation = validation
+        self.registry = registry
+        self.breaker = breaker
+
+    def __call__(self, cls):
+        if self.validation:
+            self._validate_init(cls)
+        if self.registry:
+            GlobalRegistry.register(cls.__name__, cls)
+            trace("[Registry] Classe enregistrée : %s", cls.__name__)
+        if hasattr(cls, "evacuer"):
+            cls.evacuer = self._evacuer(cls, cls.evacuer)
+        return cls
+
+    def _validate_init(self, cls):
+        # Champs déjà fournis par la classe : inutile de les revérifier à chaque instance
+        required = tuple(f for f in getattr(cls, 'required_fields', ()) if not hasattr(cls, f))
+        if not required:
+            return
+        original_init = cls.__init__
+        name = cls.__name__
+
+        @functools.wraps(original_init)
+        def __init__(self, *args, **kwargs):
+            original_init(self, *args, **kwargs)
+            for field in required:
+                if not hasattr(self, field):
+                    raise ValueError(f"[Validation] {name} manque le champ requis : {field}")
+        cls.__init__ = __init__
+
+    def _evacuer(self, cls, func):
+        traced = getattr(func, '__message_traced__', False)
+        if traced:
+            func = func.__wrapped__
+        tracking = self.tracking
+        breaker = get_breaker(cls.__name__) if self.breaker else None
+        name = cls.__name__
+        method = func.__name__
+        labels = {'emergency': name}
+        duration_key = metric_key('notifications_evacuation_duration_seconds', labels)
+        calls = (metric_key('notifications_evacuation_calls_total', labels),)
+        failed_calls = calls + (metric_key('notifications_evacuation_errors_total', labels),)
+        perf_counter_ns = time.perf_counter_ns
+
+        @functools.wraps(func)
+        def evacuer(self, *args, **kwargs):
+            if tracking:
+                start_time = datetime.now()
+                start = perf_counter_ns()
+                trace("[Performance] Début %s.evacuer à %s", name, start_time)
+            debug = traced and enabled()
+            result = None
+            try:
+                if debug:
+                    logger.debug("[Message] → Appel de %s()", method)
+                if breaker is None:
+                    result = func(self, *args, **kwargs)
+                elif not breaker.allow():
+                    metrics.inc('notifications_circuit_rejected_total', {'circuit': breaker.name})
+                    logger.warning("[CircuitBreaker] Appel refusé pour %s : %s",
+                                   name, CircuitOpenError(breaker.name, breaker.retry_after()))
+                else:
+                    try:
+                        result = func(self, *args, **kwargs)
+                    except Exception as e:
+                        breaker.record_failure()
+                        logger.warning("[CircuitBreaker] Erreur interceptée dans %s : %s", name, e)
+                    else:
+                        breaker.record_success()
+                if debug:
+                    logger.debug("[Message] ← Fin de %s() → %s", method, result)
+                return result
+            finally:
+                if tracking:
+                    elapsed_ns = perf_counter_ns() - start
+                    metrics.record(
+                        counters=calls if result is not None else failed_calls,
+                        observations=((duration_key, elapsed_ns / 1e9, LATENCY_BUCKETS),),
+                    )
+                    self.time_window = (
+                        start_time,
+                        start_time + timedelta(microseconds=max(1, elapsed_ns // 1000)),
+                    )
+                    trace("[Performance] Fin %s.evacuer (%.3fs)", name, elapsed_ns / 1e9,
+                          level=logging.INFO)
+
+        evacuer.__pipeline__ = tuple(
+            stage for stage, on in (('tracking', tracking), ('breaker', breaker is not None),
+                                    ('message', traced)) if on
+        )
+        return evacuer
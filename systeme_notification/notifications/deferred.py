@@ -0,0 +1,213 @@
+# notifications/deferred.py
+
+import heapq
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .delivery import Message, Recipient, deliver
+from .metrics import registry as metrics
+from .models import Notification, User
+from .tracing import trace
+
+
+# Priorités jamais différées : l'alerte part quelle que soit la fenêtre
+IMMEDIATE_PRIORITIES = frozenset({'URGENT'})
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_HORIZON = 300  # secondes : réveil maximal, rechargement des échéances
+DEFAULT_POLL = 1.0     # secondes entre deux lectures du signal de réveil partagé
+WAKEUP_KEY = 'notifications:deferred:wakeup'
+
+
+def due_at(priority, start, end, now=None):
+    """
+    Date de diffusion d'une notification, None si elle part tout de suite.
+
+    Les notifications non urgentes attendent l'ouverture de la fenêtre du
+    destinataire. Une fenêtre vide (début == fin, valeur par défaut),
+    inversée ou déjà expirée n'impose aucune contrainte.
+    """
+    if priority in IMMEDIATE_PRIORITIES or start is None or end is None:
+        return None
+    now = now or timezone.now()
+    if end <= start or end <= now or start <= now:
+        return None
+    return start
+
+
+class DeferredDeliveryScheduler:
+    """
+    Boucle de diffusion des notifications différées.
+
+    Un tas garde les prochaines échéances (lues par l'index partiel
+    notif_next_due_idx, jamais par un parcours de la table) ; la boucle dort
+    jusqu'à la première, ou jusqu'à notify() si une échéance plus proche est
+    ajoutée dans le process. Les échéances créées par d'autres process (web,
+    Celery) passent par un compteur en cache (schedule()), relu toutes les
+    `poll` secondes : elles sont vues avec au plus `poll` secondes de retard
+    si le cache est partagé (Redis, Memcached), au plus `horizon` secondes
+    sinon (LocMemCache est propre à chaque process).
+    """
+
+    def __init__(self, batch_size=None, horizon=None, poll=None):
+        config = getattr(settings, 'NOTIFICATION_DEFERRED', {})
+        self.batch_size = batch_size or config.get('BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.horizon = horizon or config.get('HORIZON', DEFAULT_HORIZON)
+        self.poll = poll or config.get('POLL', DEFAULT_POLL)
+        self.heap = []
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._signal = cache.get(WAKEUP_KEY)
+
+    # --- Échéances ---
+    def notify(self, due):
+        """Ajoute une échéance ; réveille la boucle si elle passe en tête."""
+        with self._lock:
+            earlier = not self.heap or due < self.heap[0]
+            heapq.heappush(self.heap, due)
+        if earlier:
+            self.wakeup.set()
+
+    def refill(self, now=None):
+        """Recharge le tas avec les échéances des `horizon` prochaines secondes."""
+        now = now or timezone.now()
+        upcoming = (
+            Notification.objects
+            .filter(next_due_at__lte=now + timedelta(seconds=self.horizon))
+            .order_by('next_due_at')
+            .values_list('next_due_at', flat=True)
+            .distinct()[:self.batch_size]
+        )
+        with self._lock:
+            self.heap = list(upcoming)
+            heapq.heapify(self.heap)
+
+    def timeout(self, now=None):
+        """Secondes à dormir avant la prochaine échéance (plafonnées à horizon)."""
+        now = now or timezone.now()
+        with self._lock:
+            if not self.heap:
+                return float(self.horizon)
+            return max(0.0, min(float(self.horizon), (self.heap[0] - now).total_seconds()))
+
+    def signalled(self):
+        """Vrai si un autre process a signalé une échéance depuis la dernière lecture."""
+        signal = cache.get(WAKEUP_KEY)
+        changed, self._signal = signal != self._signal, signal
+        return changed
+
+    def wait(self):
+        """
+        Dort jusqu'à la prochaine échéance, à notify(), ou au signal d'un
+        autre process (lu toutes les `poll` secondes).
+        """
+        deadline = time.monotonic() + self.timeout()
+        while not self.stopped.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.wakeup.wait(min(remaining, self.poll)):
+                break
+            if self.signalled():
+                break
+        self.wakeup.clear()
+
+    # --- Diffusion ---
+    def deliver_due(self, now=None):
+        """Diffuse les notifications échues, par lots ; retourne leur nombre."""
+        now = now or timezone.now()
+        total = 0
+        while True:
+            delivered = self._deliver_batch(now)
+            total += delivered
+            if delivered < self.batch_size:
+                break
+        if total:
+            metrics.inc('notifications_deferred_delivered_total', amount=total)
+            trace("[Deferred] %d notifications diffusées", total, level=logging.INFO)
+        return total
+
+    def claimable(self, now):
+        """
+        Notifications échues, verrouillées sans attendre celles d'une autre
+        boucle. Pas de jointure : PostgreSQL refuse FOR UPDATE du côté
+        nullable d'une jointure externe (destinataire) ; les coordonnées sont
+        lues ensuite.
+        """
+        return (
+            Notification.objects
+            .select_for_update(skip_locked=True)
+            .filter(next_due_at__lte=now)
+            .order_by('next_due_at')
+            .values_list('id', 'message', 'priority', 'created_at', 'destinataire_id')[:self.batch_size]
+        )
+
+    def _deliver_batch(self, now):
+        with transaction.atomic():
+            rows = list(self.claimable(now))
+            if not rows:
+                return 0
+            Notification.objects.filter(pk__in=[row[0] for row in rows]).update(next_due_at=None)
+            contacts = {
+                user_id: (email, phone)
+                for user_id, email, phone in User.objects.filter(
+                    pk__in={row[4] for row in rows if row[4] is not None}
+                ).values_list('id', 'email', 'phone_db')
+            }
+
+            # Un envoi par (texte, priorité) : les created_at d'un même fan-out
+            # diffèrent (auto_now_add par ligne), le plus ancien est retenu
+            grouped = defaultdict(list)
+            created = {}
+            for pk, text, priority, created_at, user_id in rows:
+                email, phone = contacts.get(user_id, ('', ''))
+                grouped[(text, priority)].append(Recipient(user_id, email or '', phone or '', pk))
+                created[(text, priority)] = min(created.get((text, priority), created_at), created_at)
+            for (text, priority), recipients in grouped.items():
+                message = Message(text, priority, created[(text, priority)])
+                transaction.on_commit(partial(deliver, recipients, message))
+        return len(rows)
+
+    def run(self, once=False):
+        """Boucle principale ; once=True diffuse les échéances puis rend la main."""
+        global _running
+        delivered = self.deliver_due()
+        if once:
+            return delivered
+        _running = self
+        try:
+            while not self.stopped.is_set():
+                self.refill()
+                self.wait()
+                delivered += self.deliver_due()
+        finally:
+            _running = None
+        return delivered
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+
+
+_running = None
+
+
+def schedule(due):
+    """
+    Signale une nouvelle échéance : directement à la boucle du process si
+    elle tourne, par le compteur en cache aux boucles des autres process.
+    """
+    if _running is not None:
+        _running.notify(due)
+    try:
+        cache.incr(WAKEUP_KEY)
+    except ValueError:
+        cache.add(WAKEUP_KEY, 1, timeout=None)
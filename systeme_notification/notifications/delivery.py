@@ -0,0 +1,232 @@
+# notifications/delivery.py
+
+import json
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from .circuit_breaker import CircuitOpenError, get_breaker
+from .metaclasses import ChannelMeta
+from .metrics import registry as metrics
+from .realtime import publish_payloads
+
+
+PLACEHOLDER_PHONE = '+0000000000'
+
+
+class Recipient(NamedTuple):
+    """Destinataire d'un envoi (coordonnées lues avec l'audience)."""
+    user_id: int
+    email: str = ''
+    phone: str = ''
+    notification_id: Optional[int] = None
+
+
+class Message(NamedTuple):
+    """Contenu d'un envoi, commun à tous les canaux."""
+    text: str
+    priority: str = 'LOW'
+    created_at: object = None
+
+
+class DeliveryChannel(metaclass=ChannelMeta):
+    """
+    Canal de diffusion. Chaque sous-classe reçoit channel_name via ChannelMeta
+    et implémente send_many() pour un lot de destinataires ; les ressources
+    coûteuses (connexion SMTP, session HTTP) sont ouvertes une fois et
+    réutilisées jusqu'à close().
+    """
+    abstract = True
+    batch_size = 500
+    max_concurrency = 4  # lots envoyés en parallèle au plus (limite de la passerelle)
+    timeout = None       # délai réseau d'un lot (s), fixé par l'exécuteur si absent
+
+    @classmethod
+    def accepts(cls, recipient):
+        """Le destinataire est-il joignable sur ce canal ?"""
+        return True
+
+    def send_many(self, recipients, message):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class Email(DeliveryChannel):
+    """E-mails envoyés sur une seule connexion SMTP (send_messages)."""
+    batch_size = 200
+    max_concurrency = 2
+
+    def __init__(self, connection=None, timeout=None):
+        self.connection = connection
+        self.timeout = timeout
+
+    @classmethod
+    def accepts(cls, recipient):
+        return bool(recipient.email)
+
+    def send_many(self, recipients, message):
+        if self.connection is None:
+            options = {'timeout': self.timeout} if self.timeout else {}
+            self.connection = get_connection(fail_silently=False, **options)
+            self.connection.open()
+        subject = f"[{message.priority}] Notification campus"
+        emails = [
+            EmailMessage(subject, message.text, to=[r.email], connection=self.connection)
+            for r in recipients
+        ]
+        return self.connection.send_messages(emails) or 0
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class Sms(DeliveryChannel):
+    """SMS envoyés par lots à la passerelle HTTP (session keep-alive)."""
+    batch_size = 100
+    max_concurrency = 2
+
+    def __init__(self, url=None, token=None, timeout=None):
+        config = getattr(settings, 'NOTIFICATION_SMS_GATEWAY', {})
+        self.url = url or config.get('URL')
+        self.token = token or config.get('TOKEN')
+        self.timeout = timeout or config.get('TIMEOUT', 5)
+        self.session = None
+
+    @classmethod
+    def accepts(cls, recipient):
+        return bool(recipient.phone) and recipient.phone != PLACEHOLDER_PHONE
+
+    def send_many(self, recipients, message):
+        import requests
+
+        if not self.url:
+            raise RuntimeError("NOTIFICATION_SMS_GATEWAY['URL'] n'est pas configuré")
+        if self.session is None:
+            self.session = requests.Session()
+            if self.token:
+                self.session.headers['Authorization'] = f"Bearer {self.token}"
+        response = self.session.post(
+            self.url,
+            json={'messages': [{'to': r.phone, 'text': message.text} for r in recipients]},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return len(recipients)
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+
+class Push(DeliveryChannel):
+    """Push temps réel vers les dashboards (couche Channels)."""
+    batch_size = 1000
+
+    def send_many(self, recipients, message):
+        created_at = message.created_at.isoformat() if message.created_at else None
+        return publish_payloads([
+            (r.user_id, {
+                'id': r.notification_id,
+                'message': message.text,
+                'priority': message.priority,
+                'created_at': created_at,
+            })
+            for r in recipients
+        ])
+
+
+class Memory(DeliveryChannel):
+    """Canal de test : conserve les envois dans Memory.outbox."""
+    outbox = []
+    _lock = threading.Lock()
+
+    def send_many(self, recipients, message):
+        with self._lock:
+            self.outbox.extend((r, message) for r in recipients)
+        return len(recipients)
+
+
+class File(DeliveryChannel):
+    """Canal local : une ligne JSON par envoi dans NOTIFICATION_FILE_CHANNEL_PATH."""
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'NOTIFICATION_FILE_CHANNEL_PATH', 'notifications-out.jsonl')
+        self.handle = None
+
+    def send_many(self, recipients, message):
+        if self.handle is None:
+            self.handle = open(self.path, 'a', encoding='utf-8')
+        self.handle.writelines(
+            json.dumps({'to': r.user_id, 'priority': message.priority, 'text': message.text},
+                       ensure_ascii=False) + '\n'
+            for r in recipients
+        )
+        self.handle.flush()
+        return len(recipients)
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+
+def channel_class(name):
+    """Classe de canal enregistrée sous channel_name."""
+    try:
+        return ChannelMeta.channels[name]
+    except KeyError:
+        raise ValueError(f"Canal inconnu : {name}. Disponibles : {', '.join(sorted(ChannelMeta.channels))}")
+
+
+def get_channel(name, **kwargs):
+    """Instancie un canal à partir de son channel_name."""
+    return channel_class(name)(**kwargs)
+
+
+def enabled_channels():
+    return list(getattr(settings, 'NOTIFICATION_CHANNELS', ['push']))
+
+
+def batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def send_batch(channel, batch, message):
+    """Envoie un lot via le disjoncteur du canal ; retourne le nombre d'envois."""
+    labels = {'channel': channel.channel_name}
+    start = time.perf_counter()
+    try:
+        sent = get_breaker(f"channel:{channel.channel_name}").call(channel.send_many, batch, message)
+    except CircuitOpenError:
+        metrics.inc('notifications_delivery_skipped_total', labels, len(batch))
+        raise
+    except Exception:
+        metrics.inc('notifications_delivery_errors_total', labels, len(batch))
+        raise
+    metrics.observe('notifications_delivery_batch_seconds', time.perf_counter() - start, labels)
+    metrics.inc('notifications_delivered_total', labels, sent)
+    return sent
+
+
+def deliver(recipients, message, channels=None):
+    """
+    Diffuse message à recipients sur chaque canal activé (voir
+    executor.DeliveryExecutor) ; retourne un DeliveryReport.
+    """
+    from .executor import get_executor
+    return get_executor().deliver(recipients, message, channels)
+
+
+async def deliver_async(recipients, message, channels=None):
+    """Variante de deliver() pour un contexte ASGI (n'occupe pas la boucle)."""
+    from .executor import get_executor
+    return await get_executor().deliver_async(recipients, message, channels)
@@ -7,6 +7,8 @@ class EmailDescriptor:
     Valide les adresses e-mail personnelles.
     Se base sur un pattern standard RFC5322 simplifié.
     """
+    PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
     def __get__(self, instance, owner):
         if instance is None:
             return self
@@ -15,7 +17,7 @@ class EmailDescriptor:
     def __set__(self, instance, value):
         if not value:
             raise ValueError("L'email personnel ne peut pas être vide.")
-        if not re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', value):
+        if not self.PATTERN.match(value):
             raise ValueError(f"Email invalide: {value}")
         instance.__dict__['_email_perso'] = value
 
@@ -27,6 +29,8 @@ class PhoneDescriptor:
     Valide le format des numéros de téléphone internationaux.
     Ex : +243970000000 (10 à 15 chiffres après le +)
     """
+    PATTERN = re.compile(r'^\+\d{10,15}$')
+
     def __get__(self, instance, owner):
         if instance is None:
             return self
@@ -35,7 +39,7 @@ class PhoneDescriptor:
     def __set__(self, instance, value):
         if not value:
             raise ValueError("Le numéro de téléphone ne peut pas être vide.")
-        if not re.match(r'^\+\d{10,15}$', value):
+        if not self.PATTERN.match(value):
             raise ValueError(f"Numéro de téléphone invalide: {value}")
         instance.__dict__['_phone'] = value
 
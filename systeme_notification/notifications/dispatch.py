@@ -0,0 +1,184 @@
+# notifications/dispatch.py
+
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .audience import Audience, audiences
+from .counters import record_notifications
+from .deferred import due_at, schedule
+from .descriptors import PriorityDescriptor
+from .metrics import FANOUT_BUCKETS, registry as metrics
+from .models import Notification, User
+from .delivery import Message, Recipient, deliver
+from .stats import invalidate_stats
+
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_TARGET_RATE = 5000  # lignes / seconde
+
+
+def deliver_on_commit(notifications, contacts):
+    """
+    Diffusion de notifications tout juste créées, une fois les lignes visibles
+    des autres connexions : un envoi (push, e-mail, SMS) par couple (message,
+    priorité) pour celles qui partent tout de suite, un réveil de la boucle
+    de deferred.py pour celles hors fenêtre. contacts : {user_id: (email, phone)}.
+    """
+    grouped = defaultdict(list)
+    for n in notifications:
+        if n.next_due_at is None and n.destinataire_id is not None:
+            grouped[(n.message, n.priority)].append(n)
+    for (text, priority), group in grouped.items():
+        recipients = [
+            Recipient(n.destinataire_id, *contacts.get(n.destinataire_id, ('', '')), n.pk) for n in group
+        ]
+        created_at = min(n.created_at for n in group)
+        transaction.on_commit(partial(deliver, recipients, Message(text, priority, created_at)))
+    deferred = [n.next_due_at for n in notifications if n.next_due_at is not None]
+    if deferred:
+        transaction.on_commit(partial(schedule, min(deferred)))
+
+
+@dataclass
+class DispatchResult:
+    """Résultat d'un fan-out : nombre de lignes créées et débit mesuré."""
+    created: int
+    elapsed: float
+    target_rate: int
+
+    @property
+    def rows_per_sec(self):
+        if self.elapsed <= 0:
+            return float(self.created)
+        return self.created / self.elapsed
+
+    @property
+    def meets_target(self):
+        return self.rows_per_sec >= self.target_rate
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'elapsed': round(self.elapsed, 4),
+            'rows_per_sec': round(self.rows_per_sec, 1),
+            'target_rate': self.target_rate,
+        }
+
+
+class NotificationDispatcher:
+    """
+    Fan-out d'un message vers une audience.
+
+    L'audience est résolue une seule fois (une requête pour les ids et
+    fenêtres horaires), les Notification sont construites en mémoire puis
+    écrites par blocs avec bulk_create dans une transaction.
+    """
+
+    def __init__(self, chunk_size=None, target_rate=None, record_fanout=True):
+        # False pour un bloc d'un fan-out plus large (le job observe la taille totale)
+        self.record_fanout = record_fanout
+        self.chunk_size = chunk_size or getattr(
+            settings, 'NOTIFICATION_DISPATCH_CHUNK_SIZE', DEFAULT_CHUNK_SIZE
+        )
+        self.target_rate = target_rate or getattr(
+            settings, 'NOTIFICATION_DISPATCH_TARGET_RATE', DEFAULT_TARGET_RATE
+        )
+
+    def resolve_audience(self, destinataires=None):
+        """
+        Retourne un queryset de tuples
+        (id, time_window_start, time_window_end, email, phone_db).
+
+        destinataires peut être None (tous les utilisateurs actifs), une
+        Audience, un User, un queryset de User ou un itérable d'ids.
+        """
+        if isinstance(destinataires, Audience):
+            destinataires = audiences.resolve(destinataires)
+        if destinataires is None:
+            users = User.objects.filter(is_active=True)
+        elif isinstance(destinataires, User):
+            users = User.objects.filter(pk=destinataires.pk)
+        elif hasattr(destinataires, 'model') and destinataires.model is User:
+            users = destinataires
+        else:
+            users = User.objects.filter(pk__in=list(destinataires))
+        return users.order_by('pk').values_list(
+            'id', 'time_window_start', 'time_window_end', 'email', 'phone_db'
+        )
+
+    def audience_ids(self, destinataires=None):
+        """Ids de l'audience (lus dans le cache d'ensembles pour une Audience)."""
+        if isinstance(destinataires, Audience) and destinataires:
+            return list(audiences.resolve(destinataires))
+        return list(self.resolve_audience(destinataires).values_list('id', flat=True))
+
+    def audience_chunks(self, destinataires=None):
+        """
+        Lignes d'audience par blocs de chunk_size. Une Audience est résolue
+        par le cache d'ensembles d'ids, puis lue bloc par bloc (pk__in borné).
+        """
+        if isinstance(destinataires, Audience):
+            destinataires = audiences.resolve(destinataires)
+        if destinataires is None or isinstance(destinataires, User) or hasattr(destinataires, 'model'):
+            chunk = []
+            for row in self.resolve_audience(destinataires).iterator(chunk_size=self.chunk_size):
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+            return
+        ids = list(destinataires)
+        for i in range(0, len(ids), self.chunk_size):
+            rows = list(self.resolve_audience(ids[i:i + self.chunk_size]))
+            if rows:
+                yield rows
+
+    def build(self, rows, message, priority):
+        """Construit les Notification en mémoire à partir des lignes d'audience."""
+        now = timezone.now()
+        return [
+            Notification(
+                message=message,
+                destinataire_id=user_id,
+                priority=priority,
+                time_window_start=start,
+                time_window_end=end,
+                next_due_at=due_at(priority, start, end, now),
+            )
+            for user_id, start, end, *_ in rows
+        ]
+
+    def dispatch(self, message, destinataires=None, priority='LOW'):
+        """Crée une Notification par destinataire et retourne un DispatchResult."""
+        if priority not in PriorityDescriptor.VALID_PRIORITIES:
+            raise ValueError(
+                f"Priorité invalide: {priority}. Attendu: {', '.join(PriorityDescriptor.VALID_PRIORITIES)}"
+            )
+
+        start = time.perf_counter()
+        created = 0
+        with transaction.atomic():
+            for rows in self.audience_chunks(destinataires):
+                created += self._write(rows, message, priority)
+            if created:
+                transaction.on_commit(invalidate_stats)
+        labels = {'priority': priority}
+        if self.record_fanout:
+            metrics.observe('notifications_dispatch_fanout', created, labels, buckets=FANOUT_BUCKETS)
+        metrics.inc('notifications_dispatched_total', labels, created)
+        return DispatchResult(created, time.perf_counter() - start, self.target_rate)
+
+    def _write(self, rows, message, priority):
+        notifications = self.build(rows, message, priority)
+        Notification.objects.bulk_create(notifications, batch_size=self.chunk_size)
+        record_notifications(notifications)
+        deliver_on_commit(notifications, {user_id: (email, phone) for user_id, _, _, email, phone in rows})
+        return len(notifications)
@@ -0,0 +1,218 @@
+# notifications/emergencies.py
+
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from .core import Epidemie, Incendie, Innondation, Securite, UrgenceConfigurable
+from .decorators import EvacuationPipeline
+from .descriptors import PriorityDescriptor
+from .models import EmergencyType
+from .registry import GlobalRegistry
+from .tracing import trace
+
+
+VERSION_KEY = 'notifications:emergencies:version'
+BUILTINS = (Epidemie, Incendie, Innondation, Securite)
+FIELDS = ('slug', 'name', 'label', 'consigne', 'priority')
+SLUG_PATTERN = re.compile(r'^[-a-zA-Z0-9_]+$')
+DEFAULT_CHECK_INTERVAL = 1.0  # secondes entre deux vérifications de version / fichier
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_version():
+    """
+    Demande à tous les process de recharger les types d'urgence : tout de
+    suite pour celui-ci, à leur prochaine vérification pour les autres.
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 2, timeout=None)
+    catalog.expire()
+
+
+@dataclass(frozen=True)
+class Emergency:
+    """Type d'urgence servi par l'API (les jobs instancient cls à chaque exécution)."""
+    cls: type
+
+    @property
+    def label(self):
+        return self.cls.label
+
+    @property
+    def priority(self):
+        return self.cls.priority
+
+
+def validate_definition(definition):
+    """Définition complète (FIELDS) ; ValueError sinon."""
+    missing = [field for field in FIELDS if not definition.get(field)]
+    if missing:
+        raise ValueError(f"champs manquants : {', '.join(missing)}")
+    if not SLUG_PATTERN.match(definition['slug']):
+        raise ValueError(f"slug invalide : {definition['slug']}")
+    if not definition['name'].isidentifier():
+        raise ValueError(f"nom de classe invalide : {definition['name']}")
+    if definition['priority'] not in PriorityDescriptor.VALID_PRIORITIES:
+        raise ValueError(f"priorité invalide : {definition['priority']}")
+
+
+def build_class(definition):
+    """Sous-classe de UrgenceConfigurable, passée par EvacuationPipeline (registre compris)."""
+    attrs = {field: definition[field] for field in ('slug', 'label', 'consigne', 'priority')}
+    attrs.update(__module__=__name__, __qualname__=definition['name'])
+    return EvacuationPipeline()(type(definition['name'], (UrgenceConfigurable,), attrs))
+
+
+def load_file(path):
+    """Définitions d'un fichier YAML : liste de {slug, name, label, consigne, priority}."""
+    import yaml
+
+    with open(path, encoding='utf-8') as f:
+        data = yaml.safe_load(f) or []
+    if not isinstance(data, list):
+        raise ValueError(f"{path} : liste de types d'urgence attendue")
+    return [dict(item) for item in data if isinstance(item, dict)]
+
+
+def load_database():
+    return list(EmergencyType.objects.filter(enabled=True).values(*FIELDS))
+
+
+class EmergencyCatalog:
+    """
+    Types d'urgence par slug : ceux du code (core.py), puis ceux du fichier
+    YAML (NOTIFICATION_EMERGENCY_TYPES_FILE), puis ceux de la base, qui
+    l'emportent. La table est un dictionnaire figé remplacé en bloc : une
+    recherche est un accès O(1) sans verrou. La version en cache
+    (modification d'un EmergencyType) et la date du fichier ne sont relues
+    qu'une fois par NOTIFICATION_EMERGENCY_CHECK_INTERVAL secondes : un
+    changement fait dans un autre process est vu au plus tard après ce
+    délai, sans redémarrer les workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+        self._next_check = 0.0
+        self._dynamic = {}
+        self._entries = MappingProxyType({cls.slug: Emergency(cls) for cls in BUILTINS})
+
+    def _file(self):
+        return getattr(settings, 'NOTIFICATION_EMERGENCY_TYPES_FILE', None)
+
+    def _current_state(self):
+        path = self._file()
+        try:
+            mtime = os.stat(path).st_mtime if path else None
+        except OSError:
+            mtime = None
+        return current_version(), path, mtime
+
+    def get(self, slug):
+        self.refresh()
+        return self._entries.get(slug)
+
+    def entries(self):
+        self.refresh()
+        return self._entries
+
+    def expire(self):
+        """La prochaine recherche revérifie la version et le fichier."""
+        self._next_check = 0.0
+
+    def reload(self):
+        """Relit le fichier et la base sans attendre un changement de version (cache non partagé)."""
+        with self._lock:
+            self._reload(self._current_state())
+        self._next_check = time.monotonic() + getattr(
+            settings, 'NOTIFICATION_EMERGENCY_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL
+        )
+
+    def refresh(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        interval = getattr(settings, 'NOTIFICATION_EMERGENCY_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+        self._next_check = now + interval
+        state = self._current_state()
+        if state == self._state:
+            return
+        with self._lock:
+            if state != self._state:
+                self._reload(state)
+
+    def _definitions(self, path):
+        definitions = {}
+        sources = []
+        if path:
+            sources.append((path, lambda: load_file(path)))
+        sources.append(('base', load_database))
+        for source, load in sources:
+            try:
+                items = load()
+            except (ImportError, OSError, ValueError, DatabaseError) as exc:
+                trace("[Urgences] %s ignoré : %s", source, exc, level=logging.WARNING)
+                continue
+            for item in items:
+                try:
+                    validate_definition(item)
+                except ValueError as exc:
+                    trace("[Urgences] %s : définition %s ignorée (%s)", source, item.get('slug'), exc,
+                          level=logging.WARNING)
+                    continue
+                definitions[item['slug']] = {field: item[field] for field in FIELDS}
+        return definitions
+
+    def _reload(self, state):
+        entries = {cls.slug: self._entries[cls.slug] for cls in BUILTINS}
+        reserved = {cls.__name__ for cls in BUILTINS}
+        dynamic = {}
+        for slug, definition in self._definitions(state[1]).items():
+            if slug in entries or definition['name'] in reserved:
+                trace("[Urgences] %s ignoré : slug ou nom de classe déjà utilisé", slug, level=logging.WARNING)
+                continue
+            previous = self._dynamic.get(definition['name'])
+            if previous is not None and previous[0] == definition:
+                cls = previous[1]  # Inchangée : même classe
+            else:
+                cls = build_class(definition)
+            dynamic[definition['name']] = (definition, cls)
+            reserved.add(definition['name'])
+            entries[slug] = Emergency(cls)
+
+        for name in self._dynamic.keys() - dynamic.keys():
+            GlobalRegistry.unregister(name)
+        self._dynamic = dynamic
+        self._entries = MappingProxyType(entries)
+        self._state = state
+        trace("[Urgences] %d types d'urgence chargés", len(entries), level=logging.INFO)
+
+    def clear(self):
+        with self._lock:
+            for name in self._dynamic:
+                GlobalRegistry.unregister(name)
+            self._dynamic = {}
+            self._entries = MappingProxyType({slug: self._entries[slug] for slug in (c.slug for c in BUILTINS)})
+            self._state = None
+            self._next_check = 0.0
+
+
+catalog = EmergencyCatalog()
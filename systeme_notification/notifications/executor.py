@@ -0,0 +1,225 @@
+# notifications/executor.py
+
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import wait
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .circuit_breaker import CircuitOpenError
+from .delivery import batches, channel_class, enabled_channels, send_batch
+from .metrics import registry as metrics
+from .scheduler import DEFAULT_AGING, PriorityScheduler
+from .tracing import logger, trace
+
+
+DEFAULTS = {
+    'TIMEOUT': 10,        # délai réseau d'une tentative d'envoi d'un lot (s)
+    'RETRIES': 2,         # nouvelles tentatives après un échec
+    'BACKOFF': 0.5,       # base du backoff exponentiel (s)
+    'BACKOFF_MAX': 5,     # plafond d'une attente entre deux tentatives (s)
+    'DEADLINE': 120,      # durée maximale d'une diffusion complète (s)
+    'CONCURRENCY': {},    # {canal: lots simultanés}, sinon max_concurrency du canal
+    'AGING': DEFAULT_AGING,  # secondes d'attente pour gagner un rang de priorité
+}
+
+
+@dataclass
+class DeliveryReport:
+    """Résultat d'une diffusion : envois réussis / échoués par canal, débit."""
+    sent: dict = field(default_factory=dict)
+    failed: dict = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def total_sent(self):
+        return sum(self.sent.values())
+
+    @property
+    def messages_per_sec(self):
+        if self.elapsed <= 0:
+            return float(self.total_sent)
+        return self.total_sent / self.elapsed
+
+    def as_dict(self):
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'elapsed': round(self.elapsed, 4),
+            'messages_per_sec': round(self.messages_per_sec, 1),
+        }
+
+
+class _ChannelSession:
+    """
+    Instances d'un canal pour une diffusion : un thread emprunte une instance
+    libre (connexion déjà ouverte) ou en crée une, puis la rend. Il n'y en a
+    jamais plus que de threads du canal ; une instance n'est jamais partagée.
+    """
+
+    def __init__(self, cls, timeout):
+        self.cls = cls
+        self.timeout = timeout
+        self.idle = queue.SimpleQueue()
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            channel = self.cls()
+            if channel.timeout is None:
+                channel.timeout = self.timeout
+            return channel
+
+    def release(self, channel):
+        with self._lock:
+            if not self.closed:
+                self.idle.put(channel)
+                return
+        channel.close()
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class DeliveryExecutor:
+    """
+    Diffusion concurrente : un PriorityScheduler par canal, avec autant de
+    threads que sa concurrence maximale (limite de débit de la passerelle),
+    partagé par toutes les diffusions du process ; les lots sont servis par
+    priorité du message. Chaque lot est retenté avec un backoff exponentiel à
+    gigue ; un disjoncteur ouvert n'est pas retenté.
+    """
+
+    def __init__(self, **options):
+        config = {**DEFAULTS, **getattr(settings, 'NOTIFICATION_DELIVERY', {}), **options}
+        self.timeout = config['TIMEOUT']
+        self.retries = config['RETRIES']
+        self.backoff = config['BACKOFF']
+        self.backoff_max = config['BACKOFF_MAX']
+        self.deadline = config['DEADLINE']
+        self.concurrency = dict(config['CONCURRENCY'])
+        self.aging = config['AGING']
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def max_concurrency(self, cls):
+        return max(1, self.concurrency.get(cls.channel_name, cls.max_concurrency))
+
+    def _pool(self, cls):
+        with self._lock:
+            pool = self._pools.get(cls.channel_name)
+            if pool is None:
+                pool = self._pools[cls.channel_name] = PriorityScheduler(
+                    cls.channel_name, self.max_concurrency(cls), aging=self.aging
+                )
+            return pool
+
+    def backoff_delay(self, attempt):
+        """Full jitter : uniforme entre 0 et base * 2^tentative (plafonné)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+    def _send(self, session, batch, message):
+        name = session.cls.channel_name
+        for attempt in range(self.retries + 1):
+            channel = session.acquire()
+            try:
+                sent = send_batch(channel, batch, message)
+            except CircuitOpenError as exc:
+                session.release(channel)
+                logger.warning("[Delivery] %s", exc)
+                return 0
+            except Exception as exc:
+                channel.close()  # connexion possiblement inutilisable
+                logger.warning("[Delivery] Échec d'un lot %s (tentative %d) : %s", name, attempt + 1, exc)
+                if attempt < self.retries:
+                    metrics.inc('notifications_delivery_retries_total', {'channel': name})
+                    time.sleep(self.backoff_delay(attempt))
+                continue
+            session.release(channel)
+            return sent
+        return 0
+
+    def deliver(self, recipients, message, channels=None):
+        """Diffuse sur tous les canaux en parallèle ; retourne un DeliveryReport."""
+        start = time.perf_counter()
+        report = DeliveryReport()
+        sessions, futures = [], {}
+        for name in channels or enabled_channels():
+            cls = channel_class(name)
+            session = _ChannelSession(cls, self.timeout)
+            sessions.append(session)
+            report.sent[name] = report.failed[name] = 0
+            pool = self._pool(cls)
+            reachable = [r for r in recipients if cls.accepts(r)]
+            for batch in batches(reachable, cls.batch_size):
+                future = pool.submit(message.priority, self._send, session, batch, message)
+                futures[future] = (name, len(batch))
+
+        done, pending = wait(futures, timeout=self.deadline)
+        for future in pending:
+            future.cancel()
+            name, size = futures[future]
+            report.failed[name] += size
+            metrics.inc('notifications_delivery_timeouts_total', {'channel': name}, size)
+        for future in done:
+            name, size = futures[future]
+            sent = future.result()
+            report.sent[name] += sent
+            report.failed[name] += size - sent
+        for session in sessions:
+            session.close()
+
+        report.elapsed = time.perf_counter() - start
+        metrics.observe('notifications_delivery_seconds', report.elapsed)
+        trace("[Delivery] %d envois en %.3fs → %.0f msg/s %s", report.total_sent, report.elapsed,
+              report.messages_per_sec, report.failed, level=logging.INFO)
+        return report
+
+    async def deliver_async(self, recipients, message, channels=None):
+        """deliver() depuis un contexte async : exécuté hors de la boucle d'événements."""
+        return await sync_to_async(self.deliver, thread_sensitive=False)(recipients, message, channels)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            pool.shutdown(wait=wait)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Exécuteur partagé du process (pools créés à la demande)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = DeliveryExecutor()
+        return _executor
+
+
+@receiver(setting_changed)
+def reset_executor(setting, **kwargs):
+    global _executor
+    if setting == 'NOTIFICATION_DELIVERY':
+        with _executor_lock:
+            executor, _executor = _executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
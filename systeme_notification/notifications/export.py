@@ -0,0 +1,137 @@
+# notifications/export.py
+
+import csv
+import itertools
+from dataclasses import dataclass
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .descriptors import PriorityDescriptor
+from .models import Notification, NotificationArchive
+
+
+DEFAULT_CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Colonnes exportées (projection values_list : pas d'instances de modèle)
+COLUMNS = (
+    'id', 'created_at', 'priority', 'destinataire_id', 'destinataire__username',
+    'message', 'time_window_start', 'time_window_end',
+)
+HEADER = ('id', 'created_at', 'priority', 'destinataire_id', 'destinataire',
+          'message', 'time_window_start', 'time_window_end')
+
+
+def parse_moment(value, end=False):
+    """Date ou date-heure ISO ; une date seule couvre toute la journée."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Date invalide : {value}")
+        moment = datetime.combine(day, time.max if end else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+@dataclass(frozen=True)
+class ExportFilters:
+    since: datetime = None
+    until: datetime = None
+    priorities: tuple = ()
+    user_id: int = None
+
+    @classmethod
+    def parse(cls, since=None, until=None, priorities=(), user=None):
+        """Filtres depuis des chaînes (requête HTTP, ligne de commande) ; ValueError si invalides."""
+        priorities = tuple(p for value in priorities for p in value.upper().split(',') if p)
+        unknown = set(priorities) - set(PriorityDescriptor.VALID_PRIORITIES)
+        if unknown:
+            raise ValueError(f"Priorité invalide : {', '.join(sorted(unknown))}")
+        try:
+            user_id = int(user) if user else None
+        except ValueError:
+            raise ValueError(f"Utilisateur invalide : {user}") from None
+        return cls(
+            since=parse_moment(since) if since else None,
+            until=parse_moment(until, end=True) if until else None,
+            priorities=priorities,
+            user_id=user_id,
+        )
+
+    def apply(self, queryset):
+        if self.since:
+            queryset = queryset.filter(created_at__gte=self.since)
+        if self.until:
+            queryset = queryset.filter(created_at__lte=self.until)
+        if self.priorities:
+            queryset = queryset.filter(priority__in=self.priorities)
+        if self.user_id is not None:
+            queryset = queryset.filter(destinataire_id=self.user_id)
+        return queryset
+
+
+def export_rows(filters=None, chunk_size=None, archived=True):
+    """
+    Tuples de COLUMNS dans l'ordre chronologique, lus par blocs avec
+    .iterator() : la mémoire reste constante quel que soit le volume.
+    archived : les lignes de NotificationArchive (plus anciennes) d'abord.
+    """
+    chunk_size = chunk_size or getattr(settings, 'NOTIFICATION_EXPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    filters = filters or ExportFilters()
+    models = (NotificationArchive, Notification) if archived else (Notification,)
+    return itertools.chain.from_iterable(
+        filters.apply(model.objects.all()).order_by('created_at', 'id')
+        .values_list(*COLUMNS).iterator(chunk_size=chunk_size)
+        for model in models
+    )
+
+
+class _Line:
+    """Tampon d'une ligne pour csv.writer (write retourne le texte écrit)."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _encode_csv(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(HEADER)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def _encode_ndjson(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(HEADER, row))) + '\n'
+
+
+def render(rows, fmt, lines_per_chunk=500):
+    """
+    Morceaux de texte de l'export, regroupés par lines_per_chunk lignes
+    (une écriture réseau par ligne coûterait plus cher que l'encodage).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Format inconnu : {fmt} (attendu : {', '.join(FORMATS)})")
+    lines = _encode_csv(rows) if fmt == 'csv' else _encode_ndjson(rows)
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= lines_per_chunk:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
@@ -0,0 +1,107 @@
+# notifications/idempotency.py
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .metrics import registry as metrics
+from .models import DispatchJob, IdempotencyKey
+
+
+DEFAULT_DEDUPE_WINDOW = 60       # secondes : même urgence + même audience = même job
+DEFAULT_IDEMPOTENCY_TTL = 86400  # secondes de mémorisation d'un Idempotency-Key en cache
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+class IdempotencyConflict(Exception):
+    """Idempotency-Key déjà utilisé pour une autre urgence."""
+
+
+def dedupe_key(emergency, audience=None):
+    """Empreinte stable d'un déclenchement : type d'urgence + critères d'audience."""
+    criteria = json.dumps(audience.as_dict() if audience else {}, sort_keys=True)
+    return hashlib.sha256(f"{emergency}|{criteria}".encode()).hexdigest()[:40]
+
+
+def _dedupe_cache_key(key):
+    return f"notifications:dedupe:{key}"
+
+
+def _idempotency_cache_key(key):
+    return f"notifications:idempotency:{key}"
+
+
+def _job(job_id):
+    return DispatchJob.objects.filter(pk=job_id).first() if job_id else None
+
+
+def find_job(idempotency_key, emergency):
+    """Job déjà renvoyé pour cet Idempotency-Key (cache, puis table IdempotencyKey)."""
+    job = _job(cache.get(_idempotency_cache_key(idempotency_key)))
+    if job is None:
+        binding = IdempotencyKey.objects.select_related('job').filter(key=idempotency_key).first()
+        job = binding.job if binding else None
+    if job is not None and job.emergency != emergency:
+        raise IdempotencyConflict(f"Idempotency-Key déjà utilisé pour {job.emergency}")
+    return job
+
+
+def get_or_create_job(obj_class, audience=None, idempotency_key=None):
+    """
+    Retourne (job, created). Un déclenchement identique (même urgence, même
+    audience) dans la fenêtre de déduplication retourne le job existant,
+    sauf s'il a échoué ; le premier arrivé est élu par cache.add (atomique).
+    L'Idempotency-Key est lié en base au job retourné, même dédupliqué :
+    un retry sur un autre process le retrouve sans dépendre du cache.
+    """
+    emergency = obj_class.__name__
+    job, created = _get_or_create(emergency, audience)
+    if idempotency_key:
+        job, created = _bind_key(idempotency_key, job, created, emergency)
+        cache.set(_idempotency_cache_key(idempotency_key), str(job.pk),
+                  timeout=getattr(settings, 'NOTIFICATION_IDEMPOTENCY_TTL', DEFAULT_IDEMPOTENCY_TTL))
+    return job, created
+
+
+def _bind_key(idempotency_key, job, created, emergency):
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=idempotency_key, job=job)
+    except IntegrityError:
+        # Requête concurrente avec la même clé : son job l'emporte, le nôtre
+        # (pas encore mis en file) est retiré
+        try:
+            winner = find_job(idempotency_key, emergency)
+        finally:
+            if created:
+                job.delete()
+        return winner, False
+    return job, created
+
+
+def _get_or_create(emergency, audience):
+    key = dedupe_key(emergency, audience)
+    window = getattr(settings, 'NOTIFICATION_DEDUPE_WINDOW', DEFAULT_DEDUPE_WINDOW)
+
+    existing = _job(cache.get(_dedupe_cache_key(key)))
+    if existing is not None and existing.status != DispatchJob.FAILURE:
+        metrics.inc('notifications_triggers_deduplicated_total', {'emergency': emergency})
+        return existing, False
+
+    job = DispatchJob.objects.create(
+        emergency=emergency,
+        audience=audience.as_dict() if audience else {},
+        dedupe_key=key,
+    )
+    if existing is not None:
+        cache.set(_dedupe_cache_key(key), str(job.pk), timeout=window)
+    elif not cache.add(_dedupe_cache_key(key), str(job.pk), timeout=window):
+        winner = _job(cache.get(_dedupe_cache_key(key)))
+        if winner is not None and winner.pk != job.pk:
+            job.delete()
+            metrics.inc('notifications_triggers_deduplicated_total', {'emergency': emergency})
+            return winner, False
+    return job, True
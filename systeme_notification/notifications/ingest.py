@@ -0,0 +1,168 @@
+# notifications/ingest.py
+
+import csv
+import json
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import record_notifications
+from .deferred import due_at
+from .descriptors import PriorityDescriptor
+from .dispatch import deliver_on_commit
+from .models import Notification, User
+from .stats import invalidate_stats
+
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000  # au-delà, seules les erreurs sont comptées
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+CSV_TYPES = ('text/csv',)
+
+
+class UnsupportedFormat(ValueError):
+    """Content-Type non géré par l'import en masse."""
+
+
+def _lines(stream):
+    """Lignes décodées du corps, lues au fil de l'eau (jamais chargé en entier)."""
+    for number, line in enumerate(iter(stream.readline, b'')):
+        text = line.decode('utf-8', errors='replace')
+        yield text.lstrip('\ufeff') if number == 0 else text
+
+
+def iter_ndjson(stream):
+    """(numéro de ligne, objet) pour chaque ligne non vide ; erreur JSON -> objet None."""
+    for number, line in enumerate(_lines(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def iter_csv(stream):
+    """(numéro de ligne, dict) ; la première ligne nomme les colonnes."""
+    reader = csv.DictReader(_lines(stream))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_rows(stream, content_type):
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    if media_type in NDJSON_TYPES:
+        return iter_ndjson(stream)
+    if media_type in CSV_TYPES:
+        return iter_csv(stream)
+    raise UnsupportedFormat(
+        f"Content-Type non supporté : {media_type or '(absent)'}. "
+        f"Attendu : {', '.join(NDJSON_TYPES + CSV_TYPES)}"
+    )
+
+
+def validate_row(row):
+    """Retourne (champs, erreurs) au format des erreurs DRF ({champ: [messages]})."""
+    if row is None:
+        return None, {'non_field_errors': ["Ligne JSON invalide (objet attendu)"]}
+    errors = {}
+    message = row.get('message')
+    message = message.strip() if isinstance(message, str) else ''
+    if not message:
+        errors['message'] = ["Ce champ est obligatoire."]
+
+    priority = row.get('priority') or 'LOW'
+    if priority not in PriorityDescriptor.VALID_PRIORITIES:
+        errors['priority'] = [f"Priorité invalide: {priority}"]
+
+    destinataire = row.get('destinataire')
+    if destinataire in (None, ''):
+        destinataire = None
+    else:
+        try:
+            destinataire = int(destinataire)
+        except (TypeError, ValueError):
+            errors['destinataire'] = ["Un identifiant entier est requis."]
+    if errors:
+        return None, errors
+    return {'message': message, 'priority': priority, 'destinataire_id': destinataire}, None
+
+
+class BulkIngestor:
+    """
+    Import en masse : lignes validées et insérées par blocs de chunk_size
+    (une requête pour les destinataires du bloc, un bulk_create, les
+    compteurs en bloc), puis diffusées comme au dispatch : tout de suite
+    après validation, ou à l'ouverture de la fenêtre du destinataire. Les
+    lignes valides d'un bloc sont insérées même si d'autres sont rejetées ;
+    chaque rejet est rapporté avec son numéro de ligne.
+    """
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or getattr(settings, 'NOTIFICATION_INGEST_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def _reject(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def ingest(self, rows):
+        start = time.perf_counter()
+        chunk = []
+        for line, row in rows:
+            fields, errors = validate_row(row)
+            if errors:
+                self._reject(line, errors)
+                continue
+            chunk.append((line, fields))
+            if len(chunk) >= self.chunk_size:
+                self._write(chunk)
+                chunk = []
+        if chunk:
+            self._write(chunk)
+        elapsed = time.perf_counter() - start
+        return {
+            'created': self.created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'elapsed': round(elapsed, 4),
+            'rows_per_sec': round(self.created / elapsed, 1) if elapsed > 0 else float(self.created),
+        }
+
+    def _write(self, chunk):
+        ids = {fields['destinataire_id'] for _, fields in chunk} - {None}
+        users = {
+            pk: (start, end, email, phone)
+            for pk, start, end, email, phone in User.objects.filter(pk__in=ids).values_list(
+                'id', 'time_window_start', 'time_window_end', 'email', 'phone_db'
+            )
+        } if ids else {}
+
+        now = timezone.now()
+        notifications = []
+        for line, fields in chunk:
+            user_id = fields['destinataire_id']
+            if user_id is not None and user_id not in users:
+                self._reject(line, {'destinataire': [f"Utilisateur {user_id} introuvable."]})
+                continue
+            # Fenêtre horaire copiée depuis l'utilisateur, comme Notification.save()
+            start, end = users.get(user_id, (None, None))[:2]
+            notifications.append(Notification(
+                time_window_start=start, time_window_end=end,
+                next_due_at=due_at(fields['priority'], start, end, now), **fields
+            ))
+        if not notifications:
+            return
+        with transaction.atomic():
+            Notification.objects.bulk_create(notifications, batch_size=self.chunk_size)
+            record_notifications(notifications)
+            deliver_on_commit(notifications, {pk: user[2:] for pk, user in users.items()})
+            transaction.on_commit(invalidate_stats)
+        self.created += len(notifications)
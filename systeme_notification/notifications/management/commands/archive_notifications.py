@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from notifications.retention import RetentionPolicy
+
+
+class Command(BaseCommand):
+    help = ("Déplace les notifications anciennes vers l'archive mensuelle, "
+            "par lots courts (voir NOTIFICATION_RETENTION).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age-days', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--pause', type=float, default=None,
+                            help="Secondes d'attente entre deux lots")
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help="Arrête après ce nombre de lots (reprise au prochain passage)")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Compte les notifications concernées sans rien déplacer")
+
+    def handle(self, *args, **options):
+        policy = RetentionPolicy(
+            max_age_days=options['max_age_days'], batch_size=options['batch_size'], pause=options['pause'],
+        )
+        if options['dry_run']:
+            cutoff = policy.cutoff()
+            count = policy.candidates(cutoff).count()
+            self.stdout.write(f"{count} notifications antérieures au {cutoff:%Y-%m-%d} à archiver")
+            return
+        report = policy.run(max_batches=options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.archived} notifications antérieures au {report.cutoff:%Y-%m-%d} archivées "
+            f"en {report.batches} lots ({report.rows_per_sec:.0f} lignes/s)"
+        ))
@@ -0,0 +1,217 @@
+import contextlib
+import http.server
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from notifications.circuit_breaker import get_breaker
+from notifications.decorators import (
+    AddCircuitBreaker,
+    AddPerformanceTracking,
+    AutoConfigurationValidation,
+    EvacuationPipeline,
+    message,
+)
+from notifications.delivery import Message, Recipient, deliver
+from notifications.dispatch import NotificationDispatcher
+from notifications.models import User
+from notifications.tracing import logger as trace_logger
+
+
+class _Rollback(Exception):
+    """Annule les données créées pendant un benchmark."""
+
+
+class Command(BaseCommand):
+    help = "Mesure les performances des chemins critiques (les données créées sont annulées)."
+
+    targets = ('dispatch', 'tracing', 'channels', 'pipeline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', choices=self.targets)
+        parser.add_argument('--users', type=int, default=30000,
+                            help="Nombre d'utilisateurs fictifs à créer")
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--calls', type=int, default=100000,
+                            help="Nombre d'appels pour les micro-benchmarks")
+        parser.add_argument('--recipients', type=int, default=5000,
+                            help="Nombre de destinataires par canal")
+
+    def handle(self, *args, **options):
+        handler = getattr(self, f"bench_{options['target']}", None)
+        if handler is None:
+            raise CommandError(f"Cible inconnue : {options['target']}")
+        try:
+            with transaction.atomic():
+                handler(**options)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _create_users(self, count):
+        User.objects.bulk_create(
+            [User(username=f"bench-{i}", password='!') for i in range(count)],
+            batch_size=1000,
+        )
+
+    def bench_dispatch(self, users, chunk_size, **options):
+        self._create_users(users)
+        dispatcher = NotificationDispatcher(chunk_size=chunk_size)
+        result = dispatcher.dispatch("Benchmark évacuation", priority='URGENT')
+
+        self.stdout.write(
+            f"{result.created} notifications en {result.elapsed:.3f}s "
+            f"→ {result.rows_per_sec:.0f} lignes/s (objectif {result.target_rate})"
+        )
+        if result.meets_target:
+            self.stdout.write(self.style.SUCCESS("Objectif de débit atteint"))
+        else:
+            self.stdout.write(self.style.WARNING("Objectif de débit non atteint"))
+
+    def _per_call_ns(self, func, calls):
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            func()
+        return (time.perf_counter_ns() - start) / calls
+
+    def bench_tracing(self, calls, **options):
+        def print_message(func):
+            # Implémentation historique de @message (print synchrone)
+            def wrapper(self, *args, **kwargs):
+                print(f"[Message] → Appel de {func.__name__}()")
+                result = func(self, *args, **kwargs)
+                print(f"[Message] ← Fin de {func.__name__}() → {result}")
+                return result
+            return wrapper
+
+        class Target:
+            def raw(self):
+                return "Alarme activée"
+            printed = print_message(raw)
+            traced = message(raw)
+
+        target = Target()
+        results = {'sans décorateur': self._per_call_ns(target.raw, calls)}
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results['print() (avant)'] = self._per_call_ns(target.printed, calls)
+
+        level, handlers = trace_logger.level, trace_logger.handlers
+        records = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(records, logging.NullHandler())
+        try:
+            trace_logger.handlers = [logging.handlers.QueueHandler(records)]
+            trace_logger.setLevel(logging.WARNING)
+            results['trace coupée'] = self._per_call_ns(target.traced, calls)
+            listener.start()
+            trace_logger.setLevel(logging.DEBUG)
+            results['trace DEBUG (QueueHandler)'] = self._per_call_ns(target.traced, calls)
+        finally:
+            listener.stop()
+            trace_logger.handlers = handlers
+            trace_logger.setLevel(level)
+
+        baseline = results['sans décorateur']
+        for name, ns in results.items():
+            self.stdout.write(f"{name:<28} {ns:>10.0f} ns/appel  (surcoût {ns - baseline:>8.0f} ns)")
+
+    def bench_pipeline(self, calls, **options):
+        class Base:
+            required_fields = ['nom']
+
+            def __init__(self, nom="Bench"):
+                self.nom = nom
+
+            @message
+            def evacuer(self):
+                return "ok"
+
+        # Piles historiques (le registre n'agit qu'à la définition, hors mesure)
+        @AddPerformanceTracking()
+        @AutoConfigurationValidation()
+        @AddCircuitBreaker()
+        class BenchStacked(Base):
+            pass
+
+        @AddPerformanceTracking()
+        @AutoConfigurationValidation()
+        class BenchStackedNoBreaker(Base):
+            pass
+
+        @EvacuationPipeline(registry=False)
+        class BenchFused(Base):
+            pass
+
+        @EvacuationPipeline(registry=False, breaker=False)
+        class BenchFusedNoBreaker(Base):
+            pass
+
+        raw = Base.evacuer.__wrapped__
+        target = Base()
+        baseline = self._per_call_ns(lambda: raw(target), calls)
+        self.stdout.write(f"{'sans décorateur':<36} {baseline:>10.0f} ns/appel")
+        # Le disjoncteur (état en cache) domine : mesuré avec et sans lui
+        pairs = (
+            ('evacuer() toutes étapes', BenchStacked().evacuer, BenchFused().evacuer),
+            ('evacuer() sans disjoncteur', BenchStackedNoBreaker().evacuer, BenchFusedNoBreaker().evacuer),
+            ('instanciation (validation)', BenchStacked, BenchFused),
+        )
+        for label, stacked, fused in pairs:
+            self._reset_breakers('BenchStacked', 'BenchFused')
+            before = self._per_call_ns(stacked, calls) - baseline
+            after = self._per_call_ns(fused, calls) - baseline
+            self.stdout.write(
+                f"{label:<36} surcoût {before:>9.0f} ns (pile) → {after:>9.0f} ns (fusionné)"
+                f"  {100 * (before - after) / before if before > 0 else 0:>5.1f} %"
+            )
+        self._reset_breakers('BenchStacked', 'BenchFused')
+
+    def _reset_breakers(self, *names):
+        for name in names:
+            get_breaker(name).reset()
+
+    def bench_channels(self, recipients, **options):
+        class Gateway(http.server.BaseHTTPRequestHandler):
+            # Passerelle SMS locale (HTTP/1.1 keep-alive) pour mesurer la réutilisation
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Gateway)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        targets = [
+            Recipient(i, f"bench{i}@example.com", f"+24397{i:07d}", i) for i in range(recipients)
+        ]
+        msg = Message("Benchmark évacuation", 'URGENT')
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+            NOTIFICATION_SMS_GATEWAY={'URL': f"http://127.0.0.1:{server.server_port}/send"},
+            NOTIFICATION_FILE_CHANNEL_PATH=os.path.join(tmp, 'out.jsonl'),
+        ):
+            names = ('memory', 'file', 'push', 'email', 'sms')
+            for name in names:
+                self._report(name, deliver(targets, msg, channels=[name]))
+            self._report('tous', deliver(targets, msg, channels=names))
+        server.shutdown()
+
+    def _report(self, label, report):
+        self.stdout.write(
+            f"{label:<8} {report.total_sent:>7} envois en {report.elapsed:.3f}s "
+            f"→ {report.messages_per_sec:>10.0f} msg/s (échecs : {sum(report.failed.values())})"
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from notifications.deferred import DeferredDeliveryScheduler
+
+
+class Command(BaseCommand):
+    help = ("Diffuse les notifications différées à l'ouverture de la fenêtre des destinataires "
+            "(boucle réveillée à la prochaine échéance). Les échéances créées par d'autres "
+            "process sont vues avec au plus --poll secondes de retard si le cache est partagé, "
+            "--horizon secondes sinon.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Diffuse les notifications échues puis s'arrête")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--horizon', type=int, default=None,
+                            help="Réveil maximal (secondes) : rechargement des échéances depuis la base")
+        parser.add_argument('--poll', type=float, default=None,
+                            help="Secondes entre deux lectures du signal de réveil en cache")
+
+    def handle(self, *args, **options):
+        scheduler = DeferredDeliveryScheduler(
+            batch_size=options['batch_size'], horizon=options['horizon'], poll=options['poll'],
+        )
+        try:
+            delivered = scheduler.run(once=options['once'])
+        except KeyboardInterrupt:
+            scheduler.stop()
+            return
+        self.stdout.write(self.style.SUCCESS(f"{delivered} notifications différées diffusées"))
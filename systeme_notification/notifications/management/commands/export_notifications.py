@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications.export import FORMATS, ExportFilters, export_rows, render
+
+
+class Command(BaseCommand):
+    help = ("Exporte l'historique des notifications (CSV ou NDJSON) en flux, "
+            "sans charger les lignes en mémoire.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', '-o', default='-',
+                            help="Fichier de sortie (- : sortie standard)")
+        parser.add_argument('--since', help="Date ou date-heure ISO de début (incluse)")
+        parser.add_argument('--until', help="Date ou date-heure ISO de fin (incluse)")
+        parser.add_argument('--priority', action='append', default=[],
+                            help="Priorité(s) exportée(s), répétable ou séparées par des virgules")
+        parser.add_argument('--user', help="Id du destinataire")
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--no-archive', action='store_true',
+                            help="Exclut les notifications archivées par la rétention")
+
+    def handle(self, *args, **options):
+        try:
+            filters = ExportFilters.parse(
+                since=options['since'], until=options['until'],
+                priorities=options['priority'], user=options['user'],
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        counted = _Counter(export_rows(filters, chunk_size=options['chunk_size'], archived=not options['no_archive']))
+        start = time.perf_counter()
+        if options['output'] == '-':
+            for chunk in render(counted, options['format']):
+                self.stdout.write(chunk, ending='')
+        else:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as out:
+                for chunk in render(counted, options['format']):
+                    out.write(chunk)
+        elapsed = time.perf_counter() - start
+        rate = counted.count / elapsed if elapsed > 0 else counted.count
+        self.stderr.write(self.style.SUCCESS(
+            f"{counted.count} notifications exportées en {elapsed:.2f} s ({rate:.0f} lignes/s)"
+        ))
+
+
+class _Counter:
+    """Itérateur qui compte les lignes au passage."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
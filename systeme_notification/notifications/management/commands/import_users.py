@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications.provisioning import UserImporter, read_users
+
+
+class Command(BaseCommand):
+    help = ("Importe un annuaire d'utilisateurs depuis un CSV (username, email, password, "
+            "first_name, last_name, email_perso, phone, building, zone, role, groups séparés par |).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help="Fichier CSV (- : entrée standard)")
+        parser.add_argument('--sso', action='store_true',
+                            help="Mots de passe inutilisables (authentification SSO), sans hachage")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Process de hachage des mots de passe (défaut : nombre de CPU)")
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        importer = UserImporter(
+            batch_size=options['batch_size'], workers=options['workers'], sso=options['sso'],
+        )
+        if options['csv_path'] == '-':
+            report = importer.run(read_users(sys.stdin), progress=self._progress)
+        else:
+            try:
+                stream = open(options['csv_path'], encoding='utf-8-sig', newline='')
+            except OSError as exc:
+                raise CommandError(exc)
+            with stream:
+                report = importer.run(read_users(stream), progress=self._progress)
+
+        for error in report['errors']:
+            self.stderr.write(f"ligne {error['line']} : {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} utilisateurs créés, {report['skipped']} déjà existants, "
+            f"{report['error_count']} lignes rejetées ({report['rows_per_sec']:.0f} lignes/s)"
+        ))
+
+    def _progress(self, processed, created, elapsed):
+        rate = processed / elapsed if elapsed > 0 else processed
+        self.stdout.write(f"{processed} lignes traitées, {created} créées ({rate:.0f} lignes/s)")
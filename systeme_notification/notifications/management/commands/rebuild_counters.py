@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from notifications.counters import rebuild_counters
+from notifications.stats import invalidate_stats
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs de notifications (par heure/priorité et par utilisateur)."
+
+    def handle(self, *args, **options):
+        rollups, users = rebuild_counters()
+        invalidate_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"{rollups} compteurs horaires et {users} compteurs utilisateur recalculés"
+        ))
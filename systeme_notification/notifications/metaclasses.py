@@ -19,10 +19,18 @@ class NotificationMeta(ABCMeta):
 
 
 class ChannelMeta(type):
-    """Ajoute automatiquement un nom de canal à chaque sous-classe (sms, email…)."""
+    """
+    Ajoute automatiquement un nom de canal à chaque sous-classe (sms, email…)
+    et l'enregistre dans ChannelMeta.channels (sauf classes abstract = True).
+    """
+    channels = {}
+
     def __new__(cls, name, bases, attrs):
         attrs['channel_name'] = name.lower()
-        return super().__new__(cls, name, bases, attrs)
+        new_cls = super().__new__(cls, name, bases, attrs)
+        if not attrs.get('abstract', False):
+            cls.channels[new_cls.channel_name] = new_cls
+        return new_cls
 
 
 class TemplateMeta(type):
@@ -0,0 +1,322 @@
+# notifications/metrics.py
+
+import bisect
+import fcntl
+import glob
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+
+# Bornes des histogrammes (secondes pour les latences, lignes pour le fan-out)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+FANOUT_BUCKETS = (1, 10, 100, 1000, 5000, 10000, 30000, 50000, 100000)
+QUANTILES = (0.5, 0.95, 0.99)
+
+DUMP_INTERVAL = 1.0  # secondes entre deux écritures du snapshot d'un process
+DEAD_FILE = 'metrics-dead.json'  # compteurs et histogrammes des process terminés
+
+
+class Histogram:
+    """Histogramme à bornes fixes : fusionnable entre process, quantiles estimés."""
+
+    def __init__(self, buckets, counts=None, total=0.0, count=0):
+        self.buckets = tuple(buckets)
+        self.counts = list(counts) if counts else [0] * (len(self.buckets) + 1)
+        self.sum = total
+        self.count = count
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q):
+        """Estimation par interpolation linéaire dans le bucket concerné."""
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            if cumulative + c >= rank and c:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - cumulative) / c
+            cumulative += c
+        return self.buckets[-1]
+
+    def as_dict(self):
+        return {'buckets': self.buckets, 'counts': self.counts, 'sum': self.sum, 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['buckets'], data['counts'], data['sum'], data['count'])
+
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+
+metric_key = _key  # clé d'une série, pour MetricsRegistry.record()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _file_pid(path):
+    """pid d'un fichier metrics-<pid>-<jeton>.json, None pour DEAD_FILE."""
+    try:
+        return int(os.path.basename(path)[len('metrics-'):].split('-')[0].split('.')[0])
+    except ValueError:
+        return None
+
+
+def _merge(snapshots):
+    """Compteurs et histogrammes sommés, jauges sommées, de plusieurs snapshots."""
+    counters, histograms, gauges = {}, {}, {}
+    for snap in snapshots:
+        for name, labels, value in snap['counters']:
+            key = _key(name, labels)
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snap.get('gauges', ()):
+            key = _key(name, labels)
+            gauges[key] = gauges.get(key, 0) + value
+        for name, labels, data in snap['histograms']:
+            key = _key(name, labels)
+            histogram = Histogram.from_dict(data)
+            if key in histograms:
+                histograms[key].merge(histogram)
+            else:
+                histograms[key] = histogram
+    return counters, histograms, gauges
+
+
+def _read(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, snapshot):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as fh:
+        json.dump(snapshot, fh)
+    os.replace(tmp, path)
+
+
+class MetricsRegistry:
+    """
+    Compteurs, jauges et histogrammes en mémoire du process.
+
+    Si NOTIFICATION_METRICS_DIR est défini, chaque process (worker gunicorn,
+    worker Celery) y écrit régulièrement son snapshot et collect() les fusionne.
+    Un fichier par process (pid et jeton aléatoire : un pid réutilisé ne
+    remplace pas les compteurs d'un process mort). Les fichiers des process
+    terminés sont repliés dans DEAD_FILE : leurs compteurs et histogrammes
+    restent comptés, leurs jauges disparaissent (voir mark_process_dead).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._last_dump = 0.0
+        self._pid = None
+        self._token = None
+
+    def inc(self, name, labels=None, amount=1):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+        self._maybe_dump()
+
+    def record(self, counters=(), observations=()):
+        """
+        Plusieurs incréments et observations sous un seul verrou, pour les
+        chemins chauds ; les clés sont précalculées avec metric_key().
+        """
+        with self._lock:
+            for key in counters:
+                self._counters[key] = self._counters.get(key, 0) + 1
+            for key, value, buckets in observations:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(buckets)
+                histogram.observe(value)
+        self._maybe_dump()
+
+    def set(self, name, value, labels=None):
+        """Jauge : dernière valeur connue (profondeur de file, etc.)."""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+        self._maybe_dump()
+
+    def observe(self, name, value, labels=None, buckets=LATENCY_BUCKETS):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+        self._maybe_dump()
+
+    def histogram(self, name, labels=None):
+        return self._histograms.get(_key(name, labels))
+
+    def counter(self, name, labels=None):
+        return self._counters.get(_key(name, labels), 0)
+
+    def gauge(self, name, labels=None):
+        return self._gauges.get(_key(name, labels), 0)
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    # --- Snapshot / multi-process ---
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[n, dict(l), v] for (n, l), v in self._counters.items()],
+                'gauges': [[n, dict(l), v] for (n, l), v in self._gauges.items()],
+                'histograms': [[n, dict(l), h.as_dict()] for (n, l), h in self._histograms.items()],
+            }
+
+    def _metrics_dir(self):
+        return getattr(settings, 'NOTIFICATION_METRICS_DIR', None)
+
+    def _maybe_dump(self):
+        if self._metrics_dir() and time.monotonic() - self._last_dump >= DUMP_INTERVAL:
+            self.dump()
+
+    def _path(self, directory):
+        # Jeton renouvelé après un fork (workers gunicorn avec --preload)
+        if self._pid != os.getpid():
+            self._pid, self._token = os.getpid(), uuid.uuid4().hex[:8]
+        return os.path.join(directory, f"metrics-{self._pid}-{self._token}.json")
+
+    def dump(self):
+        """Écrit le snapshot du process (écriture atomique via os.replace)."""
+        directory = self._metrics_dir()
+        if not directory:
+            return
+        self._last_dump = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        _write(self._path(directory), self.snapshot())
+
+    def mark_process_dead(self, pid, directory=None):
+        """
+        Replie les snapshots du process pid dans DEAD_FILE (compteurs et
+        histogrammes conservés, jauges retirées). Appelé par collect() pour
+        les process disparus, ou par le hook child_exit de gunicorn.
+        """
+        directory = directory or self._metrics_dir()
+        if not directory:
+            return
+        for path in glob.glob(os.path.join(directory, f'metrics-{pid}-*.json')) + \
+                glob.glob(os.path.join(directory, f'metrics-{pid}.json')):
+            claimed = f"{path}.dead"
+            try:
+                os.rename(path, claimed)  # un seul collecteur replie un fichier donné
+            except OSError:
+                continue
+            with open(os.path.join(directory, 'metrics-dead.lock'), 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                dead_path = os.path.join(directory, DEAD_FILE)
+                snapshots = [snap for snap in (_read(dead_path), _read(claimed)) if snap]
+                counters, histograms, _ = _merge(snapshots)
+                _write(dead_path, {
+                    'counters': [[n, dict(l), v] for (n, l), v in counters.items()],
+                    'gauges': [],
+                    'histograms': [[n, dict(l), h.as_dict()] for (n, l), h in histograms.items()],
+                })
+                os.remove(claimed)
+
+    def collect(self):
+        """Compteurs, histogrammes et jauges (sommées) de tous les process connus."""
+        directory = self._metrics_dir()
+        if not directory:
+            return _merge([self.snapshot()])
+        self.dump()
+        snapshots = []
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            pid = _file_pid(path)
+            if pid is None:
+                continue  # DEAD_FILE, lu après les replis ci-dessous
+            if not _pid_alive(pid):
+                self.mark_process_dead(pid, directory)
+                continue
+            snap = _read(path)
+            if snap is not None:
+                snapshots.append(snap)
+        dead = _read(os.path.join(directory, DEAD_FILE))
+        return _merge(snapshots + ([dead] if dead else []))
+
+
+def _labels(labels, **extra):
+    items = list(labels) + sorted(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+
+def _number(value):
+    if isinstance(value, float) and math.isnan(value):
+        return 'NaN'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(counters, histograms, gauges=None):
+    """Format texte Prometheus (0.0.4) ; quantiles exposés en famille *_quantile."""
+    lines = []
+    for kind, values in (('counter', counters), ('gauge', gauges or {})):
+        for name in sorted({n for n, _ in values}):
+            lines.append(f"# TYPE {name} {kind}")
+            for (n, labels), value in sorted(values.items()):
+                if n == name:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    for name in sorted({n for n, _ in histograms}):
+        lines.append(f"# TYPE {name} histogram")
+        for (n, labels), h in sorted(histograms.items(), key=lambda kv: kv[0]):
+            if n != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(h.buckets + ('+Inf',), h.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(h.sum)}")
+            lines.append(f"{name}_count{_labels(labels)} {h.count}")
+
+        lines.append(f"# TYPE {name}_quantile gauge")
+        for (n, labels), h in sorted(histograms.items(), key=lambda kv: kv[0]):
+            if n == name:
+                for q in QUANTILES:
+                    lines.append(f"{name}_quantile{_labels(labels, quantile=q)} {_number(h.quantile(q))}")
+    return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
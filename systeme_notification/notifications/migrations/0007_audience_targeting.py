@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_notification_next_due_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dispatchjob',
+            name='audience',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='building',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='role',
+            field=models.CharField(choices=[('ETUDIANT', 'Étudiant'), ('ENSEIGNANT', 'Enseignant'), ('PERSONNEL', 'Personnel'), ('SECURITE', 'Sécurité'), ('VISITEUR', 'Visiteur')], db_index=True, default='ETUDIANT', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='zone',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=50),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_audience_targeting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dispatchjob',
+            name='dedupe_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='dispatchjob',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0008_dispatchjob_idempotency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmergencyType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(unique=True)),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('label', models.CharField(max_length=100)),
+                ('consigne', models.TextField(help_text='Message envoyé aux destinataires')),
+                ('priority', models.CharField(choices=[('LOW', 'LOW'), ('MEDIUM', 'MEDIUM'), ('HIGH', 'HIGH'), ('URGENT', 'URGENT')], default='URGENT', max_length=10)),
+                ('enabled', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': "Type d'urgence",
+                'verbose_name_plural': "Types d'urgence",
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0010_read_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('message', models.TextField()),
+                ('priority', models.CharField(default='LOW', max_length=10)),
+                ('time_window_start', models.DateTimeField(blank=True, null=True)),
+                ('time_window_end', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('month', models.DateField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('destinataire', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notification archivée',
+                'verbose_name_plural': 'Notifications archivées',
+                'indexes': [models.Index(fields=['month', 'created_at'], name='archive_month_created_idx'), models.Index(fields=['destinataire', '-created_at'], name='archive_dest_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:42
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def processed_from_sent(apps, schema_editor):
+    # Jobs existants : tout bloc terminé avait créé une notification par destinataire
+    DispatchJob = apps.get_model('notifications', 'DispatchJob')
+    DispatchJob.objects.update(processed=F('sent'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0011_notification_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dispatchjob',
+            name='processed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(processed_from_sent, migrations.RunPython.noop),
+    ]
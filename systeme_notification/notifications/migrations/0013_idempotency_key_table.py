@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_keys(apps, schema_editor):
+    DispatchJob = apps.get_model('notifications', 'DispatchJob')
+    IdempotencyKey = apps.get_model('notifications', 'IdempotencyKey')
+    IdempotencyKey.objects.bulk_create(
+        [
+            IdempotencyKey(key=key, job_id=job_id)
+            for job_id, key in DispatchJob.objects.exclude(idempotency_key=None).values_list('id', 'idempotency_key')
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0012_dispatchjob_processed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to='notifications.dispatchjob')),
+            ],
+        ),
+        migrations.RunPython(copy_keys, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='dispatchjob',
+            name='idempotency_key',
+        ),
+    ]
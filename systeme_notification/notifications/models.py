@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager, Group, Permission
 from django.utils import timezone
@@ -51,6 +52,18 @@ class User(AbstractUser):
     time_window_start = models.DateTimeField(default=timezone.now)
     time_window_end = models.DateTimeField(default=timezone.now)
 
+    # Ciblage des alertes (notifications/audience.py)
+    ROLE_CHOICES = [
+        ('ETUDIANT', 'Étudiant'),
+        ('ENSEIGNANT', 'Enseignant'),
+        ('PERSONNEL', 'Personnel'),
+        ('SECURITE', 'Sécurité'),
+        ('VISITEUR', 'Visiteur'),
+    ]
+    building = models.CharField(max_length=50, blank=True, default='', db_index=True)
+    zone = models.CharField(max_length=50, blank=True, default='', db_index=True)
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='ETUDIANT', db_index=True)
+
     # Descripteurs restants pour validation
     email_perso = EmailDescriptor()
     phone = PhoneDescriptor()
@@ -105,6 +118,8 @@ class Notification(models.Model):
     priority = models.CharField(max_length=10, default='LOW')
     time_window_start = models.DateTimeField(null=True, blank=True)
     time_window_end = models.DateTimeField(null=True, blank=True)
+    # Diffusion différée jusqu'à l'ouverture de la fenêtre (notifications/deferred.py)
+    next_due_at = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -118,3 +133,177 @@ class Notification(models.Model):
 
     def __str__(self):
         return f"Notification to {self.destinataire} [{self.priority}] : {self.message[:30]}"
+
+    class Meta:
+        indexes = [
+            # Dashboard utilisateur : filtre destinataire, tri -created_at
+            models.Index(fields=['destinataire', '-created_at'], name='notif_dest_created_idx'),
+            # Vues admin : fenêtres et tri sur created_at
+            models.Index(fields=['-created_at'], name='notif_created_idx'),
+            # Regroupements / filtres par priorité sur une période
+            models.Index(fields=['priority', 'created_at'], name='notif_priority_created_idx'),
+            # Prochaines diffusions différées (index partiel : lignes en attente seulement)
+            models.Index(fields=['next_due_at'], name='notif_next_due_idx',
+                         condition=models.Q(next_due_at__isnull=False)),
+        ]
+
+
+class NotificationArchive(models.Model):
+    """
+    Notification déplacée hors de la table chaude par la rétention
+    (notifications/retention.py). Même id, même contenu ; month découpe
+    l'archive par mois (filtres, purge d'un mois entier).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    message = models.TextField()
+    # Pas de contrainte : l'archive survit à la suppression de l'utilisateur
+    destinataire = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, null=True, db_constraint=False, related_name='+'
+    )
+    priority = models.CharField(max_length=10, default='LOW')
+    time_window_start = models.DateTimeField(null=True, blank=True)
+    time_window_end = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    month = models.DateField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Notification archivée"
+        verbose_name_plural = "Notifications archivées"
+        indexes = [
+            models.Index(fields=['month', 'created_at'], name='archive_month_created_idx'),
+            models.Index(fields=['destinataire', '-created_at'], name='archive_dest_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"[{self.month:%Y-%m}] {self.destinataire_id} [{self.priority}] : {self.message[:30]}"
+
+
+# ------------------------------
+# Job de dispatch asynchrone
+# ------------------------------
+class DispatchJob(models.Model):
+    """Suivi d'un fan-out exécuté par les workers Celery."""
+
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    SUCCESS = 'SUCCESS'
+    FAILURE = 'FAILURE'
+    STATUS_CHOICES = [
+        (PENDING, 'En attente'),
+        (RUNNING, 'En cours'),
+        (SUCCESS, 'Terminé'),
+        (FAILURE, 'Échec'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    emergency = models.CharField(max_length=50)
+    # Critères de ciblage (Audience.as_dict()), vide = tous les utilisateurs actifs
+    audience = models.JSONField(default=dict, blank=True)
+    # Déduplication des déclenchements (notifications/idempotency.py)
+    dedupe_key = models.CharField(max_length=64, blank=True, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    total = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    # Destinataires traités (notifiés ou disparus entre-temps) : fin du job à total
+    processed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def progress(self):
+        if self.status == self.SUCCESS:
+            return 100.0
+        if not self.total:
+            return 0.0
+        return round(100.0 * self.processed / self.total, 1)
+
+    def __str__(self):
+        return f"Job {self.emergency} [{self.status}] {self.sent}/{self.total}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Idempotency-Key d'un déclenchement et job renvoyé pour cette clé, y
+    compris un job d'origine vers lequel la requête a été dédupliquée.
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    job = models.ForeignKey(DispatchJob, on_delete=models.CASCADE, related_name='idempotency_keys')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.key} -> {self.job_id}"
+
+
+# ------------------------------
+# Types d'urgence définis sans code (notifications/emergencies.py)
+# ------------------------------
+class EmergencyType(models.Model):
+    """Urgence déclenchable sur /api/evacuation/<slug>/, rechargée à chaud."""
+    PRIORITY_CHOICES = [(p, p) for p in ('LOW', 'MEDIUM', 'HIGH', 'URGENT')]
+
+    slug = models.SlugField(max_length=50, unique=True)
+    # Nom de la classe générée (GlobalRegistry, DispatchJob.emergency)
+    name = models.CharField(max_length=50, unique=True)
+    label = models.CharField(max_length=100)
+    consigne = models.TextField(help_text="Message envoyé aux destinataires")
+    priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='URGENT')
+    enabled = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Type d'urgence"
+        verbose_name_plural = "Types d'urgence"
+
+    def __str__(self):
+        return f"{self.label} ({self.slug})"
+
+
+# ------------------------------
+# Compteurs pré-calculés
+# ------------------------------
+class NotificationRollup(models.Model):
+    """Nombre de notifications créées par heure et par priorité."""
+    hour = models.DateTimeField()
+    priority = models.CharField(max_length=10)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'priority'], name='unique_rollup_hour_priority'),
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H}h [{self.priority}] : {self.count}"
+
+
+class UserNotificationCounter(models.Model):
+    """Totaux de notifications d'un utilisateur, maintenus au dispatch."""
+    user = models.OneToOneField(
+        User, primary_key=True, on_delete=models.CASCADE, related_name='notification_counter'
+    )
+    total = models.PositiveIntegerField(default=0)
+    unread = models.PositiveIntegerField(default=0)
+    high_priority = models.PositiveIntegerField(default=0)
+    # Curseur de lecture : toutes les notifications d'id <= last_read_id sont lues
+    last_read_id = models.BigIntegerField(default=0)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user_id} : {self.unread}/{self.total}"
+
+
+class NotificationAck(models.Model):
+    """Lecture explicite d'une notification postérieure au curseur de lecture."""
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='acks')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_acks')
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'notification'], name='unique_ack_user_notification'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} a lu {self.notification_id}"
@@ -0,0 +1,107 @@
+# notifications/pagination.py
+
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+DEFAULT_PAGE_SIZE = 20
+
+
+def page_size_setting():
+    return getattr(settings, 'NOTIFICATION_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+
+
+def encode_cursor(notification):
+    """Curseur opaque (created_at, id) de la dernière ligne d'une page."""
+    raw = f"{notification.created_at.isoformat()}|{notification.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse de encode_cursor ; lève ValueError si le curseur est invalide."""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Curseur invalide : {cursor}") from exc
+
+
+def keyset_page(queryset, cursor=None, page_size=None):
+    """
+    Page de notifications triées par (-created_at, -id) à partir d'un curseur.
+
+    Le curseur se traduit en condition WHERE sur l'index, si bien que la page N
+    coûte autant que la première. Retourne (lignes, curseur suivant ou None).
+    """
+    page_size = page_size or page_size_setting()
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    rows = list(queryset[:page_size + 1])
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+class KeysetPagination(BasePagination):
+    """Pagination DRF par curseur (created_at, id), voir keyset_page()."""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size_setting()
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            rows, self.next_cursor = keyset_page(
+                queryset,
+                request.query_params.get(self.cursor_query_param),
+                self.get_page_size(request),
+            )
+        except ValueError as exc:
+            raise NotFound(str(exc))
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'first': self.get_first_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'first': {'type': 'string', 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,191 @@
+# notifications/provisioning.py
+
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import transaction
+
+from .audience import bump_version
+from .descriptors import EmailDescriptor, PhoneDescriptor
+from .models import User
+from .stats import invalidate_stats
+
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+GROUP_SEPARATOR = '|'
+ROLES = {value for value, _ in User.ROLE_CHOICES}
+
+# Colonnes reconnues du CSV (username obligatoire, le reste facultatif)
+COLUMNS = ('username', 'email', 'password', 'first_name', 'last_name',
+           'email_perso', 'phone', 'building', 'zone', 'role', 'groups')
+
+
+def read_users(stream):
+    """(numéro de ligne, dict) pour chaque ligne du CSV, lu au fil de l'eau."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def validate_user(row):
+    """Retourne (champs, groupes, mot de passe, erreurs) ; motifs précompilés des descripteurs."""
+    row = {key: (value or '').strip() for key, value in row.items() if key in COLUMNS}
+    errors = {}
+    if not row.get('username'):
+        errors['username'] = ["Ce champ est obligatoire."]
+    email = row.get('email', '')
+    if email and not EmailDescriptor.PATTERN.match(email):
+        errors['email'] = [f"Email invalide: {email}"]
+    email_perso = row.get('email_perso') or 'perso@domaine.com'
+    if not EmailDescriptor.PATTERN.match(email_perso):
+        errors['email_perso'] = [f"Email invalide: {email_perso}"]
+    phone = row.get('phone') or '+0000000000'
+    if not PhoneDescriptor.PATTERN.match(phone):
+        errors['phone'] = [f"Numéro de téléphone invalide: {phone}"]
+    role = (row.get('role') or 'ETUDIANT').upper()
+    if role not in ROLES:
+        errors['role'] = [f"Rôle invalide: {role}"]
+    if errors:
+        return None, None, None, errors
+
+    fields = {
+        'username': row['username'],
+        'email': User.objects.normalize_email(email),
+        'first_name': row.get('first_name', ''),
+        'last_name': row.get('last_name', ''),
+        # Champs ORM directement : valeurs déjà validées, pas de repassage par les descripteurs
+        'email_perso_db': email_perso,
+        'phone_db': phone,
+        'building': row.get('building', ''),
+        'zone': row.get('zone', ''),
+        'role': role,
+    }
+    groups = {name.strip() for name in row.get('groups', '').split(GROUP_SEPARATOR) if name.strip()}
+    return fields, groups, row.get('password') or None, None
+
+
+def _setup_worker():
+    # Sans fork (spawn), le process fils doit charger Django pour make_password
+    django.setup()
+
+
+class UserImporter:
+    """
+    Import d'annuaire par lots : validation, hachage des mots de passe
+    (PBKDF2, volontairement lent) réparti sur un pool de process, puis
+    bulk_create des utilisateurs et de leurs groupes. Mot de passe vide ou
+    sso=True : mot de passe inutilisable (authentification externe), sans
+    hachage. Les utilisateurs existants sont ignorés, pas mis à jour.
+    """
+
+    def __init__(self, batch_size=None, workers=None, sso=False):
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.sso = sso
+        self.created = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []
+        self._pool = None
+
+    def _reject(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def hash_passwords(self, passwords):
+        """Hachés dans l'ordre ; None donne un mot de passe inutilisable."""
+        hashed = [None if self.sso else password for password in passwords]
+        todo = [i for i, password in enumerate(hashed) if password is not None]
+        if self._pool is not None and len(todo) > 1:
+            chunksize = max(1, len(todo) // (self.workers * 4))
+            results = self._pool.map(make_password, [hashed[i] for i in todo], chunksize=chunksize)
+        else:
+            results = map(make_password, [hashed[i] for i in todo])
+        for i, result in zip(todo, results):
+            hashed[i] = result
+        return [make_password(None) if value is None else value for value in hashed]
+
+    def run(self, rows, progress=None):
+        """Importe les lignes ; progress(traitées, créées, secondes) est appelé après chaque lot."""
+        start = time.perf_counter()
+        processed = 0
+        if self.workers > 1:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_setup_worker)
+        try:
+            batch = []
+            for line, row in rows:
+                processed += 1
+                fields, groups, password, errors = validate_user(row)
+                if errors:
+                    self._reject(line, errors)
+                    continue
+                batch.append((line, fields, groups, password))
+                if len(batch) >= self.batch_size:
+                    self._write(batch)
+                    batch = []
+                    if progress:
+                        progress(processed, self.created, time.perf_counter() - start)
+            if batch:
+                self._write(batch)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        if self.created:
+            # bulk_create n'émet pas post_save : invalidations faites une fois pour tout l'import
+            bump_version()
+            invalidate_stats()
+        elapsed = time.perf_counter() - start
+        if progress:
+            progress(processed, self.created, elapsed)
+        return {
+            'processed': processed,
+            'created': self.created,
+            'skipped': self.skipped,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'elapsed': round(elapsed, 4),
+            'rows_per_sec': round(processed / elapsed, 1) if elapsed > 0 else float(processed),
+        }
+
+    def _write(self, batch):
+        usernames = [fields['username'] for _, fields, _, _ in batch]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        fresh, seen = [], set()
+        for item in batch:
+            username = item[1]['username']
+            if username in existing or username in seen:
+                self.skipped += 1
+                continue
+            seen.add(username)
+            fresh.append(item)
+        if not fresh:
+            return
+
+        passwords = self.hash_passwords([password for _, _, _, password in fresh])
+        users = [User(password=hashed, **fields) for (_, fields, _, _), hashed in zip(fresh, passwords)]
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=self.batch_size)
+            self._assign_groups(fresh)
+        self.created += len(users)
+
+    def _assign_groups(self, batch):
+        wanted = {fields['username']: groups for _, fields, groups, _ in batch if groups}
+        if not wanted:
+            return
+        names = set().union(*wanted.values())
+        Group.objects.bulk_create([Group(name=name) for name in names], ignore_conflicts=True)
+        group_ids = dict(Group.objects.filter(name__in=names).values_list('name', 'id'))
+        user_ids = dict(User.objects.filter(username__in=wanted).values_list('username', 'id'))
+        Membership = User.groups.through
+        Membership.objects.bulk_create([
+            Membership(user_id=user_ids[username], group_id=group_ids[name])
+            for username, groups in wanted.items() for name in groups
+        ], ignore_conflicts=True)
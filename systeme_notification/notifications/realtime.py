@@ -0,0 +1,25 @@
+# notifications/realtime.py
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+
+def user_group(user_id):
+    """Nom du groupe Channels d'un utilisateur."""
+    return f"notifications.user.{user_id}"
+
+
+async def _send_all(layer, messages):
+    for group, payload in messages:
+        await layer.group_send(group, {'type': 'notification.new', 'notification': payload})
+
+
+def publish_payloads(payloads):
+    """Pousse des couples (user_id, payload) vers les groupes utilisateurs."""
+    layer = get_channel_layer()
+    if layer is None:
+        return 0
+    messages = [(user_group(user_id), payload) for user_id, payload in payloads if user_id is not None]
+    if messages:
+        async_to_sync(_send_all)(layer, messages)
+    return len(messages)
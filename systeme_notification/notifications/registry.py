@@ -1,19 +1,38 @@
 # notifications/registry.py
 
+import threading
+
+from .tracing import trace
+
 class GlobalRegistry:
     """
     Registre global unique permettant d'enregistrer
     toutes les classes décorées ou dynamiques du système.
 
     Utilisé par les décorateurs comme RegisterInGlobalRegistry.
+    Copie sur écriture : les écritures (rares) remplacent le dictionnaire
+    sous verrou, les lectures (chaque requête) se font sans verrou sur
+    l'instantané courant.
     """
     _registry = {}
+    _lock = threading.Lock()
 
     @classmethod
     def register(cls, name, obj):
         """Ajoute une classe ou instance dans le registre."""
-        cls._registry[name] = obj
-        print(f"[Registry] {name} ajouté au registre global.")
+        with cls._lock:
+            cls._registry = {**cls._registry, name: obj}
+        trace("[Registry] %s ajouté au registre global.", name)
+
+    @classmethod
+    def unregister(cls, name):
+        """Retire une entrée (type d'urgence supprimé) ; sans effet si absente."""
+        with cls._lock:
+            if name in cls._registry:
+                registry = dict(cls._registry)
+                del registry[name]
+                cls._registry = registry
+        trace("[Registry] %s retiré du registre global.", name)
 
     @classmethod
     def get(cls, name):
@@ -28,5 +47,6 @@ class GlobalRegistry:
     @classmethod
     def clear(cls):
         """Vide complètement le registre."""
-        cls._registry.clear()
-        print("[Registry] Registre vidé.")
+        with cls._lock:
+            cls._registry = {}
+        trace("[Registry] Registre vidé.")
@@ -0,0 +1,118 @@
+# notifications/retention.py
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .counters import forget_unread, unread_per_user
+from .metrics import registry as metrics
+from .models import Notification, NotificationAck, NotificationArchive
+from .tracing import trace
+
+
+DEFAULTS = {
+    'MAX_AGE_DAYS': 365,  # au-delà, une notification part dans l'archive
+    'BATCH_SIZE': 1000,   # lignes déplacées par transaction
+    'PAUSE': 0.05,        # secondes entre deux lots (laisse passer les écritures)
+}
+
+ARCHIVED_FIELDS = (
+    'id', 'message', 'destinataire_id', 'priority',
+    'time_window_start', 'time_window_end', 'created_at',
+)
+
+
+def month_of(moment):
+    return moment.date().replace(day=1)
+
+
+@dataclass
+class RetentionReport:
+    cutoff: object
+    archived: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.archived / self.elapsed if self.elapsed > 0 else float(self.archived)
+
+
+class RetentionPolicy:
+    """
+    Déplace les notifications plus anciennes que MAX_AGE_DAYS vers
+    NotificationArchive, par lots de BATCH_SIZE : chaque lot est une courte
+    transaction (copie, puis suppression par clé primaire), si bien que le
+    verrou d'écriture n'est jamais tenu longtemps. Les notifications encore
+    en attente de diffusion (next_due_at) ne sont pas archivées. Totaux et
+    agrégats horaires ne changent pas (l'historique reste compté) ; une
+    notification archivée compte comme lue, comme dans rebuild_counters.
+    """
+
+    def __init__(self, max_age_days=None, batch_size=None, pause=None):
+        options = {**DEFAULTS, **getattr(settings, 'NOTIFICATION_RETENTION', {})}
+        self.max_age_days = options['MAX_AGE_DAYS'] if max_age_days is None else max_age_days
+        self.batch_size = batch_size or options['BATCH_SIZE']
+        self.pause = options['PAUSE'] if pause is None else pause
+
+    def cutoff(self, now=None):
+        return (now or timezone.now()) - timedelta(days=self.max_age_days)
+
+    def candidates(self, cutoff):
+        return Notification.objects.filter(created_at__lt=cutoff, next_due_at__isnull=True)
+
+    def archive_batch(self, cutoff):
+        """Archive un lot (le plus ancien d'abord) ; retourne le nombre de lignes déplacées."""
+        with transaction.atomic():
+            rows = list(
+                self.candidates(cutoff).order_by('created_at', 'id')
+                .values_list(*ARCHIVED_FIELDS)[:self.batch_size]
+            )
+            if not rows:
+                return 0
+            NotificationArchive.objects.bulk_create(
+                [
+                    NotificationArchive(month=month_of(row[-1]), **dict(zip(ARCHIVED_FIELDS, row)))
+                    for row in rows
+                ],
+                ignore_conflicts=True,  # lot rejoué après une interruption
+            )
+            ids = [row[0] for row in rows]
+            forget_unread(unread_per_user((row[0], row[2]) for row in rows))
+            NotificationAck.objects.filter(notification_id__in=ids).delete()
+            # DELETE direct par clé primaire : ni chargement des instances, ni
+            # pre_delete par ligne (qui retirerait l'historique des compteurs)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'DELETE FROM %s WHERE %s IN (%s)' % (
+                        connection.ops.quote_name(Notification._meta.db_table),
+                        connection.ops.quote_name(Notification._meta.pk.column),
+                        ', '.join(['%s'] * len(ids)),
+                    ),
+                    ids,
+                )
+        return len(rows)
+
+    def run(self, max_batches=None, now=None):
+        report = RetentionReport(cutoff=self.cutoff(now))
+        start = time.perf_counter()
+        while max_batches is None or report.batches < max_batches:
+            moved = self.archive_batch(report.cutoff)
+            if not moved:
+                break
+            report.archived += moved
+            report.batches += 1
+            metrics.inc('notifications_archived_total', amount=moved)
+            if moved < self.batch_size:
+                break
+            if self.pause:
+                time.sleep(self.pause)
+        report.elapsed = time.perf_counter() - start
+        trace("[Rétention] %d notifications archivées en %d lots (%.0f lignes/s)",
+              report.archived, report.batches, report.rows_per_sec, level=logging.INFO)
+        return report
@@ -0,0 +1,129 @@
+# notifications/scheduler.py
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from django.conf import settings
+
+from .metrics import registry as metrics
+from .tracing import logger
+
+
+# Rang d'une priorité : 0 passe en premier
+RANKS = {'URGENT': 0, 'HIGH': 1, 'MEDIUM': 2, 'LOW': 3}
+
+DEFAULT_AGING = 30  # secondes d'attente pour gagner un rang (anti-famine)
+
+# Priorité des messages Celery (0-9, 9 = la plus haute pour RabbitMQ)
+CELERY_PRIORITIES = {'URGENT': 9, 'HIGH': 6, 'MEDIUM': 3, 'LOW': 0}
+
+
+def celery_priority(priority):
+    """
+    Priorité Celery d'une priorité de notification. Le transport Redis de
+    kombu traite 0 comme la plus haute : l'échelle est alors inversée.
+    """
+    value = CELERY_PRIORITIES.get(priority, 0)
+    if getattr(settings, 'CELERY_BROKER_URL', '').startswith(('redis://', 'rediss://')):
+        return 9 - value
+    return value
+
+
+class _Item:
+    __slots__ = ('priority', 'enqueued_at', 'future', 'func', 'args')
+
+    def __init__(self, priority, func, args):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.future = Future()
+        self.func = func
+        self.args = args
+
+
+class PriorityScheduler:
+    """
+    File d'envoi à une voie (FIFO) par priorité, consommée par `workers`
+    threads. Chaque thread prend le lot dont le rang effectif est le plus
+    petit : une alerte URGENT passe devant les lots LOW déjà en file et
+    récupère le premier thread libéré (préemption entre deux lots, un envoi
+    en cours n'est pas interrompu). Le rang baisse d'un cran toutes les
+    `aging` secondes d'attente, ce qui évite la famine des voies basses.
+    """
+
+    def __init__(self, name, workers, aging=None):
+        self.name = name
+        self.aging = aging or DEFAULT_AGING
+        self.lanes = {priority: deque() for priority in RANKS}
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"delivery-{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, priority, func, *args):
+        """Met func(*args) en file sur la voie priority ; retourne un Future."""
+        if priority not in RANKS:
+            priority = 'LOW'
+        item = _Item(priority, func, args)
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError(f"Planificateur {self.name} arrêté")
+            self.lanes[priority].append(item)
+            self._record_depth(priority)
+            self._cond.notify()
+        return item.future
+
+    def depths(self):
+        with self._cond:
+            return {priority: len(lane) for priority, lane in self.lanes.items()}
+
+    def _rank(self, item, now):
+        return RANKS[item.priority] - (now - item.enqueued_at) / self.aging
+
+    def _pop(self):
+        """Tête de voie au plus petit rang effectif (à égalité : la plus ancienne)."""
+        now = time.monotonic()
+        heads = [lane[0] for lane in self.lanes.values() if lane]
+        if not heads:
+            return None
+        item = min(heads, key=lambda i: (self._rank(i, now), i.enqueued_at))
+        self.lanes[item.priority].popleft()
+        self._record_depth(item.priority)
+        return item
+
+    def _record_depth(self, priority):
+        metrics.set('notifications_delivery_queue_depth', len(self.lanes[priority]),
+                    {'channel': self.name, 'priority': priority})
+
+    def _work(self):
+        while True:
+            with self._cond:
+                item = self._pop()
+                while item is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    item = self._pop()
+            if not item.future.set_running_or_notify_cancel():
+                continue  # annulé (échéance de la diffusion dépassée)
+            metrics.observe('notifications_delivery_wait_seconds', time.monotonic() - item.enqueued_at,
+                            {'channel': self.name, 'priority': item.priority})
+            try:
+                item.future.set_result(item.func(*item.args))
+            except BaseException as exc:
+                logger.warning("[Scheduler] %s : %s", self.name, exc)
+                item.future.set_exception(exc)
+
+    def shutdown(self, wait=True):
+        """Arrête les threads après les lots déjà en file."""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Notification, User
+from .audience import Audience
+from .models import DispatchJob, Notification, User
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,3 +13,26 @@ class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = '__all__'
+
+
+class DispatchJobSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = DispatchJob
+        fields = ['id', 'emergency', 'audience', 'status', 'total', 'sent', 'processed', 'progress', 'error',
+                  'created_at', 'finished_at']
+        read_only_fields = fields
+
+
+class AudienceSerializer(serializers.Serializer):
+    """Corps optionnel d'un déclenchement : critères de ciblage."""
+    groups = serializers.ListField(child=serializers.CharField(max_length=150), required=False)
+    buildings = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
+    zones = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
+    roles = serializers.ListField(
+        child=serializers.ChoiceField(choices=User.ROLE_CHOICES), required=False
+    )
+
+    def to_audience(self):
+        return Audience.from_dict(self.validated_data)
@@ -0,0 +1,63 @@
+# notifications/signals.py
+
+from django.db import transaction
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .audience import bump_version
+from .emergencies import bump_version as bump_emergencies_version
+from .counters import forget_notifications, record_notifications
+from .models import EmergencyType, Notification, User
+from .stats import invalidate_stats
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_stats_on_change(sender, **kwargs):
+    """Les créations unitaires (admin, API) invalident aussi le cache des stats."""
+    transaction.on_commit(invalidate_stats)
+
+
+@receiver(post_save, sender=Notification)
+def count_saved_notification(sender, instance, created, **kwargs):
+    """Les créations unitaires passent aussi par les compteurs (le dispatch les gère en bloc)."""
+    if created:
+        record_notifications([instance])
+
+
+@receiver(pre_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    """
+    Suppression (admin, API) : décrémente agrégats et compteurs. En pre_delete,
+    dans la transaction de la suppression, tant que les acquittements existent.
+    """
+    forget_notifications([instance])
+
+
+# Champs de User qui déterminent l'appartenance à une audience
+AUDIENCE_FIELDS = {'is_active', 'building', 'zone', 'role'}
+
+
+@receiver(post_save, sender=User)
+def invalidate_audiences_on_user_save(sender, update_fields=None, **kwargs):
+    """Un save partiel hors ciblage (last_login...) ne touche pas aux audiences."""
+    if update_fields is None or AUDIENCE_FIELDS & set(update_fields):
+        transaction.on_commit(bump_version)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_audiences(sender, **kwargs):
+    transaction.on_commit(bump_version)
+
+
+@receiver(post_save, sender=EmergencyType)
+@receiver(post_delete, sender=EmergencyType)
+def reload_emergencies(sender, **kwargs):
+    """Chaque process recharge les types d'urgence à sa prochaine requête."""
+    transaction.on_commit(bump_emergencies_version)
@@ -0,0 +1,167 @@
+# notifications/stats.py
+
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .counters import truncate_hour
+from .descriptors import PriorityDescriptor
+from .metrics import registry as metrics
+from .models import NotificationRollup, User
+
+
+STATS_CACHE_KEY = 'notifications:stats'
+DAILY_STATS_CACHE_KEY = 'notifications:daily_stats'
+DEFAULT_TTL = 10  # secondes
+STALE_TTL = 3600  # dernière valeur gardée pour le délestage
+
+LOAD_SHEDDING_DEFAULTS = {
+    'MAX_CONCURRENT': 2,  # recalculs simultanés par process
+    'SLOW_QUERY': 1.0,    # secondes : au-delà, la base est considérée sous pression
+    'COOLDOWN': 30,       # secondes de délestage après un calcul lent ou une erreur
+}
+
+
+def _ttl():
+    return getattr(settings, 'NOTIFICATION_STATS_CACHE_TTL', DEFAULT_TTL)
+
+
+def _sum(**filters):
+    """Somme des compteurs horaires (0 si aucun), filtrée si besoin."""
+    return Coalesce(Sum('count', filter=Q(**filters) if filters else None), Value(0))
+
+
+def compute_stats(now=None):
+    """
+    Totaux, fenêtres récentes et répartition par priorité en une seule requête
+    sur les compteurs horaires (NotificationRollup), indépendante de la taille
+    de la table Notification. Les fenêtres sont exactes à l'heure près.
+    """
+    now = truncate_hour(now or timezone.now())
+    aggregates = {
+        'total_notifications': _sum(),
+        'notifs_24h': _sum(hour__gt=now - timedelta(hours=24)),
+        'notifs_7d': _sum(hour__gt=now - timedelta(days=7)),
+        'notifs_30d': _sum(hour__gt=now - timedelta(days=30)),
+    }
+    for priority in PriorityDescriptor.VALID_PRIORITIES:
+        aggregates[priority] = _sum(priority=priority)
+    row = NotificationRollup.objects.aggregate(**aggregates)
+
+    return {
+        'total_users': User.objects.count(),
+        'total_notifications': row['total_notifications'],
+        'notifs_24h': row['notifs_24h'],
+        'notifs_7d': row['notifs_7d'],
+        'notifs_30d': row['notifs_30d'],
+        'priority_counts': {p: row[p] for p in PriorityDescriptor.VALID_PRIORITIES},
+    }
+
+
+def compute_daily_stats(days=7, now=None):
+    """Nombre de notifications par jour sur `days` jours, en une seule requête."""
+    now = now or timezone.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    starts = [today - timedelta(days=i) for i in reversed(range(days))]
+    row = NotificationRollup.objects.aggregate(**{
+        f'day{i}': _sum(hour__gte=start, hour__lt=start + timedelta(days=1))
+        for i, start in enumerate(starts)
+    })
+    return [
+        {'date': start.strftime('%d/%m'), 'count': row[f'day{i}']}
+        for i, start in enumerate(starts)
+    ]
+
+
+class LoadShedder:
+    """
+    Délestage des recalculs de statistiques : au-delà de MAX_CONCURRENT
+    recalculs, ou pendant COOLDOWN secondes après un calcul lent (SLOW_QUERY)
+    ou une erreur de base (ex. « database is locked »), la dernière valeur
+    connue est servie au lieu d'interroger la base.
+    """
+
+    def __init__(self):
+        config = {**LOAD_SHEDDING_DEFAULTS, **getattr(settings, 'NOTIFICATION_LOAD_SHEDDING', {})}
+        self.slow_query = config['SLOW_QUERY']
+        self.cooldown = config['COOLDOWN']
+        self._slots = threading.BoundedSemaphore(config['MAX_CONCURRENT'])
+        self._shed_until = 0.0
+
+    def under_pressure(self):
+        return time.monotonic() < self._shed_until
+
+    def _trip(self):
+        self._shed_until = time.monotonic() + self.cooldown
+
+    def reset(self):
+        self._shed_until = 0.0
+
+    def run(self, compute, fallback):
+        """Retourne (valeur, stale) ; fallback() donne la dernière valeur connue ou None."""
+        if self.under_pressure() or not self._slots.acquire(blocking=False):
+            stale = fallback()
+            if stale is not None:
+                metrics.inc('notifications_stats_shed_total')
+                return stale, True
+            self._slots.acquire()  # aucune valeur connue : on attend son tour
+        try:
+            start = time.monotonic()
+            value = compute()
+        except DatabaseError:
+            self._trip()
+            stale = fallback()
+            if stale is None:
+                raise
+            metrics.inc('notifications_stats_shed_total')
+            return stale, True
+        finally:
+            self._slots.release()
+        if time.monotonic() - start > self.slow_query:
+            self._trip()
+        return value, False
+
+
+shedder = LoadShedder()
+
+
+def _stale_key(key):
+    return f"{key}:stale"
+
+
+def _cached(key, compute):
+    value = cache.get(key)
+    if value is not None:
+        return value, False
+    value, stale = shedder.run(compute, lambda: cache.get(_stale_key(key)))
+    if not stale:
+        cache.set(key, value, _ttl())
+        cache.set(_stale_key(key), value, STALE_TTL)
+    return value, stale
+
+
+def get_stats_status():
+    """(statistiques, stale) : stale=True si la dernière valeur connue est servie."""
+    return _cached(STATS_CACHE_KEY, compute_stats)
+
+
+def get_stats():
+    """Statistiques globales, mises en cache pendant NOTIFICATION_STATS_CACHE_TTL."""
+    return get_stats_status()[0]
+
+
+def get_daily_stats():
+    """Statistiques journalières (7 jours), mises en cache comme get_stats()."""
+    return _cached(DAILY_STATS_CACHE_KEY, compute_daily_stats)[0]
+
+
+def invalidate_stats():
+    """Invalide les statistiques en cache (appelé après chaque dispatch)."""
+    cache.delete_many([STATS_CACHE_KEY, DAILY_STATS_CACHE_KEY])
@@ -0,0 +1,113 @@
+# notifications/tasks.py
+
+from functools import partial
+
+from celery import shared_task
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from .dispatch import NotificationDispatcher
+from .emergencies import catalog
+from .metrics import FANOUT_BUCKETS, registry as metrics
+from .models import DispatchJob
+from .registry import GlobalRegistry
+from .retention import RetentionPolicy
+from .scheduler import celery_priority
+
+
+def start_job(job, priority='LOW'):
+    """Met un DispatchJob déjà créé en file d'attente ; retourne le job à jour."""
+    run_dispatch_job.apply_async((str(job.pk),), priority=celery_priority(priority))
+    job.refresh_from_db()
+    return job
+
+
+class TaskDispatcher(NotificationDispatcher):
+    """
+    Variante du dispatcher utilisée par les workers : l'audience est résolue
+    une fois puis découpée en blocs, chacun traité par une tâche dispatch_chunk.
+    """
+
+    def __init__(self, job_id, **kwargs):
+        super().__init__(**kwargs)
+        self.job_id = job_id
+
+    def dispatch(self, message, destinataires=None, priority='LOW'):
+        ids = self.audience_ids(destinataires)
+        DispatchJob.objects.filter(pk=self.job_id).update(
+            total=len(ids), status=DispatchJob.RUNNING
+        )
+        # Fan-out observé une fois par job : les blocs ne l'enregistrent pas
+        metrics.observe('notifications_dispatch_fanout', len(ids), {'priority': priority},
+                        buckets=FANOUT_BUCKETS)
+        if not ids:
+            _finish_job(self.job_id)
+        for i in range(0, len(ids), self.chunk_size):
+            dispatch_chunk.apply_async(
+                (self.job_id, ids[i:i + self.chunk_size], message, priority),
+                priority=celery_priority(priority),
+            )
+        return len(ids)
+
+
+def _finish_job(job_id):
+    DispatchJob.objects.filter(
+        pk=job_id, status=DispatchJob.RUNNING, processed__gte=F('total')
+    ).update(status=DispatchJob.SUCCESS, finished_at=timezone.now())
+
+
+def _fail_job(job_id, error):
+    DispatchJob.objects.filter(pk=job_id).update(
+        status=DispatchJob.FAILURE, error=str(error), finished_at=timezone.now()
+    )
+
+
+@shared_task
+def run_dispatch_job(job_id):
+    """Exécute evacuer() de l'urgence du job avec un fan-out découpé en tâches."""
+    job = DispatchJob.objects.get(pk=job_id)
+    catalog.refresh()  # Types d'urgence créés ou modifiés depuis le démarrage du worker
+    obj_class = GlobalRegistry.get(job.emergency)
+    if obj_class is None:
+        # Type créé après le démarrage du worker, version en cache pas encore
+        # vue (ou cache propre au process) : relecture directe de la base
+        catalog.reload()
+        obj_class = GlobalRegistry.get(job.emergency)
+    if obj_class is None:
+        _fail_job(job_id, f"Urgence inconnue : {job.emergency}")
+        return job_id
+
+    instance = obj_class()
+    instance.dispatcher_class = partial(TaskDispatcher, job_id)
+    if job.audience:
+        instance.cibler(**job.audience)
+    if instance.evacuer() is None:
+        _fail_job(job_id, "evacuer() a échoué")
+    return job_id
+
+
+@shared_task(bind=True, autoretry_for=(DatabaseError,), retry_backoff=True, max_retries=3)
+def dispatch_chunk(self, job_id, user_ids, message, priority):
+    """Crée les notifications d'un bloc de destinataires et met à jour le job."""
+    try:
+        result = NotificationDispatcher(record_fanout=False).dispatch(
+            message, destinataires=user_ids, priority=priority
+        )
+    except DatabaseError as exc:
+        if self.request.retries >= self.max_retries:
+            _fail_job(job_id, exc)
+        raise
+    # processed avance de tout le bloc : un utilisateur supprimé depuis la
+    # résolution de l'audience ne crée rien mais ne doit pas bloquer la fin
+    DispatchJob.objects.filter(pk=job_id).update(
+        sent=F('sent') + result.created, processed=F('processed') + len(user_ids)
+    )
+    _finish_job(job_id)
+    return result.created
+
+
+@shared_task
+def archive_notifications(max_batches=None):
+    """Rétention périodique (CELERY_BEAT_SCHEDULE) : retourne le nombre de lignes archivées."""
+    return RetentionPolicy().run(max_batches=max_batches).archived
@@ -6,6 +6,7 @@ from notifications.core import Epidemie, Incendie
 from notifications.decorators import AddCircuitBreaker, AutoConfigurationValidation
 from notifications.metaclasses import NotificationMeta
 from notifications.models import User, Notification
+import os
 import types
 
 class DescriptorsTestCase(TestCase):
@@ -116,3 +117,1534 @@ class IntegrationModelTestCase(TestCase):
         if hasattr(notif, 'time_window_start') and hasattr(notif, 'time_window_end'):
             self.assertIsNotNone(notif.time_window_start)
             self.assertIsNotNone(notif.time_window_end)
+
+
+class DispatcherTestCase(TestCase):
+    def setUp(self):
+        self.users = User.objects.bulk_create(
+            [User(username=f"fan{i}", email=f"fan{i}@example.com") for i in range(25)]
+        )
+        User.objects.create(username="inactive", is_active=False)
+
+    def test_dispatch_creates_one_notification_per_active_user_in_bulk(self):
+        from notifications.dispatch import NotificationDispatcher
+        dispatcher = NotificationDispatcher(chunk_size=10)
+        # SAVEPOINT/RELEASE + SELECT audience, puis par bloc (3 blocs de 10) :
+        # INSERT + 6 requêtes de compteurs (SAVEPOINT/RELEASE, 2 × INSERT/UPDATE F())
+        with self.assertNumQueries(3 + 3 * 7):
+            result = dispatcher.dispatch("Evacuez", priority='URGENT')
+        self.assertEqual(result.created, 25)
+        self.assertEqual(Notification.objects.filter(priority='URGENT').count(), 25)
+        self.assertGreater(result.rows_per_sec, 0)
+        notif = Notification.objects.get(destinataire__username="fan0")
+        self.assertEqual(notif.time_window_start, self.users[0].time_window_start)
+
+    def test_dispatch_to_explicit_recipients(self):
+        from notifications.dispatch import NotificationDispatcher
+        result = NotificationDispatcher().dispatch("Hi", destinataires=[u.pk for u in self.users[:3]])
+        self.assertEqual(result.created, 3)
+
+    def test_dispatch_rejects_invalid_priority(self):
+        from notifications.dispatch import NotificationDispatcher
+        with self.assertRaises(ValueError):
+            NotificationDispatcher().dispatch("Hi", priority='CRITICAL')
+
+    def test_evacuer_persists_notifications(self):
+        result = Incendie().evacuer()
+        self.assertEqual(result.created, 25)
+        self.assertEqual(Notification.objects.filter(message="Evacuez immédiatement").count(), 25)
+
+
+class AsyncDispatchTestCase(TestCase):
+    """Les tâches Celery tournent en mode eager (broker memory://)."""
+
+    def setUp(self):
+        User.objects.bulk_create([User(username=f"job{i}") for i in range(5)])
+
+    def test_post_enqueues_job_and_returns_202(self):
+        from notifications.models import DispatchJob
+        response = self.client.post('/api/evacuation/incendie/')
+        self.assertEqual(response.status_code, 202)
+        job = DispatchJob.objects.get(pk=response.json()['job_id'])
+        self.assertEqual(job.status, DispatchJob.SUCCESS)
+        self.assertEqual((job.total, job.sent), (5, 5))
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_job_status_endpoint_reports_progress(self):
+        response = self.client.post('/api/evacuation/epidemie/')
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(status['status'], 'SUCCESS')
+        self.assertEqual(status['progress'], 100.0)
+
+    def test_fan_out_is_split_in_chunk_tasks(self):
+        from unittest import mock
+        from notifications.models import DispatchJob
+        from notifications.tasks import dispatch_chunk
+        with self.settings(NOTIFICATION_DISPATCH_CHUNK_SIZE=2), \
+                mock.patch.object(dispatch_chunk, 'apply_async', wraps=dispatch_chunk.apply_async) as apply_async:
+            response = self.client.post('/api/evacuation/incendie/')
+        self.assertEqual(apply_async.call_count, 3)
+        self.assertEqual(DispatchJob.objects.get(pk=response.json()['job_id']).sent, 5)
+
+    def test_job_finishes_when_a_recipient_disappears(self):
+        from unittest import mock
+        from notifications.models import DispatchJob
+        from notifications.tasks import TaskDispatcher
+        ids = list(User.objects.values_list('id', flat=True))
+        job = DispatchJob.objects.create(emergency='Incendie')
+        # Utilisateur supprimé entre la résolution de l'audience et le bloc
+        with mock.patch.object(TaskDispatcher, 'audience_ids', return_value=ids + [max(ids) + 1]):
+            TaskDispatcher(job.pk).dispatch("Evacuez")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.total, job.sent, job.processed), (DispatchJob.SUCCESS, 6, 5, 6))
+
+
+class RealtimeTestCase(TestCase):
+    """Couche Channels en mémoire (CHANNEL_LAYERS par défaut)."""
+
+    def setUp(self):
+        self.user = User.objects.create(username="ws-user")
+
+    async def _connect(self, user):
+        from channels.testing import WebsocketCommunicator
+        from notifications.consumers import NotificationConsumer
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), "/ws/notifications/")
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    async def test_consumer_receives_notifications_for_its_user(self):
+        from asgiref.sync import sync_to_async
+        from notifications.realtime import publish_payloads
+        communicator, connected = await self._connect(self.user)
+        self.assertTrue(connected)
+
+        await sync_to_async(publish_payloads)([
+            (self.user.pk, {'id': 1, 'message': "Evacuez", 'priority': 'URGENT'}),
+            (self.user.pk + 1, {'id': 2, 'message': "Pas pour toi", 'priority': 'LOW'}),
+        ])
+
+        payload = await communicator.receive_json_from()
+        self.assertEqual(payload['message'], "Evacuez")
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_anonymous_connection_is_rejected(self):
+        from django.contrib.auth.models import AnonymousUser
+        communicator, connected = await self._connect(AnonymousUser())
+        self.assertFalse(connected)
+
+    def test_dispatch_publishes_after_commit(self):
+        from unittest import mock
+        from notifications.dispatch import NotificationDispatcher
+        with mock.patch('notifications.delivery.publish_payloads') as publish, \
+                self.captureOnCommitCallbacks(execute=True):
+            NotificationDispatcher().dispatch("Hi")
+        publish.assert_called_once()
+        user_id, payload = publish.call_args.args[0][0]
+        self.assertEqual(user_id, self.user.pk)
+        self.assertEqual(payload['message'], "Hi")
+
+
+class StatsTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create(username="stats-user")
+        for message, priority in (("a", 'LOW'), ("b", 'URGENT'), ("c", 'URGENT')):
+            Notification.objects.create(message=message, priority=priority)
+        cache.clear()
+
+    def test_stats_api_uses_one_aggregate_query_then_cache(self):
+        # COUNT utilisateurs + un seul agrégat conditionnel
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/stats/').json()
+        self.assertEqual(data['total_notifications'], 3)
+        self.assertEqual(data['notifs_24h'], 3)
+        self.assertEqual(data['priority_counts'], {'LOW': 1, 'MEDIUM': 0, 'HIGH': 0, 'URGENT': 2})
+        with self.assertNumQueries(0):
+            self.client.get('/api/stats/')
+
+    def test_daily_stats_single_query(self):
+        from notifications.stats import compute_daily_stats
+        with self.assertNumQueries(1):
+            daily = compute_daily_stats()
+        self.assertEqual(len(daily), 7)
+        self.assertEqual(daily[-1]['count'], 3)
+
+    def test_dispatch_invalidates_cached_stats(self):
+        from notifications.dispatch import NotificationDispatcher
+        self.client.get('/api/stats/')
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationDispatcher().dispatch("Hi")
+        self.assertEqual(self.client.get('/api/stats/').json()['total_notifications'], 4)
+
+
+class CountersTestCase(TestCase):
+    def setUp(self):
+        self.users = User.objects.bulk_create([User(username=f"cnt{i}") for i in range(4)])
+
+    def test_dispatch_updates_rollups_and_user_counters(self):
+        from notifications.dispatch import NotificationDispatcher
+        from notifications.models import NotificationRollup, UserNotificationCounter
+        NotificationDispatcher().dispatch("Alerte", priority='HIGH')
+        NotificationDispatcher().dispatch("Bulletin", destinataires=[self.users[0].pk])
+
+        self.assertEqual(
+            dict(NotificationRollup.objects.values_list('priority', 'count')),
+            {'HIGH': 4, 'LOW': 1},
+        )
+        counter = UserNotificationCounter.objects.get(user=self.users[0])
+        self.assertEqual((counter.total, counter.unread, counter.high_priority), (2, 2, 1))
+
+    def test_user_dashboard_reads_counters_without_counting(self):
+        from notifications.dispatch import NotificationDispatcher
+        NotificationDispatcher().dispatch("Alerte", priority='HIGH')
+        self.client.force_login(self.users[1])
+        response = self.client.get('/dashboard/')
+        self.assertEqual(response.context['total_notifications'], 1)
+        self.assertEqual(response.context['high_priority'], 1)
+
+    def test_delete_decrements_rollups_and_user_counters(self):
+        from notifications.counters import acknowledge, rebuild_counters
+        from notifications.dispatch import NotificationDispatcher
+        from notifications.models import NotificationRollup, UserNotificationCounter
+        NotificationDispatcher().dispatch("Alerte", priority='HIGH')
+        NotificationDispatcher().dispatch("Bulletin", destinataires=[self.users[0].pk])
+        alert = Notification.objects.get(destinataire=self.users[0], priority='HIGH')
+        acknowledge(self.users[0], alert)
+
+        alert.delete()
+        self.client.delete(f'/api/notifications/{Notification.objects.get(destinataire=self.users[1]).pk}/')
+
+        rollups = dict(NotificationRollup.objects.values_list('priority', 'count'))
+        self.assertEqual(rollups, {'HIGH': 2, 'LOW': 1})
+        counters = UserNotificationCounter.objects.order_by('user_id').values_list(
+            'total', 'unread', 'high_priority'
+        )
+        self.assertEqual(list(counters[:2]), [(1, 1, 0), (0, 0, 0)])
+        rebuild_counters()
+        self.assertEqual(dict(NotificationRollup.objects.values_list('priority', 'count')), rollups)
+
+    def test_rebuild_counters_command_matches_table(self):
+        from django.core.management import call_command
+        from notifications.models import NotificationRollup, UserNotificationCounter
+        Notification.objects.bulk_create(
+            [Notification(message="x", destinataire=u, priority='HIGH') for u in self.users]
+        )
+        self.assertFalse(NotificationRollup.objects.exists())
+        call_command('rebuild_counters', stdout=open(os.devnull, 'w'))
+        self.assertEqual(NotificationRollup.objects.get().count, 4)
+        self.assertEqual(UserNotificationCounter.objects.get(user=self.users[2]).high_priority, 1)
+
+
+class QueryPlanAssertionsMixin:
+    """Vérifie via EXPLAIN QUERY PLAN (SQLite) qu'une requête passe par un index."""
+
+    def assertUsesIndex(self, queryset, index_name=None):
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.skipTest("EXPLAIN QUERY PLAN n'est vérifié que sous SQLite")
+        plan = queryset.explain()
+        table = queryset.model._meta.db_table
+        for line in plan.splitlines():
+            if f"SCAN {table}" in line and "INDEX" not in line:
+                self.fail(f"Parcours complet de {table} :\n{plan}")
+        if index_name is not None:
+            self.assertIn(index_name, plan)
+        return plan
+
+
+class NotificationIndexesTestCase(QueryPlanAssertionsMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="idx-user")
+
+    def test_user_dashboard_query_uses_recipient_index(self):
+        qs = Notification.objects.filter(destinataire=self.user).order_by('-created_at')
+        self.assertUsesIndex(qs, 'notif_dest_created_idx')
+
+    def test_recent_and_range_queries_use_created_at_index(self):
+        from django.utils import timezone
+        self.assertUsesIndex(Notification.objects.order_by('-created_at')[:10], 'notif_created_idx')
+        since = timezone.now() - timedelta(days=7)
+        self.assertUsesIndex(Notification.objects.filter(created_at__gte=since))
+
+    def test_priority_breakdown_uses_priority_index(self):
+        from django.db.models import Count
+        qs = Notification.objects.values('priority').annotate(count=Count('id')).order_by()
+        self.assertUsesIndex(qs, 'notif_priority_created_idx')
+
+
+class KeysetPaginationTestCase(QueryPlanAssertionsMixin, TestCase):
+    def setUp(self):
+        from django.utils import timezone
+        self.user = User.objects.create(username="page-user")
+        self.notifs = Notification.objects.bulk_create(
+            [Notification(message=f"n{i}", destinataire=self.user) for i in range(5)]
+        )
+        # Même created_at pour tout le monde : l'id départage
+        Notification.objects.update(created_at=timezone.now())
+
+    def test_api_walks_all_pages_without_duplicates(self):
+        seen, url = [], '/api/notifications/?page_size=2'
+        while url:
+            data = self.client.get(url).json()
+            seen += [row['id'] for row in data['results']]
+            url = data['next']
+        self.assertEqual(seen, sorted((n.pk for n in self.notifs), reverse=True))
+
+    def test_invalid_cursor_returns_404(self):
+        self.assertEqual(self.client.get('/api/notifications/?cursor=bad').status_code, 404)
+
+    def test_dashboard_load_more_returns_next_page(self):
+        self.client.force_login(self.user)
+        with self.settings(NOTIFICATION_PAGE_SIZE=3):
+            first = self.client.get('/dashboard/')
+            self.assertEqual(len(first.context['notifications']), 3)
+            more = self.client.get('/dashboard/', {'cursor': first.context['next_cursor'], 'partial': 1})
+        self.assertContains(more, 'notification-item', count=2)
+        self.assertEqual(more['X-Next-Cursor'], '')
+
+    def test_cursor_query_uses_index(self):
+        from django.db.models import Q
+        n = self.notifs[2]
+        qs = Notification.objects.filter(destinataire=self.user).filter(
+            Q(created_at__lt=n.created_at) | Q(created_at=n.created_at, id__lt=n.pk)
+        ).order_by('-created_at', '-id')
+        self.assertUsesIndex(qs, 'notif_dest_created_idx')
+
+
+class QueryCountTestCase(TestCase):
+    """Nombre de requêtes constant quel que soit le nombre de lignes affichées."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from notifications.dispatch import NotificationDispatcher
+        cache.clear()
+        self.admin = User.objects.create_superuser("root", "root@example.com", "pw")
+        User.objects.bulk_create([User(username=f"qc{i}", email=f"qc{i}@example.com") for i in range(30)])
+        NotificationDispatcher().dispatch("Alerte", priority='HIGH')
+        self.client.force_login(self.admin)
+
+    def test_admin_changelist_does_not_query_per_row(self):
+        # session + utilisateur + COUNT filtré + lignes (JOIN destinataire)
+        with self.assertNumQueries(4):
+            response = self.client.get('/admin/notifications/notification/')
+        self.assertContains(response, 'qc29')
+
+    def test_admin_dashboard_query_count(self):
+        # session + utilisateur + 2 stats + 1 stats journalières + top users + récentes
+        with self.assertNumQueries(7):
+            response = self.client.get('/dashboard/admin/')
+        self.assertEqual(len(response.context['recent_notifications']), 10)
+        self.assertEqual(response.context['top_users'][0].notif_count, 1)
+
+    def test_notification_api_list_query_count(self):
+        # session + utilisateur + une page
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/notifications/?page_size=50')
+        self.assertEqual(len(response.json()['results']), 31)
+
+    def test_user_dashboard_query_count(self):
+        # session + utilisateur + page de notifications + compteurs
+        with self.assertNumQueries(4):
+            self.client.get('/dashboard/')
+
+
+class TracingTestCase(TestCase):
+    def test_message_decorator_logs_when_debug_enabled(self):
+        from notifications.decorators import message
+
+        class Target:
+            @message
+            def ping(self):
+                return "pong"
+
+        with self.assertLogs('notifications.trace', 'DEBUG') as logs:
+            Target().ping()
+        self.assertIn("[Message] ← Fin de ping() → pong", logs.output[-1])
+
+    def test_disabled_tracing_does_not_format_arguments(self):
+        from notifications.decorators import message
+        from notifications.tracing import logger
+
+        class Result:
+            formatted = 0
+
+            def __str__(self):
+                Result.formatted += 1
+                return "result"
+
+        class Target:
+            @message
+            def run(self):
+                return Result()
+
+        self.assertFalse(logger.isEnabledFor(10))
+        Target().run()
+        self.assertEqual(Result.formatted, 0)
+
+    def test_circuit_breaker_errors_are_logged_as_warnings(self):
+        @AddCircuitBreaker()
+        class Broken:
+            def evacuer(self):
+                raise RuntimeError("kaboom")
+
+        with self.assertLogs('notifications.trace', 'WARNING') as logs:
+            Broken().evacuer()
+        self.assertIn("kaboom", logs.output[0])
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        from notifications.metrics import registry
+        registry.clear()
+        User.objects.bulk_create([User(username=f"m{i}") for i in range(3)])
+
+    def test_evacuer_records_latency_calls_and_fanout(self):
+        from notifications.metrics import registry
+        Incendie().evacuer()
+        labels = {'emergency': 'Incendie'}
+        self.assertEqual(registry.counter('notifications_evacuation_calls_total', labels), 1)
+        self.assertEqual(registry.counter('notifications_evacuation_errors_total', labels), 0)
+        self.assertEqual(registry.histogram('notifications_evacuation_duration_seconds', labels).count, 1)
+        self.assertEqual(registry.counter('notifications_dispatched_total', {'priority': 'URGENT'}), 3)
+
+    def test_histogram_quantiles_and_merge(self):
+        from notifications.metrics import Histogram
+        a, b = Histogram((1, 2, 4)), Histogram((1, 2, 4))
+        for v in (0.5, 0.5, 1.5):
+            a.observe(v)
+        b.observe(3)
+        a.merge(b)
+        self.assertEqual(a.count, 4)
+        self.assertAlmostEqual(a.quantile(0.5), 1.0)
+        self.assertTrue(2 <= a.quantile(0.99) <= 4)
+
+    def test_metrics_endpoint_aggregates_process_snapshots(self):
+        import json
+        import tempfile
+        from notifications.metrics import Histogram, LATENCY_BUCKETS
+        Incendie().evacuer()
+        with tempfile.TemporaryDirectory() as tmp, self.settings(NOTIFICATION_METRICS_DIR=tmp):
+            # Snapshot d'un autre worker
+            other = Histogram(LATENCY_BUCKETS)
+            other.observe(0.2)
+            with open(os.path.join(tmp, 'metrics-99999.json'), 'w') as fh:
+                json.dump({
+                    'counters': [['notifications_evacuation_calls_total', {'emergency': 'Incendie'}, 4]],
+                    'histograms': [['notifications_evacuation_duration_seconds',
+                                    {'emergency': 'Incendie'}, other.as_dict()]],
+                }, fh)
+            response = self.client.get('/api/metrics/')
+        body = response.content.decode()
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('notifications_evacuation_calls_total{emergency="Incendie"} 5', body)
+        self.assertIn('notifications_evacuation_duration_seconds_count{emergency="Incendie"} 2', body)
+        self.assertIn('quantile="0.99"', body)
+
+
+    def test_dead_process_keeps_counters_but_drops_gauges(self):
+        import json
+        import subprocess
+        import sys
+        import tempfile
+        from notifications.metrics import DEAD_FILE, registry
+        dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+        dead.wait()
+        with tempfile.TemporaryDirectory() as tmp, self.settings(NOTIFICATION_METRICS_DIR=tmp):
+            with open(os.path.join(tmp, f'metrics-{dead.pid}-0a1b2c3d.json'), 'w') as fh:
+                json.dump({
+                    'counters': [['notifications_dispatched_total', {'priority': 'LOW'}, 7]],
+                    'gauges': [['notifications_queue_depth', {'queue': 'LOW'}, 42]],
+                    'histograms': [],
+                }, fh)
+            registry.set('notifications_queue_depth', 1, {'queue': 'LOW'})
+            for _ in range(2):  # replié une seule fois
+                counters, _, gauges = registry.collect()
+                self.assertEqual(counters[('notifications_dispatched_total', (('priority', 'LOW'),))], 7)
+                self.assertEqual(gauges[('notifications_queue_depth', (('queue', 'LOW'),))], 1)
+            self.assertEqual(sorted(os.listdir(tmp)), sorted([
+                DEAD_FILE, 'metrics-dead.lock', os.path.basename(registry._path(tmp)),
+            ]))
+
+    def test_async_fan_out_is_observed_once_per_job(self):
+        from notifications.metrics import registry
+        with self.settings(NOTIFICATION_DISPATCH_CHUNK_SIZE=2):
+            self.client.post('/api/evacuation/incendie/')
+        histogram = registry.histogram('notifications_dispatch_fanout', {'priority': 'URGENT'})
+        self.assertEqual((histogram.count, histogram.sum), (1, 3))
+
+
+class CircuitBreakerTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def _breaker(self):
+        from notifications.circuit_breaker import CircuitBreaker
+        return CircuitBreaker('test', FAILURE_RATE=0.5, MIN_CALLS=4, WINDOW=60, OPEN_SECONDS=30)
+
+    def test_opens_on_failure_rate_then_fails_fast(self):
+        from notifications.circuit_breaker import CircuitOpenError, OPEN
+        breaker = self._breaker()
+        calls = []
+
+        def boom():
+            calls.append(1)
+            raise RuntimeError("gateway down")
+
+        breaker.call(lambda: "ok")
+        for _ in range(3):
+            with self.assertRaises(RuntimeError):
+                breaker.call(boom)
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(boom)
+        self.assertEqual(len(calls), 3)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        from unittest import mock
+        from notifications.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+        breaker = self._breaker()
+        now = 1000.0
+        with mock.patch('notifications.circuit_breaker.time.time', side_effect=lambda: now):
+            for _ in range(4):
+                breaker.record_failure()
+            self.assertEqual(breaker.state, OPEN)
+            now += 31
+            self.assertEqual(breaker.state, HALF_OPEN)
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())  # un seul appel de test
+            breaker.record_failure()
+            self.assertEqual(breaker.state, OPEN)
+            now += 31
+            self.assertTrue(breaker.allow())
+            breaker.record_success()
+            self.assertEqual(breaker.state, CLOSED)
+
+    def test_status_ignores_outcomes_outside_the_window(self):
+        from unittest import mock
+        breaker = self._breaker()
+        now = 1000.0
+        with mock.patch('notifications.circuit_breaker.time.time', side_effect=lambda: now):
+            breaker.record_failure()
+            breaker.record_success()
+            self.assertEqual((breaker.status()['calls'], breaker.status()['failures']), (2, 1))
+            now += 61
+            self.assertEqual((breaker.status()['calls'], breaker.status()['failures']), (0, 0))
+
+    def test_open_circuit_returns_503_and_is_reported_in_stats(self):
+        from notifications.circuit_breaker import get_breaker
+        breaker = get_breaker('Incendie')
+        for _ in range(breaker.min_calls):
+            breaker.record_failure()
+        response = self.client.post('/api/evacuation/incendie/')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        stats = self.client.get('/api/stats/').json()
+        self.assertEqual(stats['circuit_breakers']['Incendie']['state'], 'open')
+
+    def test_failed_job_is_not_reported_as_triggered(self):
+        from unittest import mock
+        with mock.patch('notifications.dispatch.NotificationDispatcher.resolve_audience',
+                        side_effect=RuntimeError("db down")):
+            response = self.client.post('/api/evacuation/securite/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['status'], 'FAILURE')
+
+
+class DeliveryChannelsTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from notifications.delivery import Memory, Message, Recipient
+        cache.clear()
+        Memory.outbox.clear()
+        self.recipients = [
+            Recipient(i, f"u{i}@example.com", f"+24397000{i:04d}", i) for i in range(250)
+        ]
+        self.message = Message("Evacuez", 'URGENT')
+
+    def test_channel_meta_registers_backends(self):
+        from notifications.metaclasses import ChannelMeta
+        self.assertTrue({'email', 'sms', 'push', 'memory', 'file'} <= set(ChannelMeta.channels))
+        self.assertNotIn('deliverychannel', ChannelMeta.channels)
+
+    def test_email_connections_bounded_by_concurrency(self):
+        from unittest import mock
+        from django.core import mail
+        from notifications.delivery import deliver
+        with mock.patch('notifications.delivery.get_connection', wraps=mail.get_connection) as get_conn, \
+                self.settings(NOTIFICATION_DELIVERY={'CONCURRENCY': {'email': 1}}):
+            report = deliver(self.recipients, self.message, channels=['email'])
+        self.assertEqual(report.sent, {'email': 250})
+        self.assertEqual(get_conn.call_count, 1)  # une connexion réutilisée pour les 2 lots
+        self.assertEqual(len(mail.outbox), 250)
+
+    def test_sms_batches_through_one_session(self):
+        from unittest import mock
+        from notifications.delivery import Sms, deliver
+        with mock.patch('requests.Session') as session_cls, \
+                self.settings(NOTIFICATION_SMS_GATEWAY={'URL': 'http://sms.local/send'}):
+            report = deliver(self.recipients, self.message, channels=['sms'])
+        session = session_cls.return_value
+        self.assertLessEqual(session_cls.call_count, Sms.max_concurrency)
+        self.assertEqual(session.post.call_count, 3)  # lots de Sms.batch_size
+        self.assertEqual(len(session.post.call_args_list[0].kwargs['json']['messages']), Sms.batch_size)
+        self.assertEqual(report.sent, {'sms': 250})
+
+    def test_failing_channel_does_not_block_others(self):
+        from notifications.delivery import Memory, Recipient, deliver
+        recipients = self.recipients[:3] + [Recipient(999, '', '+0000000000', 999)]
+        with self.settings(NOTIFICATION_SMS_GATEWAY={}, NOTIFICATION_DELIVERY={'BACKOFF': 0}):
+            report = deliver(recipients, self.message, channels=['sms', 'memory'])
+        self.assertEqual(report.sent, {'sms': 0, 'memory': 4})
+        self.assertEqual(report.failed, {'sms': 3, 'memory': 0})
+        self.assertEqual(len(Memory.outbox), 4)
+
+
+class DeliveryExecutorTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from notifications.delivery import Memory, Message, Recipient
+        cache.clear()
+        Memory.outbox.clear()
+        self.recipients = [Recipient(i, f"u{i}@example.com", '', i) for i in range(100)]
+        self.message = Message("Evacuez", 'URGENT')
+
+    def test_concurrency_is_bounded_per_channel(self):
+        import threading
+        import time
+        from unittest import mock
+        from notifications.delivery import Memory, deliver
+        lock, active, peak = threading.Lock(), [0], [0]
+
+        def send_many(channel, recipients, message):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return len(recipients)
+
+        with mock.patch.object(Memory, 'send_many', send_many), \
+                mock.patch.object(Memory, 'batch_size', 10), \
+                self.settings(NOTIFICATION_DELIVERY={'CONCURRENCY': {'memory': 3}}):
+            report = deliver(self.recipients, self.message, channels=['memory'])
+        self.assertEqual(report.sent, {'memory': 100})
+        self.assertEqual(peak[0], 3)
+
+    def test_failed_batch_is_retried_with_jittered_backoff(self):
+        from unittest import mock
+        from notifications.delivery import Memory, deliver
+        from notifications.executor import DeliveryExecutor
+        calls = []
+
+        def flaky(channel, recipients, message):
+            calls.append(len(recipients))
+            if len(calls) == 1:
+                raise ConnectionError("passerelle indisponible")
+            return len(recipients)
+
+        with mock.patch.object(Memory, 'send_many', flaky), \
+                self.settings(NOTIFICATION_DELIVERY={'BACKOFF': 0.01, 'RETRIES': 2}):
+            report = deliver(self.recipients, self.message, channels=['memory'])
+        self.assertEqual(calls, [100, 100])
+        self.assertEqual(report.sent, {'memory': 100})
+        executor = DeliveryExecutor(BACKOFF=1, BACKOFF_MAX=3)
+        self.assertTrue(all(0 <= executor.backoff_delay(a) <= min(3, 2 ** a) for a in range(5)))
+
+    def test_deadline_counts_unfinished_batches_as_failed(self):
+        import threading
+        from unittest import mock
+        from notifications.delivery import Memory, deliver
+        release = threading.Event()
+
+        def blocked(channel, recipients, message):
+            release.wait(5)
+            return len(recipients)
+
+        with mock.patch.object(Memory, 'send_many', blocked), \
+                self.settings(NOTIFICATION_DELIVERY={'DEADLINE': 0.05}):
+            report = deliver(self.recipients, self.message, channels=['memory'])
+            release.set()
+        self.assertEqual(report.sent, {'memory': 0})
+        self.assertEqual(report.failed, {'memory': 100})
+
+    def test_report_messages_per_sec(self):
+        from notifications.delivery import deliver
+        report = deliver(self.recipients, self.message, channels=['memory', 'email'])
+        self.assertEqual(report.total_sent, 200)
+        self.assertGreater(report.messages_per_sec, 0)
+        self.assertEqual(set(report.as_dict()), {'sent', 'failed', 'elapsed', 'messages_per_sec'})
+
+    def test_deliver_from_async_context(self):
+        from asgiref.sync import async_to_sync
+        from notifications.delivery import Memory, deliver_async
+        report = async_to_sync(deliver_async)(self.recipients, self.message, ['memory'])
+        self.assertEqual(report.sent, {'memory': 100})
+        self.assertEqual(len(Memory.outbox), 100)
+
+
+class PrioritySchedulerTestCase(TestCase):
+    def setUp(self):
+        import threading
+        import time
+        from notifications.metrics import registry
+        from notifications.scheduler import PriorityScheduler
+        registry.clear()
+        self.release = threading.Event()
+        self.order = []
+        self.scheduler = PriorityScheduler('test', workers=1)
+        self.addCleanup(self.scheduler.shutdown)
+        self.addCleanup(self.release.set)
+        # Occupe l'unique thread pour que les lots suivants restent en file
+        self.blocker = self.scheduler.submit('LOW', self.release.wait, 5)
+        while not self.blocker.running():
+            time.sleep(0.001)
+
+    def _submit(self, priority, label):
+        return self.scheduler.submit(priority, self.order.append, label)
+
+    def test_urgent_preempts_queued_low_batches(self):
+        from concurrent.futures import wait
+        futures = [self._submit('LOW', f"low-{i}") for i in range(3)]
+        futures.append(self._submit('URGENT', 'urgent'))
+        futures.append(self._submit('HIGH', 'high'))
+        self.assertEqual(self.scheduler.depths(), {'URGENT': 1, 'HIGH': 1, 'MEDIUM': 0, 'LOW': 3})
+        self.release.set()
+        wait(futures, timeout=5)
+        self.assertEqual(self.order, ['urgent', 'high', 'low-0', 'low-1', 'low-2'])
+
+    def test_aging_prevents_starvation(self):
+        from concurrent.futures import wait
+        low = self._submit('LOW', 'low')
+        urgent = self._submit('URGENT', 'urgent')
+        self.scheduler.lanes['LOW'][0].enqueued_at -= 4 * self.scheduler.aging
+        self.release.set()
+        wait([low, urgent], timeout=5)
+        self.assertEqual(self.order, ['low', 'urgent'])
+
+    def test_queue_depth_and_wait_time_metrics(self):
+        from concurrent.futures import wait
+        from notifications.metrics import registry
+        labels = {'channel': 'test', 'priority': 'URGENT'}
+        future = self._submit('URGENT', 'urgent')
+        self.assertEqual(registry.gauge('notifications_delivery_queue_depth', labels), 1)
+        self.release.set()
+        wait([future], timeout=5)
+        self.assertEqual(registry.gauge('notifications_delivery_queue_depth', labels), 0)
+        self.assertEqual(registry.histogram('notifications_delivery_wait_seconds', labels).count, 1)
+
+    def test_celery_tasks_carry_message_priority(self):
+        from unittest import mock
+        from notifications.models import DispatchJob
+        from notifications.scheduler import celery_priority
+        from notifications.tasks import start_job
+        self.assertGreater(celery_priority('URGENT'), celery_priority('LOW'))
+        with self.settings(CELERY_BROKER_URL='redis://localhost:6379/0'):
+            self.assertLess(celery_priority('URGENT'), celery_priority('LOW'))
+        with mock.patch('notifications.tasks.run_dispatch_job.apply_async') as apply_async:
+            start_job(DispatchJob.objects.create(emergency='Urgence'), 'URGENT')
+        self.assertEqual(apply_async.call_args.kwargs['priority'], celery_priority('URGENT'))
+
+
+class DeferredDeliveryTestCase(QueryPlanAssertionsMixin, TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from django.utils import timezone
+        from notifications.delivery import Memory
+        cache.clear()
+        Memory.outbox.clear()
+        self.now = timezone.now()
+        self.user = User.objects.create(
+            username="night-shift",
+            time_window_start=self.now + timedelta(hours=2),
+            time_window_end=self.now + timedelta(hours=10),
+        )
+
+    def _dispatch(self, priority):
+        from notifications.dispatch import NotificationDispatcher
+        with self.settings(NOTIFICATION_CHANNELS=['memory']), \
+                self.captureOnCommitCallbacks(execute=True):
+            NotificationDispatcher().dispatch("Bulletin", destinataires=self.user, priority=priority)
+        return Notification.objects.get(destinataire=self.user, priority=priority)
+
+    def test_due_at_rules(self):
+        from notifications.deferred import due_at
+        start, end = self.now + timedelta(hours=1), self.now + timedelta(hours=3)
+        self.assertEqual(due_at('LOW', start, end, self.now), start)
+        self.assertIsNone(due_at('URGENT', start, end, self.now))
+        self.assertIsNone(due_at('LOW', self.now - timedelta(hours=1), end, self.now))  # fenêtre ouverte
+        self.assertIsNone(due_at('LOW', start, start, self.now))  # fenêtre vide
+        self.assertIsNone(due_at('LOW', self.now - timedelta(hours=3), self.now - timedelta(hours=1), self.now))
+
+    def test_non_urgent_notification_waits_for_window(self):
+        from notifications.delivery import Memory
+        notification = self._dispatch('LOW')
+        self.assertEqual(notification.next_due_at, self.user.time_window_start)
+        self.assertEqual(Memory.outbox, [])
+        self.assertIsNone(self._dispatch('URGENT').next_due_at)
+        self.assertEqual(len(Memory.outbox), 1)
+
+    def test_due_notifications_are_delivered_once(self):
+        from django.core.management import call_command
+        from notifications.delivery import Memory
+        notification = self._dispatch('LOW')
+        Notification.objects.filter(pk=notification.pk).update(next_due_at=self.now - timedelta(seconds=1))
+        with self.settings(NOTIFICATION_CHANNELS=['memory']), \
+                self.captureOnCommitCallbacks(execute=True):
+            call_command('deliver_deferred', '--once', stdout=open(os.devnull, 'w'))
+            call_command('deliver_deferred', '--once', stdout=open(os.devnull, 'w'))
+        self.assertEqual([r.notification_id for r, _ in Memory.outbox], [notification.pk])
+        notification.refresh_from_db()
+        self.assertIsNone(notification.next_due_at)
+
+    def test_loop_sleeps_until_next_due_without_table_scan(self):
+        from notifications.deferred import DeferredDeliveryScheduler
+        self._dispatch('LOW')
+        scheduler = DeferredDeliveryScheduler(horizon=3 * 3600)
+        scheduler.refill(self.now)
+        self.assertAlmostEqual(scheduler.timeout(self.now), 2 * 3600, delta=1)
+        scheduler.notify(self.now + timedelta(seconds=30))
+        self.assertTrue(scheduler.wakeup.is_set())
+        self.assertAlmostEqual(scheduler.timeout(self.now), 30, delta=1)
+        self.assertUsesIndex(Notification.objects.filter(next_due_at__lte=self.now), 'notif_next_due_idx')
+
+    def test_claim_query_locks_without_outer_join(self):
+        from notifications.deferred import DeferredDeliveryScheduler
+        claim = DeferredDeliveryScheduler().claimable(self.now)
+        self.assertTrue(claim.query.select_for_update)
+        self.assertTrue(claim.query.select_for_update_skip_locked)
+        sql = str(claim.query)
+        self.assertIn('FROM "notifications_notification"', sql)
+        self.assertNotIn('JOIN', sql)  # FOR UPDATE refusé par PostgreSQL côté nullable
+
+    def test_one_delivery_per_fan_out(self):
+        from notifications.delivery import Memory
+        from notifications.deferred import DeferredDeliveryScheduler
+        from notifications.dispatch import NotificationDispatcher
+        others = User.objects.bulk_create([
+            User(username=f"night-{i}", email=f"n{i}@example.com", time_window_start=self.user.time_window_start,
+                 time_window_end=self.user.time_window_end)
+            for i in range(3)
+        ])
+        with self.settings(NOTIFICATION_CHANNELS=['memory']), self.captureOnCommitCallbacks(execute=True):
+            NotificationDispatcher().dispatch("Bulletin", destinataires=[u.pk for u in others])
+        Notification.objects.update(next_due_at=self.now - timedelta(seconds=1))
+        with self.settings(NOTIFICATION_CHANNELS=['memory']), \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(DeferredDeliveryScheduler().deliver_due(), 3)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(sorted(r.email for r, _ in Memory.outbox), [u.email for u in others])
+
+    def test_schedule_wakes_loops_of_other_processes(self):
+        import time
+        from notifications.deferred import DeferredDeliveryScheduler, schedule
+        scheduler = DeferredDeliveryScheduler(horizon=3600, poll=0.01)
+        self.assertFalse(scheduler.signalled())
+        schedule(self.now + timedelta(minutes=5))  # échéance créée ailleurs : pas de boucle dans ce process
+        start = time.monotonic()
+        scheduler.wait()
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertFalse(scheduler.signalled())
+
+
+class AudienceTargetingTestCase(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import Group
+        from django.core.cache import cache
+        from notifications.audience import audiences
+        cache.clear()
+        audiences.clear()
+        self.secouristes = Group.objects.create(name="secouristes")
+        self.users = User.objects.bulk_create([
+            User(username=f"t{i}", building='B' if i % 2 else 'A', zone='nord' if i < 4 else 'sud',
+                 role='PERSONNEL' if i % 3 == 0 else 'ETUDIANT')
+            for i in range(8)
+        ])
+        self.secouristes.custom_user_groups.add(*self.users[:3])
+
+    def _ids(self, **criteria):
+        from notifications.audience import Audience, audiences
+        return list(audiences.resolve(Audience(**criteria)))
+
+    def test_criteria_union_within_and_intersection_across(self):
+        ids = [u.pk for u in self.users]
+        self.assertEqual(self._ids(buildings=['B']), ids[1::2])
+        self.assertEqual(self._ids(buildings=['A', 'B'], zones=['nord']), ids[:4])
+        self.assertEqual(self._ids(buildings=['B'], roles=['PERSONNEL']), [ids[3]])
+        self.assertEqual(self._ids(groups=['secouristes'], zones=['nord']), ids[:3])
+
+    def test_sets_are_cached_as_compact_arrays(self):
+        from array import array
+        from notifications.audience import Audience, audiences
+        audience = Audience(buildings=['B'], groups=['secouristes'])
+        self.assertIsInstance(audiences.resolve(audience), array)
+        with self.assertNumQueries(0):
+            audiences.resolve(audience)
+        audiences.clear()  # autre process : relu depuis le cache Django
+        with self.assertNumQueries(0):
+            audiences.resolve(audience)
+
+    def test_membership_changes_invalidate_sets(self):
+        self.assertEqual(len(self._ids(groups=['secouristes'])), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.secouristes.custom_user_groups.add(self.users[7])
+        self.assertEqual(len(self._ids(groups=['secouristes'])), 4)
+        user = self.users[1]
+        user.building = 'C'
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertNotIn(user.pk, self._ids(buildings=['B']))
+
+    def test_targeted_evacuation_only_notifies_audience(self):
+        result = Incendie().cibler(buildings=['B'], zones=['sud']).evacuer()
+        self.assertEqual(result.created, 2)
+        self.assertEqual(
+            set(Notification.objects.values_list('destinataire_id', flat=True)),
+            {self.users[5].pk, self.users[7].pk},
+        )
+
+    def test_api_accepts_targeting_body(self):
+        from notifications.models import DispatchJob
+        response = self.client.post('/api/evacuation/securite/', {'roles': ['PERSONNEL']},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        job = DispatchJob.objects.get(pk=response.json()['job_id'])
+        self.assertEqual(job.audience, {'roles': ['PERSONNEL']})
+        self.assertEqual(job.total, 3)
+        bad = self.client.post('/api/evacuation/securite/', {'roles': ['PIRATE']},
+                               content_type='application/json')
+        self.assertEqual(bad.status_code, 400)
+
+
+class IdempotentTriggerTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+        User.objects.bulk_create([User(username=f"i{i}") for i in range(3)])
+
+    def _post(self, url='/api/evacuation/incendie/', key=None, **body):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(url, body, content_type='application/json', **headers)
+
+    def test_retry_with_same_key_returns_original_job(self):
+        from notifications.models import DispatchJob
+        first = self._post(key='abc-123')
+        with self.settings(NOTIFICATION_DEDUPE_WINDOW=0):
+            retry = self._post(key='abc-123')
+        self.assertEqual(retry.status_code, 202)
+        self.assertEqual(retry.json()['job_id'], first.json()['job_id'])
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(DispatchJob.objects.count(), 1)
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_key_survives_cache_loss_through_unique_column(self):
+        from django.core.cache import cache
+        first = self._post(key='abc-123')
+        cache.clear()
+        with self.assertNumQueries(1):  # cache vide : lecture par clé primaire d'IdempotencyKey
+            retry = self._post(key='abc-123')
+        self.assertEqual(retry.json()['job_id'], first.json()['job_id'])
+
+    def test_key_of_deduplicated_request_is_stored_durably(self):
+        from django.core.cache import cache
+        from notifications.models import DispatchJob
+        first = self._post()
+        deduplicated = self._post(key='retry-me')
+        self.assertEqual(deduplicated.json()['job_id'], first.json()['job_id'])
+        cache.clear()  # retry reçu par un autre process (cache non partagé)
+        with self.settings(NOTIFICATION_DEDUPE_WINDOW=0):
+            retry = self._post(key='retry-me')
+        self.assertEqual(retry.json()['job_id'], first.json()['job_id'])
+        self.assertEqual(DispatchJob.objects.count(), 1)
+
+    def test_key_reused_for_other_emergency_is_rejected(self):
+        self._post(key='abc-123')
+        response = self._post('/api/evacuation/securite/', key='abc-123')
+        self.assertEqual(response.status_code, 422)
+
+    def test_oversized_key_is_rejected(self):
+        from notifications.models import DispatchJob
+        response = self._post(key='k' * 256)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(DispatchJob.objects.count(), 0)
+        self.assertEqual(self._post(key='k' * 255).status_code, 202)
+
+    def test_double_click_is_deduplicated_per_type_and_audience(self):
+        from notifications.models import DispatchJob
+        first = self._post()
+        second = self._post()
+        self.assertEqual(second.json()['job_id'], first.json()['job_id'])
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertNotEqual(self._post(roles=['PERSONNEL']).json()['job_id'], first.json()['job_id'])
+        self.assertNotEqual(self._post('/api/evacuation/securite/').json()['job_id'], first.json()['job_id'])
+        self.assertEqual(DispatchJob.objects.count(), 3)
+
+    def test_failed_job_does_not_block_retrigger(self):
+        from unittest import mock
+        with mock.patch('notifications.dispatch.NotificationDispatcher.resolve_audience',
+                        side_effect=RuntimeError("db down")):
+            failed = self._post()
+        self.assertEqual(failed.status_code, 503)
+        retry = self._post()
+        self.assertEqual(retry.status_code, 202)
+        self.assertNotEqual(retry.json()['job_id'], failed.json()['job_id'])
+
+
+class RateLimitingTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+        User.objects.bulk_create([User(username=f"r{i}") for i in range(2)])
+
+    def _limits(self, **scopes):
+        return self.settings(NOTIFICATION_RATE_LIMITS={
+            name: {'CAPACITY': capacity, 'REFILL': 0.1} for name, capacity in scopes.items()
+        })
+
+    def test_burst_beyond_bucket_gets_429_with_retry_after(self):
+        from notifications.metrics import registry
+        with self._limits(evacuation=2):
+            codes = [self.client.post('/api/evacuation/incendie/').status_code for _ in range(3)]
+            response = self.client.post('/api/evacuation/incendie/')
+        self.assertEqual(codes, [202, 202, 429])
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(self.client.get('/api/evacuation/incendie/').status_code, 200)
+        self.assertGreaterEqual(registry.counter('notifications_throttled_total', {'scope': 'evacuation'}), 2)
+
+    def test_buckets_are_per_client_and_per_endpoint_class(self):
+        with self._limits(evacuation=1, stats=1):
+            self.assertEqual(self.client.post('/api/evacuation/incendie/').status_code, 202)
+            self.assertEqual(self.client.post('/api/evacuation/incendie/').status_code, 429)
+            other_ip = self.client.post('/api/evacuation/incendie/', REMOTE_ADDR='10.0.0.2')
+            self.assertEqual(other_ip.status_code, 202)
+            self.assertEqual(self.client.get('/api/stats/').status_code, 200)
+            self.assertEqual(self.client.get('/api/stats/').status_code, 429)
+
+    def test_staff_and_security_bypass_evacuation_limits(self):
+        guard = User.objects.create(username="garde", role='SECURITE')
+        self.client.force_login(guard)
+        with self._limits(evacuation=1):
+            codes = {self.client.post('/api/evacuation/incendie/').status_code for _ in range(3)}
+        self.assertEqual(codes, {202})
+
+
+class LoadSheddingTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from notifications.stats import shedder
+        cache.clear()
+        shedder.reset()
+        self.addCleanup(cache.clear)
+        self.addCleanup(shedder.reset)
+        Notification.objects.create(message="a", priority='URGENT')
+
+    def test_database_error_serves_last_known_stats(self):
+        from unittest import mock
+        from django.db import OperationalError
+        from notifications.stats import invalidate_stats
+        self.assertFalse(self.client.get('/api/stats/').json()['stale'])
+        invalidate_stats()
+        with mock.patch('notifications.stats.compute_stats', side_effect=OperationalError("database is locked")):
+            response = self.client.get('/api/stats/')
+        self.assertEqual(response['X-Stats-Stale'], 'true')
+        self.assertEqual(response.json()['total_notifications'], 1)
+        invalidate_stats()
+        with self.assertNumQueries(0):  # délestage pendant COOLDOWN : la base n'est plus interrogée
+            self.assertTrue(self.client.get('/api/stats/').json()['stale'])
+
+    def test_concurrent_recomputations_are_shed(self):
+        from notifications.stats import get_stats_status, invalidate_stats, shedder
+        get_stats_status()
+        invalidate_stats()
+        while shedder._slots.acquire(blocking=False):
+            self.addCleanup(shedder._slots.release)
+        with self.assertNumQueries(0):
+            stats, stale = get_stats_status()
+        self.assertTrue(stale)
+        self.assertEqual(stats['total_notifications'], 1)
+
+
+class BulkIngestTestCase(TestCase):
+    URL = '/api/notifications/bulk/'
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="jane", password="x")
+
+    def test_ndjson_stream_creates_notifications(self):
+        from notifications.models import UserNotificationCounter
+        body = "\n".join([
+            '{"message": "Alerte 1", "priority": "HIGH", "destinataire": %d}' % self.user.pk,
+            '',
+            '{"message": "Alerte 2"}',
+        ])
+        response = self.client.post(self.URL, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(Notification.objects.filter(priority='LOW').count(), 1)
+        counter = UserNotificationCounter.objects.get(user=self.user)
+        self.assertEqual((counter.total, counter.high_priority), (1, 1))
+
+    def test_csv_stream_creates_notifications(self):
+        body = "message,priority,destinataire\nFeu,URGENT,%d\nInfo,,\n" % self.user.pk
+        response = self.client.post(self.URL, body, content_type='text/csv; charset=utf-8')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Notification.objects.get(priority='URGENT').destinataire, self.user)
+
+    def test_ingested_rows_are_delivered_or_deferred(self):
+        from django.utils import timezone
+        from notifications.delivery import Memory
+        Memory.outbox.clear()
+        self.addCleanup(Memory.outbox.clear)
+        now = timezone.now()
+        night = User.objects.create(username="night", email="night@example.com",
+                                    time_window_start=now + timedelta(hours=2),
+                                    time_window_end=now + timedelta(hours=10))
+        body = "message,priority,destinataire\nFeu,URGENT,%d\nBulletin,LOW,%d\nInfo,LOW,%d\n" % (
+            night.pk, night.pk, self.user.pk)
+        with self.settings(NOTIFICATION_CHANNELS=['memory']), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.URL, body, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sorted((r.user_id, r.email, m.text) for r, m in Memory.outbox),
+            sorted([(night.pk, "night@example.com", "Feu"), (self.user.pk, self.user.email, "Info")]),
+        )
+        self.assertEqual(Notification.objects.get(message="Bulletin").next_due_at, night.time_window_start)
+
+    def test_invalid_rows_are_reported_by_line(self):
+        body = "\n".join([
+            '{"message": "ok"}',
+            'pas du json',
+            '{"message": "x", "priority": "EXTREME"}',
+            '{"message": "x", "destinataire": 999999}',
+        ])
+        response = self.client.post(self.URL, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 207)
+        report = response.json()
+        self.assertEqual((report['created'], report['error_count']), (1, 3))
+        self.assertEqual([e['line'] for e in report['errors']], [2, 3, 4])
+        self.assertIn('destinataire', report['errors'][2]['errors'])
+
+    def test_one_user_query_per_chunk(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        body = "\n".join(
+            '{"message": "m%d", "destinataire": %d}' % (i, self.user.pk) for i in range(6)
+        )
+        with self.settings(NOTIFICATION_INGEST_CHUNK_SIZE=2), CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.URL, body, content_type='application/x-ndjson')
+        self.assertEqual(response.json()['created'], 6)
+        user_queries = [q for q in ctx.captured_queries
+                        if q['sql'].startswith('SELECT') and 'FROM "notifications_user"' in q['sql']]
+        self.assertEqual(len(user_queries), 3)
+
+    def test_unsupported_content_type(self):
+        response = self.client.post(self.URL, {'message': 'x'}, content_type='application/json')
+        self.assertEqual(response.status_code, 415)
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="jane", password="x")
+        Notification.objects.bulk_create([
+            Notification(message="Alerte, feu", priority='URGENT', destinataire=self.user),
+            Notification(message="Info", priority='LOW'),
+        ])
+        admin = User.objects.create_user(username="audit", password="x", is_staff=True)
+        self.client.force_login(admin)
+
+    def _content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_is_streamed(self):
+        import csv, io
+        response = self.client.get('/api/export/')
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(self._content(response))))
+        self.assertEqual([r['message'] for r in rows], ["Alerte, feu", "Info"])
+        self.assertEqual(rows[0]['destinataire'], 'jane')
+
+    def test_ndjson_export_with_filters(self):
+        import json
+        response = self.client.get('/api/export/', {'format': 'ndjson', 'priority': 'urgent,high',
+                                                    'user': self.user.pk})
+        rows = [json.loads(line) for line in self._content(response).splitlines()]
+        self.assertEqual([r['priority'] for r in rows], ['URGENT'])
+        response = self.client.get('/api/export/', {'format': 'ndjson', 'since': '2999-01-01'})
+        self.assertEqual(self._content(response), '')
+
+    def test_invalid_filters_and_permissions(self):
+        self.assertEqual(self.client.get('/api/export/', {'priority': 'EXTREME'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/export/', {'until': 'hier'}).status_code, 400)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/api/export/').status_code, 302)
+
+    def test_rows_are_read_in_chunks(self):
+        from notifications.export import export_rows
+        Notification.objects.bulk_create([Notification(message=f"m{i}") for i in range(5)])
+        with self.assertNumQueries(2):  # SQLite : un curseur par table (archive, puis Notification)
+            self.assertEqual(sum(1 for _ in export_rows(chunk_size=2)), 7)
+
+    def test_management_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+        out, err = StringIO(), StringIO()
+        call_command('export_notifications', '--format', 'ndjson', '--priority', 'LOW', stdout=out, stderr=err)
+        self.assertEqual(len(out.getvalue().splitlines()), 1)
+        self.assertIn("1 notifications exportées", err.getvalue())
+
+
+class ImportUsersTestCase(TestCase):
+    CSV = (
+        "username,email,password,phone,building,role,groups\n"
+        "alice,alice@campus.cd,s3cret,+243970000001,B,etudiant,L1|Sciences\n"
+        "bob,,,,A,PERSONNEL,\n"
+        "carol,pas-un-email,x,,,,\n"
+        "dave,,x,12345,,,\n"
+    )
+    FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+    def _import(self, **kwargs):
+        from io import StringIO
+        from notifications.provisioning import UserImporter, read_users
+        return UserImporter(**kwargs).run(read_users(StringIO(self.CSV)))
+
+    def test_import_validates_hashes_and_assigns_groups(self):
+        with self.settings(PASSWORD_HASHERS=self.FAST_HASHERS):
+            report = self._import(workers=0)
+        self.assertEqual((report['created'], report['error_count']), (2, 2))
+        self.assertEqual([e['line'] for e in report['errors']], [4, 5])
+        self.assertIn('phone', report['errors'][1]['errors'])
+        alice = User.objects.get(username='alice')
+        self.assertEqual((alice.phone, alice.role), ('+243970000001', 'ETUDIANT'))
+        self.assertEqual(set(alice.groups.values_list('name', flat=True)), {'L1', 'Sciences'})
+        self.assertFalse(User.objects.get(username='bob').has_usable_password())
+        with self.settings(PASSWORD_HASHERS=self.FAST_HASHERS):
+            self.assertTrue(alice.check_password('s3cret'))
+
+    def test_sso_import_is_idempotent_and_invalidates_audiences(self):
+        from notifications.audience import current_version
+        version = current_version()
+        self.assertEqual(self._import(workers=0, sso=True)['created'], 2)
+        self.assertGreater(current_version(), version)
+        self.assertFalse(User.objects.get(username='alice').has_usable_password())
+        report = self._import(workers=0, sso=True)
+        self.assertEqual((report['created'], report['skipped']), (0, 2))
+
+    def test_passwords_hashed_in_process_pool(self):
+        from notifications.provisioning import UserImporter
+        rows = iter([(2, {'username': 'erin', 'password': 'pw1'}),
+                     (3, {'username': 'fred', 'password': 'pw2'})])
+        with self.settings(PASSWORD_HASHERS=self.FAST_HASHERS):
+            report = UserImporter(workers=2).run(rows)
+            self.assertEqual(report['created'], 2)
+            self.assertTrue(User.objects.get(username='fred').check_password('pw2'))
+
+    def test_management_command(self):
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(self.CSV)
+        self.addCleanup(os.remove, f.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_users', f.name, '--sso', '--workers', '0', stdout=out, stderr=err)
+        self.assertIn("2 utilisateurs créés", out.getvalue())
+        self.assertIn("ligne 4", err.getvalue())
+
+
+class EvacuationPipelineTestCase(TestCase):
+    def setUp(self):
+        from notifications.metrics import registry
+        registry.clear()
+
+    def test_single_wrapper_preserves_metadata(self):
+        from notifications.core import Urgence
+        evacuer = Incendie.evacuer
+        self.assertEqual(evacuer.__name__, 'evacuer')
+        self.assertEqual(evacuer.__pipeline__, ('tracking', 'breaker', 'message'))
+        self.assertFalse(hasattr(evacuer.__wrapped__, '__wrapped__'))  # @message fusionné
+        self.assertIs(GlobalRegistry.get('Incendie'), Incendie)
+        self.assertIsNot(Incendie.evacuer, Urgence.evacuer)
+
+    def test_validation_checks_only_instance_fields(self):
+        from notifications.decorators import EvacuationPipeline
+
+        @EvacuationPipeline(registry=False, breaker=False)
+        class Incomplete:
+            required_fields = ['nom', 'niveau']
+            niveau = 1  # fourni par la classe : jamais revérifié
+
+        with self.assertRaisesRegex(ValueError, 'nom'):
+            Incomplete()
+
+        @EvacuationPipeline(registry=False)
+        class Complete:
+            required_fields = ['niveau']
+            niveau = 1
+
+        self.assertIs(Complete.__init__, object.__init__)
+
+    def test_toggleable_stages(self):
+        from notifications.decorators import EvacuationPipeline
+        from notifications.metrics import registry
+
+        class Broken:
+            def evacuer(self):
+                raise RuntimeError("panne")
+
+        Guarded = EvacuationPipeline(registry=False)(type('PipelineGuarded', (Broken,), {}))
+        self.assertIsNone(Guarded().evacuer())
+        labels = {'emergency': 'PipelineGuarded'}
+        self.assertEqual(registry.counter('notifications_evacuation_errors_total', labels), 1)
+        self.assertEqual(registry.histogram('notifications_evacuation_duration_seconds', labels).count, 1)
+
+        Raw = EvacuationPipeline(registry=False, breaker=False, tracking=False)(
+            type('PipelineRaw', (Broken,), {}))
+        self.assertEqual(Raw.evacuer.__pipeline__, ())
+        with self.assertRaises(RuntimeError):
+            Raw().evacuer()
+        self.assertIsNone(GlobalRegistry.get('PipelineRaw'))
+
+
+class EmergencyTypesTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from notifications.emergencies import catalog
+        cache.clear()
+        catalog.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(catalog.clear)
+        User.objects.create_user(username="jane", password="x")
+
+    def _define(self, **fields):
+        from notifications.models import EmergencyType
+        defaults = {'slug': 'fuite-gaz', 'name': 'FuiteDeGaz', 'label': 'Fuite de gaz',
+                    'consigne': "Sortez sans toucher aux interrupteurs", 'priority': 'URGENT'}
+        with self.captureOnCommitCallbacks(execute=True):
+            return EmergencyType.objects.create(**{**defaults, **fields})
+
+    def test_builtin_types_and_unknown_slug(self):
+        from notifications.emergencies import catalog
+        self.assertIs(catalog.get('incendie').cls, Incendie)
+        self.assertEqual(self.client.get('/api/evacuation/inconnue/').status_code, 404)
+        self.assertEqual(self.client.post('/api/evacuation/inconnue/').status_code, 404)
+
+    def test_database_type_is_served_and_hot_reloaded(self):
+        from notifications.models import DispatchJob
+        definition = self._define()
+        self.assertEqual(self.client.get('/api/evacuation/fuite-gaz/').json()['priority'], 'URGENT')
+        response = self.client.post('/api/evacuation/fuite-gaz/')
+        self.assertEqual(response.status_code, 202)
+        job = DispatchJob.objects.get(pk=response.json()['job_id'])
+        self.assertEqual((job.emergency, job.status), ('FuiteDeGaz', DispatchJob.SUCCESS))
+        self.assertTrue(Notification.objects.filter(message=definition.consigne).exists())
+
+        definition.enabled = False
+        with self.captureOnCommitCallbacks(execute=True):
+            definition.save()
+        self.assertEqual(self.client.get('/api/evacuation/fuite-gaz/').status_code, 404)
+        self.assertIsNone(GlobalRegistry.get('FuiteDeGaz'))
+
+    def test_worker_reloads_unknown_type_from_database(self):
+        from notifications.emergencies import catalog
+        from notifications.models import DispatchJob, EmergencyType
+        from notifications.tasks import run_dispatch_job
+        catalog.get('incendie')  # worker démarré : catalogue chargé
+        # Créé par un autre process : la version en cache de ce worker ne bouge pas
+        EmergencyType.objects.create(slug='fuite-gaz', name='FuiteDeGaz', label='Fuite de gaz',
+                                     consigne="Sortez", priority='HIGH')
+        job = DispatchJob.objects.create(emergency='FuiteDeGaz')
+        run_dispatch_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, DispatchJob.SUCCESS)
+        self.assertTrue(Notification.objects.filter(message="Sortez").exists())
+
+    def test_yaml_types_and_reserved_names(self):
+        import tempfile
+        from notifications.emergencies import catalog
+        with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False) as f:
+            f.write("- {slug: seisme, name: Seisme, label: Séisme, consigne: Abritez-vous, priority: HIGH}\n"
+                    "- {slug: incendie, name: FauxIncendie, label: X, consigne: X, priority: LOW}\n")
+        self.addCleanup(os.remove, f.name)
+        self._define(slug='autre', name='Incendie')
+        with self.settings(NOTIFICATION_EMERGENCY_TYPES_FILE=f.name):
+            self.assertEqual(catalog.get('seisme').cls.priority, 'HIGH')
+            self.assertIs(catalog.get('incendie').cls, Incendie)
+            self.assertIsNone(catalog.get('autre'))
+            self.assertIs(GlobalRegistry.get('Incendie'), Incendie)
+
+    def test_changes_from_other_processes_are_checked_once_per_interval(self):
+        import time
+        from unittest import mock
+        from django.core.cache import cache
+        from notifications.emergencies import VERSION_KEY, catalog
+        self._define()
+        catalog.get('incendie')
+        # Type ajouté par un autre process : seule la version en cache change
+        with mock.patch('notifications.emergencies.load_database', return_value=[]):
+            cache.incr(VERSION_KEY)
+            with self.assertNumQueries(0), mock.patch('notifications.emergencies.cache.get') as cache_get:
+                self.assertIsNotNone(catalog.get('fuite-gaz'))
+            cache_get.assert_not_called()
+            with mock.patch('notifications.emergencies.time.monotonic', return_value=time.monotonic() + 2):
+                self.assertIsNone(catalog.get('fuite-gaz'))
+
+
+class ReadTrackingTestCase(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from notifications.dispatch import NotificationDispatcher
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="jane", password="x")
+        self.other = User.objects.create_user(username="bob", password="x")
+        for i in range(3):
+            NotificationDispatcher().dispatch(f"Alerte {i}", destinataires=[self.user.pk, self.other.pk])
+        self.client.force_login(self.user)
+
+    def _unread(self):
+        return self.client.get('/api/notifications/unread/').json()['unread']
+
+    def test_unread_count_is_read_from_counter(self):
+        with self.assertNumQueries(3):  # session, utilisateur, compteur
+            self.assertEqual(self._unread(), 3)
+
+    def test_mark_all_read_is_a_single_update(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from notifications.counters import mark_all_read, user_counters
+        with CaptureQueriesContext(connection) as ctx:
+            mark_all_read(self.user)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertTrue(ctx.captured_queries[0]['sql'].startswith('UPDATE'))
+        self.assertEqual(self._unread(), 0)
+        self.assertEqual(user_counters(self.other).unread, 3)
+
+        Notification.objects.create(message="Nouvelle", destinataire=self.user)
+        self.assertEqual(self.client.post('/api/notifications/read-all/').json(), {'unread': 0})
+
+    def test_late_commit_below_cursor_is_not_counted_unread(self):
+        from django.db.models import F
+        from notifications.counters import mark_all_read, user_counters
+        from notifications.dispatch import NotificationDispatcher
+        from notifications.models import UserNotificationCounter
+        mark_all_read(self.user)
+        # Ids supérieurs déjà validés et lus : la prochaine ligne a un id inférieur au curseur
+        UserNotificationCounter.objects.filter(user=self.user).update(last_read_id=F('last_read_id') + 100)
+        NotificationDispatcher().dispatch("Retardataire", destinataires=[self.user.pk, self.other.pk])
+        self.assertEqual(user_counters(self.user).unread, 0)
+        self.assertEqual(user_counters(self.other).unread, 4)
+
+        UserNotificationCounter.objects.filter(user=self.user).update(unread=7)  # écart laissé
+        mark_all_read(self.user)
+        self.assertEqual(user_counters(self.user).unread, 0)
+
+    def test_ack_marks_one_notification(self):
+        mine = Notification.objects.filter(destinataire=self.user).first()
+        response = self.client.post(f'/api/notifications/{mine.pk}/ack/')
+        self.assertEqual(response.json(), {'read': True, 'acknowledged': True, 'unread': 2})
+        again = self.client.post(f'/api/notifications/{mine.pk}/ack/').json()
+        self.assertEqual((again['acknowledged'], again['unread']), (False, 2))
+        theirs = Notification.objects.filter(destinataire=self.other).first()
+        self.assertEqual(self.client.post(f'/api/notifications/{theirs.pk}/ack/').status_code, 404)
+
+    def test_rebuild_preserves_read_state(self):
+        from notifications.counters import acknowledge, mark_all_read, rebuild_counters, user_counters
+        mark_all_read(self.user)
+        Notification.objects.create(message="a", destinataire=self.user)
+        newest = Notification.objects.create(message="b", destinataire=self.user)
+        acknowledge(self.user, newest)
+        self.assertEqual(user_counters(self.user).unread, 1)
+        rebuild_counters()
+        self.assertEqual((user_counters(self.user).unread, user_counters(self.other).unread), (1, 3))
+
+    def test_dashboard_shows_read_state(self):
+        from notifications.counters import acknowledge, mark_all_read
+        mark_all_read(self.user)
+        acknowledge(self.user, Notification.objects.create(message="Lue", destinataire=self.user))
+        Notification.objects.create(message="Nouvelle", destinataire=self.user)
+        response = self.client.get('/dashboard/')
+        self.assertEqual(response.context['unread_notifications'], 1)
+        self.assertEqual([n.is_read for n in response.context['notifications']],
+                         [False, True, True, True, True])
+
+    def test_anonymous_is_rejected(self):
+        self.client.logout()
+        self.assertEqual(self.client.post('/api/notifications/read-all/').status_code, 403)
+
+
+class RetentionTestCase(TestCase):
+    def setUp(self):
+        from django.utils import timezone
+        from notifications.dispatch import NotificationDispatcher
+        self.user = User.objects.create_user(username="jane", password="x")
+        for i in range(5):
+            NotificationDispatcher().dispatch(f"Ancienne {i}", destinataires=[self.user.pk], priority='HIGH')
+        NotificationDispatcher().dispatch("Récente", destinataires=[self.user.pk])
+        self.old = timezone.now() - timedelta(days=400)
+        Notification.objects.filter(message__startswith="Ancienne").update(created_at=self.old)
+
+    def test_old_rows_move_to_archive_in_batches(self):
+        from notifications.counters import acknowledge, rebuild_counters, user_counters
+        from notifications.models import NotificationAck, NotificationArchive
+        from notifications.retention import RetentionPolicy
+        acknowledge(self.user, Notification.objects.filter(message="Ancienne 0").get())
+        Notification.objects.filter(message="Ancienne 4").update(next_due_at=self.old)  # encore à diffuser
+        before = user_counters(self.user)
+
+        report = RetentionPolicy(max_age_days=365, batch_size=2, pause=0).run()
+        self.assertEqual((report.archived, report.batches), (4, 2))
+        self.assertEqual(
+            set(Notification.objects.values_list('message', flat=True)), {"Récente", "Ancienne 4"}
+        )
+        archived = NotificationArchive.objects.get(message="Ancienne 0")
+        self.assertEqual((archived.destinataire, archived.month), (self.user, self.old.date().replace(day=1)))
+        self.assertFalse(NotificationAck.objects.exists())
+        counter = user_counters(self.user)
+        self.assertEqual((counter.total, counter.unread), (before.total, 2))  # Ancienne 4 et Récente
+        self.assertEqual(RetentionPolicy(max_age_days=365).run().archived, 0)
+        rebuild_counters()
+        self.assertEqual(user_counters(self.user).unread, counter.unread)
+
+    def test_export_and_counters_include_archive(self):
+        from notifications.counters import rebuild_counters, user_counters
+        from notifications.export import export_rows
+        from notifications.retention import RetentionPolicy
+        RetentionPolicy(max_age_days=365, pause=0).run()
+        rows = list(export_rows())
+        self.assertEqual([row[5] for row in rows][0], "Ancienne 0")
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(len(list(export_rows(archived=False))), 1)
+        rebuild_counters()
+        counter = user_counters(self.user)
+        self.assertEqual((counter.total, counter.high_priority, counter.unread), (6, 5, 1))
+
+    def test_archive_is_read_only_in_admin(self):
+        from notifications.retention import RetentionPolicy
+        RetentionPolicy(max_age_days=365, pause=0).run()
+        admin = User.objects.create_superuser(username="root", password="x")
+        self.client.force_login(admin)
+        url = '/admin/notifications/notificationarchive/'
+        self.assertContains(self.client.get(url), "Ancienne 3")
+        self.assertEqual(self.client.get(url + 'add/').status_code, 403)
+
+    def test_management_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('archive_notifications', '--dry-run', stdout=out)
+        self.assertIn("5 notifications", out.getvalue())
+        call_command('archive_notifications', '--pause', '0', stdout=out)
+        self.assertIn("5 notifications antérieures", out.getvalue())
+        self.assertEqual(Notification.objects.count(), 1)
@@ -0,0 +1,93 @@
+# notifications/throttling.py
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+from .metrics import registry as metrics
+
+
+DEFAULT_RATE_LIMITS = {
+    # scope : capacité du seau (rafale) et jetons rendus par seconde
+    'evacuation': {'CAPACITY': 30, 'REFILL': 0.5},
+    'stats': {'CAPACITY': 20, 'REFILL': 1},
+    'api': {'CAPACITY': 100, 'REFILL': 10},
+}
+
+# Rôles jamais limités sur les déclenchements d'évacuation
+EXEMPT_ROLES = frozenset({'SECURITE'})
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Seau à jetons par scope (classe d'endpoint) et par client : utilisateur
+    authentifié, sinon adresse IP. L'état est dans le cache Django, donc
+    partagé entre workers si le cache l'est ; la mise à jour n'est pas
+    atomique (au pire quelques requêtes de plus passent lors d'une course).
+    Un refus devient une réponse 429 avec Retry-After (exception Throttled).
+    """
+    scope = 'api'
+
+    def __init__(self):
+        config = {**DEFAULT_RATE_LIMITS, **getattr(settings, 'NOTIFICATION_RATE_LIMITS', {})}
+        limits = config[self.scope]
+        self.capacity = limits['CAPACITY']
+        self.refill = limits['REFILL']
+        self.retry_after = None
+
+    def get_cache_key(self, request, view):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            ident = f"user:{user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        return f"notifications:bucket:{self.scope}:{ident}"
+
+    def is_exempt(self, request, view):
+        return False
+
+    def allow_request(self, request, view):
+        if self.is_exempt(request, view):
+            return True
+        key = self.get_cache_key(request, view)
+        now = time.time()
+        tokens, updated = cache.get(key) or (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated) * self.refill)
+        if tokens < 1:
+            self.retry_after = (1 - tokens) / self.refill
+            cache.set(key, (tokens, now), timeout=self._timeout())
+            metrics.inc('notifications_throttled_total', {'scope': self.scope})
+            return False
+        cache.set(key, (tokens - 1, now), timeout=self._timeout())
+        return True
+
+    def _timeout(self):
+        # Au-delà, le seau serait de toute façon plein
+        return int(self.capacity / self.refill) + 1
+
+    def wait(self):
+        return self.retry_after
+
+
+class EvacuationThrottle(TokenBucketThrottle):
+    """Déclenchements d'évacuation : le personnel et la sécurité ne sont jamais limités."""
+    scope = 'evacuation'
+
+    def is_exempt(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return False
+        return user.is_staff or getattr(user, 'role', None) in EXEMPT_ROLES
+
+
+class StatsThrottle(TokenBucketThrottle):
+    scope = 'stats'
+
+
+class ApiThrottle(TokenBucketThrottle):
+    scope = 'api'
@@ -0,0 +1,47 @@
+# notifications/tracing.py
+
+import atexit
+import logging
+import logging.handlers
+import queue
+
+
+logger = logging.getLogger('notifications.trace')
+
+_listener = None
+
+
+def trace(msg, *args, level=logging.DEBUG):
+    """
+    Trace paresseuse : le message n'est formaté (%-style) que si le niveau
+    est activé pour le logger notifications.trace.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, *args)
+
+
+def enabled(level=logging.DEBUG):
+    """Permet d'éviter tout travail préparatoire quand la trace est coupée."""
+    return logger.isEnabledFor(level)
+
+
+def install_queue_handler():
+    """
+    Place les handlers configurés du logger derrière une QueueHandler :
+    l'appelant ne fait qu'un put() non bloquant, l'écriture (console,
+    fichier) est faite par le thread d'un QueueListener.
+    """
+    global _listener
+    if _listener is not None or not logger.handlers:
+        return _listener
+
+    handlers = list(logger.handlers)
+    records = queue.SimpleQueue()
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(records))
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .api import NotificationViewSet, EpidemieAPIView, IncendieAPIView, InnondationAPIView, SecuriteAPIView
-from .views import user_dashboard, admin_dashboard, stats_api
+from .api import NotificationViewSet, DispatchJobViewSet, EvacuationAPIView
+from .views import user_dashboard, admin_dashboard, stats_api, metrics_api, export_notifications
 
 router = DefaultRouter()
 router.register(r'notifications', NotificationViewSet)
+router.register(r'jobs', DispatchJobViewSet)
 
 urlpatterns = [
     # Dashboards
@@ -14,9 +15,8 @@ urlpatterns = [
     # API
     path('api/', include(router.urls)),
     path('api/stats/', stats_api, name='stats_api'),
-    path('api/evacuation/epidemie/', EpidemieAPIView.as_view()),
-    path('api/evacuation/incendie/', IncendieAPIView.as_view()),
-    path('api/evacuation/innondation/', InnondationAPIView.as_view()),
-    path('api/evacuation/securite/', SecuriteAPIView.as_view()),
+    path('api/metrics/', metrics_api, name='metrics_api'),
+    path('api/export/', export_notifications, name='export_notifications'),
+    path('api/evacuation/<slug:slug>/', EvacuationAPIView.as_view(), name='evacuation'),
 ]
 
@@ -1,18 +1,23 @@
 # notifications/views.py
 
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Count
+from django.db.models import F
 from django.utils import timezone
-from datetime import timedelta
 import json
 
-from rest_framework import viewsets
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.response import Response
 
+from .counters import annotate_read, user_counters, with_acks
+from .export import FORMATS, ExportFilters, export_rows, render as render_export
+from .metrics import registry as metrics, render_prometheus
 from .models import Notification, User
-from .core import Epidemie, Incendie, Innondation, Securite
+from .pagination import keyset_page
+from .stats import get_daily_stats, get_stats, get_stats_status
+from .circuit_breaker import breakers_status
+from .throttling import StatsThrottle
 
 
 # -------------------------------------------------------------------
@@ -23,18 +28,32 @@ def user_dashboard(request):
     """Dashboard pour un utilisateur connecté."""
     user = request.user
 
-    notifications = Notification.objects.filter(
-        destinataire=user
-    ).order_by('-created_at')
+    try:
+        notifications, next_cursor = keyset_page(
+            with_acks(Notification.objects.filter(destinataire=user), user).only('message', 'priority', 'created_at'),
+            request.GET.get('cursor'),
+        )
+    except ValueError:
+        raise Http404("Curseur invalide")
+
+    counters = user_counters(user)
+    annotate_read(notifications, counters)
+
+    # "Charger plus" : seules les lignes suivantes sont renvoyées
+    if request.GET.get('partial'):
+        response = render(request, 'notifications/_notification_items.html', {
+            'notifications': notifications,
+        })
+        response['X-Next-Cursor'] = next_cursor or ''
+        return response
 
     context = {
         'user': user,
         'notifications': notifications,
-        'total_notifications': notifications.count(),
-        'unread_notifications': notifications.filter(
-            created_at__gte=timezone.now() - timedelta(days=1)
-        ).count(),
-        'high_priority': notifications.filter(priority='HIGH').count(),
+        'next_cursor': next_cursor,
+        'total_notifications': counters.total,
+        'unread_notifications': counters.unread,
+        'high_priority': counters.high_priority,
     }
     return render(request, 'notifications/user_dashboard.html', context)
 
@@ -46,59 +65,37 @@ def user_dashboard(request):
 @user_passes_test(lambda u: u.is_superuser)
 def admin_dashboard(request):
     """Dashboard administrateur avec statistiques avancées."""
-    now = timezone.now()
-
-    # Statistiques globales
-    total_users = User.objects.count()
-    total_notifications = Notification.objects.count()
+    stats = get_stats()
 
     # Par priorité
-    priority_stats = list(
-        Notification.objects.values('priority').annotate(count=Count('id'))
-    )
-
-    # Notifications récentes
-    notifs_24h = Notification.objects.filter(created_at__gte=now - timedelta(hours=24)).count()
-    notifs_7d  = Notification.objects.filter(created_at__gte=now - timedelta(days=7)).count()
-    notifs_30d = Notification.objects.filter(created_at__gte=now - timedelta(days=30)).count()
-
-    # Top utilisateurs
-    top_users = User.objects.annotate(
-        notif_count=Count('notification')
-    ).order_by('-notif_count')[:5]
-
-    # Récents
-    recent_notifications = Notification.objects.all().order_by('-created_at')[:10]
-
-    # Stats journalières (sur 7 jours)
-    daily_stats = []
-    for i in range(7):
-        day = now - timedelta(days=i)
-        day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
-
-        count = Notification.objects.filter(
-            created_at__gte=day_start,
-            created_at__lt=day_end
-        ).count()
-
-        daily_stats.append({
-            'date': day_start.strftime('%d/%m'),
-            'count': count
-        })
-
-    daily_stats.reverse()
+    priority_stats = [
+        {'priority': priority, 'count': count}
+        for priority, count in stats['priority_counts'].items()
+        if count
+    ]
+
+    # Top utilisateurs (compteurs pré-calculés, une seule requête)
+    top_users = User.objects.filter(
+        notification_counter__isnull=False
+    ).annotate(
+        notif_count=F('notification_counter__total')
+    ).only('username', 'email').order_by('-notif_count')[:5]
+
+    # Récents (seuls les champs affichés)
+    recent_notifications = Notification.objects.only(
+        'priority', 'message', 'created_at'
+    ).order_by('-created_at')[:10]
 
     context = {
-        'total_users': total_users,
-        'total_notifications': total_notifications,
+        'total_users': stats['total_users'],
+        'total_notifications': stats['total_notifications'],
         'priority_stats': priority_stats,
-        'notifs_24h': notifs_24h,
-        'notifs_7d': notifs_7d,
-        'notifs_30d': notifs_30d,
+        'notifs_24h': stats['notifs_24h'],
+        'notifs_7d': stats['notifs_7d'],
+        'notifs_30d': stats['notifs_30d'],
         'top_users': top_users,
         'recent_notifications': recent_notifications,
-        'daily_stats': json.dumps(daily_stats),
+        'daily_stats': json.dumps(get_daily_stats()),
     }
 
     return render(request, 'notifications/admin_dashboard.html', context)
@@ -108,56 +105,61 @@ def admin_dashboard(request):
 # STATS API (PUBLIC OU AUTHENTIFIÉ selon usage)
 # -------------------------------------------------------------------
 @api_view(['GET'])
+@throttle_classes([StatsThrottle])
 def stats_api(request):
-    """API retournant les statistiques en temps réel."""
-    now = timezone.now()
-
-    stats = {
-        'total_users': User.objects.count(),
-        'total_notifications': Notification.objects.count(),
-        'notifs_24h': Notification.objects.filter(created_at__gte=now - timedelta(hours=24)).count(),
-        'notifs_7d':  Notification.objects.filter(created_at__gte=now - timedelta(days=7)).count(),
-        'priority_counts': {
-            'LOW': Notification.objects.filter(priority='LOW').count(),
-            'MEDIUM': Notification.objects.filter(priority='MEDIUM').count(),
-            'HIGH': Notification.objects.filter(priority='HIGH').count(),
-            'URGENT': Notification.objects.filter(priority='URGENT').count(),
-        }
-    }
-    return Response(stats)
+    """
+    API retournant les statistiques (cache court, voir stats.get_stats).
+    Base sous pression : dernière valeur connue, signalée par stale.
+    """
+    stats, stale = get_stats_status()
+    stats = dict(stats)
+    del stats['notifs_30d']
+    stats['stale'] = stale
+    # État des disjoncteurs : lu à chaque appel, jamais mis en cache
+    stats['circuit_breakers'] = breakers_status()
+    return Response(stats, headers={'X-Stats-Stale': 'true'} if stale else None)
 
 
 # -------------------------------------------------------------------
-# VIEWSETS D'ÉVACUATION
+# EXPORT DE L'HISTORIQUE (AUDITS, PERSONNEL SEULEMENT)
 # -------------------------------------------------------------------
-class EvacuationViewSet(viewsets.ViewSet):
-
-    def _exec(self, obj_class):
-        """Exécute l'évacuation et renvoie un message standard."""
-        instance = obj_class()
-        instance.evacuer()
-        return Response({"status": f"Évacuation {obj_class.__name__} déclenchée"})
-
-    # Epidemie (GET + POST)
-    def epidemie(self, request):
-        if request.method == "POST":
-            return self._exec(Epidemie)
-        return Response({"message": "Évacuation Epidémie prête"})
-
-    # Incendie
-    def incendie(self, request):
-        if request.method == "POST":
-            return self._exec(Incendie)
-        return Response({"message": "Évacuation Incendie prête"})
-
-    # Innondation
-    def innondation(self, request):
-        if request.method == "POST":
-            return self._exec(Innondation)
-        return Response({"message": "Évacuation Inondation prête"})
-
-    # Sécurité
-    def securite(self, request):
-        if request.method == "POST":
-            return self._exec(Securite)
-        return Response({"message": "Évacuation Sécurité prête"})
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def export_notifications(request):
+    """
+    Historique complet en CSV ou NDJSON, envoyé au fil de la lecture.
+    Filtres : since, until (date ou date-heure ISO), priority (répétable
+    ou séparé par des virgules), user (id du destinataire) ; archived=0
+    exclut les notifications archivées par la rétention.
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest(f"Format inconnu : {fmt}")
+    try:
+        filters = ExportFilters.parse(
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+            priorities=request.GET.getlist('priority'),
+            user=request.GET.get('user'),
+        )
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    archived = request.GET.get('archived') != '0'
+    response = StreamingHttpResponse(
+        render_export(export_rows(filters, archived=archived), fmt), content_type=FORMATS[fmt]
+    )
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    response['Content-Disposition'] = f'attachment; filename="notifications-{stamp}.{fmt}"'
+    return response
+
+
+# -------------------------------------------------------------------
+# MÉTRIQUES (FORMAT TEXTE PROMETHEUS)
+# -------------------------------------------------------------------
+def metrics_api(request):
+    """Compteurs et histogrammes de latence, fusionnés entre process."""
+    return HttpResponse(
+        render_prometheus(*metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,16 @@
+"""
+Application Celery du projet.
+
+Les tâches sont découvertes dans chaque application (tasks.py) et la
+configuration est lue depuis settings.py (préfixe CELERY_).
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'systeme_notification.settings')
+
+app = Celery('systeme_notification')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
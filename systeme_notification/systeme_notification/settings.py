@@ -49,6 +49,9 @@ MIDDLEWARE = ['corsheaders.middleware.CorsMiddleware'] + MIDDLEWARE
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
+from corsheaders.defaults import default_headers
+CORS_ALLOW_HEADERS = [*default_headers, 'idempotency-key']
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'Retry-After']
 
 ROOT_URLCONF = 'systeme_notification.urls'
 
@@ -122,3 +125,181 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'notifications.User'
+
+
+# Fan-out des notifications (notifications/dispatch.py)
+NOTIFICATION_DISPATCH_CHUNK_SIZE = 1000
+NOTIFICATION_DISPATCH_TARGET_RATE = 5000  # lignes / seconde visées
+NOTIFICATION_INGEST_CHUNK_SIZE = 1000  # lignes par bloc de l'import en masse
+NOTIFICATION_EXPORT_CHUNK_SIZE = 2000  # lignes lues par aller-retour lors de l'export
+
+# Canaux de diffusion activés (notifications/delivery.py) :
+# push (dashboards), email, sms, file, memory (tests)
+NOTIFICATION_CHANNELS = [
+    c for c in os.environ.get('NOTIFICATION_CHANNELS', 'push').split(',') if c
+]
+NOTIFICATION_SMS_GATEWAY = {
+    'URL': os.environ.get('SMS_GATEWAY_URL'),
+    'TOKEN': os.environ.get('SMS_GATEWAY_TOKEN'),
+    'TIMEOUT': 5,
+}
+NOTIFICATION_FILE_CHANNEL_PATH = BASE_DIR / 'notifications-out.jsonl'
+
+# Diffusion concurrente (notifications/executor.py) : lots simultanés par canal
+# (limites des passerelles), délai réseau par lot, nouvelles tentatives
+NOTIFICATION_DELIVERY = {
+    'TIMEOUT': 10,
+    'RETRIES': 2,
+    'BACKOFF': 0.5,
+    'DEADLINE': 120,
+    'CONCURRENCY': {'email': 2, 'sms': 2, 'push': 4},
+    'AGING': 30,  # un lot LOW gagne un rang de priorité toutes les 30 s d'attente
+}
+
+# Diffusion différée à l'ouverture des fenêtres (manage.py deliver_deferred).
+# Une échéance créée par un autre process (web, Celery) est vue avec au plus
+# POLL secondes de retard si le cache est partagé (Redis, Memcached), au plus
+# HORIZON secondes avec LocMemCache (propre à chaque process).
+NOTIFICATION_DEFERRED = {
+    'BATCH_SIZE': 1000,
+    'HORIZON': 300,
+    'POLL': 1.0,
+}
+
+# Types d'urgence supplémentaires (YAML : liste de slug, name, label, consigne,
+# priority), en plus de ceux du code et de la base ; rechargés à chaud
+NOTIFICATION_EMERGENCY_TYPES_FILE = os.environ.get('NOTIFICATION_EMERGENCY_TYPES_FILE')
+# Secondes entre deux vérifications (version en cache, date du fichier) :
+# délai maximal avant qu'un process voie un type modifié ailleurs
+NOTIFICATION_EMERGENCY_CHECK_INTERVAL = 1.0
+
+# Rétention (notifications/retention.py, manage.py archive_notifications) :
+# notifications plus anciennes déplacées vers l'archive mensuelle par lots
+NOTIFICATION_RETENTION = {
+    'MAX_AGE_DAYS': 365,
+    'BATCH_SIZE': 1000,
+    'PAUSE': 0.05,
+}
+
+# Pagination par curseur (dashboard utilisateur et API)
+NOTIFICATION_PAGE_SIZE = 20
+
+
+# Trace des décorateurs / registre (notifications/tracing.py)
+# DEBUG : appels @message, INFO : performances, WARNING : erreurs seulement.
+# Les handlers sont placés derrière une QueueHandler au démarrage de l'app.
+NOTIFICATION_TRACE_LEVEL = os.environ.get('NOTIFICATION_TRACE_LEVEL', 'WARNING')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'trace': {'format': '%(asctime)s %(levelname)s %(message)s'},
+    },
+    'handlers': {
+        'trace_console': {'class': 'logging.StreamHandler', 'formatter': 'trace'},
+    },
+    'loggers': {
+        'notifications.trace': {
+            'handlers': ['trace_console'],
+            'level': NOTIFICATION_TRACE_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+
+
+# Métriques (notifications/metrics.py, exposées sur /api/metrics/)
+# Répertoire partagé pour agréger les workers gunicorn / Celery ; None = process seul.
+# Un répertoire par machine : les process morts y sont détectés par leur pid.
+NOTIFICATION_METRICS_DIR = os.environ.get('NOTIFICATION_METRICS_DIR')
+
+
+# Cache (statistiques, audiences, disjoncteurs, limites de débit, idempotence,
+# versions des types d'urgence). Redis si REDIS_URL est défini : partagé entre
+# les process web et les workers Celery. Sinon cache en mémoire, propre à
+# chaque process (tests, dev).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'notifications',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'notifications',
+        }
+    }
+NOTIFICATION_STATS_CACHE_TTL = 10  # secondes
+# Délestage : statistiques servies depuis le cache quand la base sature
+NOTIFICATION_LOAD_SHEDDING = {
+    'MAX_CONCURRENT': 2,
+    'SLOW_QUERY': 1.0,
+    'COOLDOWN': 30,
+}
+# Limites de débit (seaux à jetons par utilisateur ou IP, voir notifications/throttling.py)
+NOTIFICATION_RATE_LIMITS = {
+    'evacuation': {'CAPACITY': 30, 'REFILL': 0.5},
+    'stats': {'CAPACITY': 20, 'REFILL': 1},
+    'api': {'CAPACITY': 100, 'REFILL': 10},
+}
+# Ensembles d'ids des audiences ciblées (invalidés par version à chaque changement)
+NOTIFICATION_AUDIENCE_CACHE_TTL = 3600
+# Déclenchements d'évacuation : même urgence + même audience dans la fenêtre
+# = même job ; Idempotency-Key mémorisé en cache et en base (IdempotencyKey)
+NOTIFICATION_DEDUPE_WINDOW = 60  # secondes
+NOTIFICATION_IDEMPOTENCY_TTL = 86400
+
+
+# Disjoncteurs (notifications/circuit_breaker.py), état partagé via le cache
+NOTIFICATION_CIRCUIT_BREAKER = {
+    'FAILURE_RATE': 0.5,
+    'MIN_CALLS': 5,
+    'WINDOW': 60,
+    'OPEN_SECONDS': 30,
+    'HALF_OPEN_CALLS': 1,
+}
+
+
+# Celery (notifications/tasks.py)
+# Sans broker configuré, les tâches s'exécutent en mode eager (tests, dev).
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'memory://')
+CELERY_TASK_ALWAYS_EAGER = os.environ.get(
+    'CELERY_TASK_ALWAYS_EAGER', str(CELERY_BROKER_URL == 'memory://')
+).lower() in ('1', 'true', 'yes')
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Priorités des messages (notifications/scheduler.celery_priority) :
+# files prioritaires RabbitMQ, sous-files par priorité avec Redis
+CELERY_TASK_QUEUE_MAX_PRIORITY = 10
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'queue_order_strategy': 'priority',
+}
+# Tâches périodiques (celery beat)
+CELERY_BEAT_SCHEDULE = {
+    'archive-notifications': {
+        'task': 'notifications.tasks.archive_notifications',
+        'schedule': 3600,
+    },
+}
+
+
+# Channels (WebSockets des dashboards, notifications/consumers.py)
+# Couche Redis si REDIS_URL est défini, sinon couche en mémoire (tests, dev).
+INSTALLED_APPS = ['daphne'] + INSTALLED_APPS  # runserver ASGI (HTTP + WebSocket)
+ASGI_APPLICATION = 'systeme_notification.asgi.application'
+if os.environ.get('REDIS_URL'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [os.environ['REDIS_URL']]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+    }